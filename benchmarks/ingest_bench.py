@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import time
+import glob
+import resource
+import argparse
+from loguru import logger
+
+
+def _timed(label: str, run) -> dict:
+    started = time.perf_counter()
+    result = run()
+    seconds = round(time.perf_counter() - started, 3)
+    logger.info(f"{label}: {seconds}s")
+    return {"seconds": seconds, "files": len(result.ingested), "rows": result.rows}
+
+
+def main() -> None:
+    """
+    Times insert_api_data_to_db, the path startup and data updates go through, on a
+    source folder: a cold load into an empty database, a warm run over unchanged
+    files, and an incremental run after one file changed. Prints JSON on stdout.
+    Runs in its own process so the peak RSS is that of the ingest alone, reported for
+    this process and for the largest of the parse pool workers.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", required=True)
+    parser.add_argument("--db", required=True)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    from main import insert_api_data_to_db, TABLE_NAME
+    from lib.ingest import INGEST_WORKERS
+    # main adds its own handlers on import
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    def ingest():
+        return insert_api_data_to_db(file_path=args.data, db_path=args.db, table_name=TABLE_NAME)
+
+    results = {"cold": _timed("cold ingest", ingest), "warm": _timed("warm ingest", ingest)}
+
+    # Rewrite the newest file with one row less: one partition to replace
+    newest = sorted(glob.glob(os.path.join(args.data, "*.json")))[-1]
+    with open(newest) as f:
+        records = json.load(f)
+    with open(newest, "w") as f:
+        json.dump(records[:-1], f)
+    results["incremental"] = _timed("incremental ingest", ingest)
+
+    # ru_maxrss is in kilobytes on Linux. The spawned parse workers are joined when the
+    # pool closes, so RUSAGE_CHILDREN holds the peak of the largest one.
+    results["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    results["peak_worker_rss_mb"] = round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)
+    results["ingest_workers"] = INGEST_WORKERS
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
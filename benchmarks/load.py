@@ -0,0 +1,85 @@
+import time
+import asyncio
+import httpx
+
+INSIGHT_PATH = "/HCM_Insight/get_insight_api"
+
+# Routed template questions and free questions that go through SQL generation
+QUESTIONS = [
+    "Buatkan laporan demografi terbaru",
+    "Berapa persen karyawan millennial di Telkomsel?",
+    "Bagaimana komposisi gender karyawan Telkom Akses?",
+    "Tampilkan jumlah karyawan per band posisi",
+    "Berapa rata-rata masa kerja karyawan?",
+    "Perusahaan mana yang karyawannya paling banyak di usia produktif?",
+]
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies: list, errors: int, elapsed: float, concurrency: int) -> dict:
+    values = sorted(latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "mean_ms": round(sum(values) / len(values) * 1000, 1) if values else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def _tag(n: int) -> str:
+    """Letters only, so the suffix never reads as a year or an age. Tagged questions are not routed."""
+    letters = ""
+    while True:
+        n, rest = divmod(n, 26)
+        letters = chr(ord("a") + rest) + letters
+        if n == 0:
+            return letters
+
+
+async def run_level(base_url: str, api_key: str, concurrency: int, requests: int,
+                    questions: list = QUESTIONS, unique: bool = True, timeout: float = 300) -> dict:
+    """
+    Sends requests insight requests with concurrency of them in flight at any time.
+
+    Args:
+        unique (bool): Make every question distinct, so caches and request coalescing
+            do not hide the cost of the SQL and LLM stages.
+    """
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+    headers = {"x-api-key": api_key, "Content-Type": "application/json"}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def worker(client):
+        nonlocal errors
+        for n in counter:
+            question = questions[n % len(questions)]
+            if unique:
+                question = f"{question} [{_tag(n + concurrency * requests)}]"
+            started = time.perf_counter()
+            try:
+                response = await client.post(INSIGHT_PATH, json={"query": question}, headers=headers)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, errors, elapsed, concurrency)
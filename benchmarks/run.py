@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import httpx
+from benchmarks.synthetic_data import generate_dataset
+from benchmarks.stub_llm import StubLLM
+from benchmarks.load import run_level
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_KEY = "benchmark-api-key"
+READY_PATH = "/ready"
+
+# Result metrics compared against the baseline and the direction that is better
+LOWER_IS_BETTER = ("seconds", "_ms", "_mb")
+HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _process_tree_rss(pid: int, field: str = "VmRSS") -> float:
+    """Resident memory in MB of a process and its children (the uvicorn workers), from /proc"""
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith(f"{field}:"):
+                        total_kb += int(line.split()[1])
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return round(total_kb / 1024, 1)
+
+
+def benchmark_ingest(data_dir: str, workdir: str) -> dict:
+    db_path = os.path.join(workdir, "ingest_bench.db")
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.ingest_bench", "--data", data_dir, "--db", db_path],
+        cwd=workdir, env={**os.environ, "PYTHONPATH": REPO_ROOT}, capture_output=True, text=True, check=True
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def start_server(workdir: str, data_dir: str, llm_url: str, port: int, workers: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "PYTHONPATH": REPO_ROOT,
+        "HCM_DATA_FOLDER": data_dir,
+        "DATABASE_API": os.path.join(workdir, "HCM_Insight_API.db"),
+        "SINGLE_FLIGHT_DB": os.path.join(workdir, "single_flight.db"),
+        "X_API_KEY": API_KEY,
+        "URL_CUSTOM_LLM": llm_url,
+        "TOKEN_CUSTOM_LLM": "stub",
+    }
+    log = open(os.path.join(workdir, "server.log"), "w")
+    # Run from the work directory: main writes its log there and finds no .env to override the settings
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", REPO_ROOT,
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float) -> float:
+    started = time.perf_counter()
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}, see server.log")
+        try:
+            if httpx.get(base_url + READY_PATH, timeout=1).status_code == 200:
+                return round(time.perf_counter() - started, 3)
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Server not ready after {timeout}s")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Metrics that got worse than the baseline by more than tolerance (a fraction).
+    Latency, duration and memory metrics regress upwards, throughput downwards.
+
+    Returns:
+        list: (metric path, baseline value, current value) per regression.
+    """
+    regressions = []
+
+    def walk(current, base, path):
+        if isinstance(current, dict) and isinstance(base, dict):
+            for key, value in current.items():
+                if key in base:
+                    walk(value, base[key], f"{path}.{key}" if path else key)
+        elif isinstance(current, list) and isinstance(base, list):
+            # Load levels are matched by concurrency
+            base_levels = {level.get("concurrency"): level for level in base if isinstance(level, dict)}
+            for level in current:
+                if isinstance(level, dict) and level.get("concurrency") in base_levels:
+                    walk(level, base_levels[level["concurrency"]], f"{path}[c={level['concurrency']}]")
+        elif isinstance(current, (int, float)) and isinstance(base, (int, float)) and base > 0:
+            name = path.rsplit(".", 1)[-1]
+            if name.endswith(LOWER_IS_BETTER) and current > base * (1 + tolerance):
+                regressions.append((path, base, current))
+            elif name.endswith(HIGHER_IS_BETTER) and current < base * (1 - tolerance):
+                regressions.append((path, base, current))
+
+    walk(results, baseline, "")
+    return regressions
+
+
+def run(args) -> dict:
+    workdir = args.workdir or tempfile.mkdtemp(prefix="hcm-bench-")
+    data_dir = os.path.join(workdir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    results = {"config": {
+        "months": args.months, "rows_per_month": args.rows, "llm_latency": args.llm_latency,
+        "workers": args.workers, "requests": args.requests, "unique": not args.repeat,
+    }}
+
+    started = time.perf_counter()
+    generate_dataset(data_dir, months=args.months, rows_per_month=args.rows, seed=args.seed)
+    print(f"Synthetic data generated in {time.perf_counter() - started:.1f}s ({workdir})")
+
+    # Before the ingest benchmark edits a file, so the server starts from the same data
+    ingest_data = os.path.join(workdir, "ingest_data")
+    generate_dataset(ingest_data, months=args.months, rows_per_month=args.rows, seed=args.seed)
+    results["ingest"] = benchmark_ingest(ingest_data, workdir)
+    print(f"Ingest: {results['ingest']}")
+
+    stub = StubLLM(latency=args.llm_latency, jitter=args.llm_jitter).start()
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(workdir, data_dir, stub.url, port, args.workers)
+    try:
+        results["startup"] = {
+            "seconds": wait_until_ready(base_url, server, args.startup_timeout),
+            "rss_mb": _process_tree_rss(server.pid),
+        }
+        print(f"Startup: {results['startup']}")
+
+        results["load"] = []
+        for concurrency in args.concurrency:
+            level = asyncio.run(run_level(
+                base_url, API_KEY, concurrency, args.requests, unique=not args.repeat
+            ))
+            results["load"].append(level)
+            print(f"Load: {level}")
+        results["memory"] = {
+            "rss_mb": _process_tree_rss(server.pid),
+            "peak_rss_mb": _process_tree_rss(server.pid, field="VmHWM"),
+        }
+        results["llm_calls"] = dict(stub.calls)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        stub.stop()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Offline end-to-end benchmark: synthetic data, stub LLM, real server"
+    )
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--rows", type=int, default=20000, help="employees per month")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--concurrency", type=lambda value: [int(c) for c in value.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=100, help="requests per concurrency level")
+    parser.add_argument("--repeat", action="store_true", help="repeat the same questions (measures the cached path)")
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    parser.add_argument("--workdir")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression as a fraction")
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for path, base, current in regressions:
+            print(f"REGRESSION {path}: {base} -> {current}")
+        if regressions:
+            return 1
+        print(f"No regression beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Valid for the synthetic data: one index seek for the latest period, one group by
+DEFAULT_SQL = """SELECT v_company_code, COUNT(*) AS total_employees
+FROM employee_demography
+WHERE (n_tahun, n_bulan) = (
+    SELECT n_tahun, n_bulan FROM employee_demography ORDER BY n_tahun DESC, n_bulan DESC LIMIT 1
+)
+GROUP BY v_company_code
+ORDER BY total_employees DESC;"""
+
+# Roughly the size of a real insight: the table written back out plus commentary
+DEFAULT_INSIGHT = (
+    "Berdasarkan data pada (Agustus 2025), berikut jumlah karyawan per perusahaan:\n\n"
+    "| Perusahaan | Jumlah Karyawan | Persentase |\n|---|---|---|\n"
+    + "".join(f"| PT. PERUSAHAAN {i} | {1000 * (11 - i):,} | {9.0 - i * 0.5:.2f}% |\n" for i in range(1, 11))
+    + "\nKomentar: " + "Distribusi karyawan terkonsentrasi pada beberapa perusahaan terbesar. " * 8
+)
+STREAM_CHUNK_CHARS = 40
+
+
+def call_kind(payload: dict) -> str:
+    """Which telkomllm_* function sent the payload, from its system prompt"""
+    system = payload["messages"][0]["content"]
+    if "expert SQL Generator" in system:
+        return "generate_sql"
+    if "SQL correction" in system:
+        return "fix_sql"
+    return "infer"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub: StubLLM = self.server.stub
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        kind = call_kind(payload)
+        stub.record(kind)
+        time.sleep(stub.delay())
+
+        content = stub.sql if kind in ("generate_sql", "fix_sql") else stub.insight
+        if payload.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for start in range(0, len(content), STREAM_CHUNK_CHARS):
+                chunk = {"choices": [{"delta": {"content": content[start:start + STREAM_CHUNK_CHARS]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+            return
+
+        body = json.dumps({"choices": [{"message": {"role": "assistant", "content": content}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubLLM:
+    """
+    OpenAI compatible chat completion server standing in for the Telkom LLM endpoints.
+    SQL generation and fix calls get a fixed query, insight calls a fixed text, each
+    after latency seconds plus up to jitter seconds.
+    """
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+                 sql: str = DEFAULT_SQL, insight: str = DEFAULT_INSIGHT, seed: int = 7):
+        self.latency = latency
+        self.jitter = jitter
+        self.sql = sql
+        self.insight = insight
+        self.calls: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def delay(self) -> float:
+        with self._lock:
+            return self.latency + self._rng.uniform(0, self.jitter)
+
+    def record(self, kind: str) -> None:
+        with self._lock:
+            self.calls[kind] += 1
+
+    def start(self) -> "StubLLM":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the stub LLM server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    args = parser.parse_args()
+    stub = StubLLM(latency=args.latency, jitter=args.jitter, port=args.port).start()
+    print(f"Stub LLM listening on {stub.url}")
+    try:
+        stub._thread.join()
+    except KeyboardInterrupt:
+        stub.stop()
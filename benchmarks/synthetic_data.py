@@ -0,0 +1,104 @@
+import os
+import json
+import random
+import argparse
+from datetime import date
+from lib.prompt import COMPANY_ABBREVIATIONS
+
+# Company sizes fall off quickly after the parent company and Telkomsel
+COMPANIES = [code for _, code in COMPANY_ABBREVIATIONS]
+COMPANY_WEIGHTS = [1 / (rank + 1) for rank in range(len(COMPANIES))]
+BAND_POSITIONS = ["I", "II", "III", "IV", "V", "VI", "VII", None]
+BAND_WEIGHTS = [1, 3, 8, 15, 25, 25, 15, 2]
+EMPLOYEE_GROUPS = [("Karyawan Tetap", 70), ("Karyawan Kontrak", 20), ("Karyawan Outsourcing", 10)]
+FTE_TYPES = [("FTE", 55), ("FTE-DIRECT", 20), ("FTE-PARENT", 10), ("NON FTE", 15)]
+# The API's v_consolidated values; the TELKOMSEL snapshot only holds Telkomsel employees
+CONSOLIDATIONS = ("CONSOLIDATED", "UNCONSOLIDATED", "TELKOMSEL")
+TELKOMSEL_CODE = "PT. TELKOMSEL"
+RETIREMENT_AGE = 56
+
+
+def recent_periods(months: int, end: date | None = None) -> list:
+    """(year, month) of the last months periods, oldest first, ending at the current month"""
+    end = end or date.today()
+    periods = []
+    year, month = end.year, end.month
+    for _ in range(months):
+        periods.append((year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return periods[::-1]
+
+
+def _population(rng: random.Random, size: int, first_year: int, company: str | None = None) -> list:
+    """Employees as of the first period: they age, but keep their company and band"""
+    employees = []
+    for employee_id in range(size):
+        age = int(rng.triangular(19, RETIREMENT_AGE + 1, 36))
+        birth = date(first_year - age, rng.randint(1, 12), rng.randint(1, 28))
+        employees.append({
+            "c_nik": f"{employee_id:07d}",
+            "birth": birth,
+            "v_company_code": company or rng.choices(COMPANIES, COMPANY_WEIGHTS)[0],
+            "v_band_posisi": rng.choices(BAND_POSITIONS, BAND_WEIGHTS)[0],
+            "c_jenis_kelamin": rng.choices([1, 2], [62, 38])[0],
+            "v_employee_group": rng.choices(*zip(*EMPLOYEE_GROUPS))[0],
+            "v_fte": rng.choices(*zip(*FTE_TYPES))[0],
+            "n_jumlah_keluarga": rng.randint(1, 5),
+        })
+    return employees
+
+
+def _record(employee: dict, year: int, month: int, consolidation: str) -> dict:
+    birth = employee["birth"]
+    age = year - birth.year - ((month, 1) < (birth.month, birth.day))
+    record = {key: value for key, value in employee.items() if key != "birth"}
+    record.update({
+        "n_tahun": year,
+        "n_bulan": month,
+        "v_consolidated": consolidation,
+        "n_usia": age,
+        "d_tgl_pensiun": date(birth.year + RETIREMENT_AGE, birth.month, 1).isoformat(),
+    })
+    return record
+
+
+def generate_dataset(folder: str, months: int = 12, rows_per_month: int = 20000, seed: int = 7,
+                     end: date | None = None) -> list:
+    """
+    Writes a synthetic employee_demography source file per month and consolidation, in
+    the layout fetch_all_api_data saves the HCM API responses in.
+
+    Args:
+        folder (str): Output folder.
+        months (int): Number of monthly periods, ending at the current month.
+        rows_per_month (int): Employees per period, split over the consolidations.
+        seed (int): Random seed, the same arguments always produce the same files.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    periods = recent_periods(months, end)
+    paths = []
+    for i, consolidation in enumerate(CONSOLIDATIONS):
+        size = rows_per_month // len(CONSOLIDATIONS) + (i < rows_per_month % len(CONSOLIDATIONS))
+        company = TELKOMSEL_CODE if consolidation == "TELKOMSEL" else None
+        employees = _population(rng, size, periods[0][0], company)
+        for year, month in periods:
+            path = os.path.join(folder, f"HCM_Insight_{year}_{month:02d}_{consolidation}.json")
+            with open(path, "w") as f:
+                json.dump([_record(employee, year, month, consolidation) for employee in employees], f)
+            paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic HCM source files")
+    parser.add_argument("folder")
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--rows", type=int, default=20000, help="employees per month")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    written = generate_dataset(args.folder, args.months, args.rows, args.seed)
+    print(f"{len(written)} files written to {args.folder}")
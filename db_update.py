@@ -1,11 +1,16 @@
 import httpx  # Replaced requests with httpx
 import os
 import json
+import time
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
 from minio import Minio
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from dotenv import load_dotenv
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from loguru import logger
 
 load_dotenv('.env', override=True)
@@ -13,13 +18,19 @@ load_dotenv('.env', override=True)
 # Configuration
 DATA_API_URL = os.getenv('DATA_API_URL')
 BEARER_TOKEN = os.getenv('BEARER_TOKEN')
-DATA_DIR = "/data/"
+DATA_DIR = os.getenv('HCM_DATA_FOLDER', '/app/data')
 # Set Up Minio Keys
 minio_endpoint = os.getenv("MINIO_ENDPOINT")
 minio_bucket = os.getenv("MINIO_BUCKET")
 minio_prefix = os.getenv("MINIO_PREFIX")
 minio_access_key = os.getenv("MINIO_ACCESS_KEY")
 minio_secret_key = os.getenv("MINIO_SECRET_KEY")
+# Concurrent API fetch settings
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "6"))
+FETCH_RATE_PER_HOST = float(os.getenv("FETCH_RATE_PER_HOST", "4"))  # requests per second
+# MinIO sync settings
+MINIO_DOWNLOAD_WORKERS = int(os.getenv("MINIO_DOWNLOAD_WORKERS", "8"))
+MINIO_SYNC_MANIFEST = ".minio_sync_manifest"
 
 def get_previous_year_month():
     now = datetime.now()
@@ -30,122 +41,274 @@ def get_previous_year_month():
     
     return adjusted.year, adjusted.strftime("%m")
 
-@retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=4, max=60))
-def fetch_api_data(year, month, consol):
-    # Generate filename based on input parameters
-    filename = f"HCM_Insight_{year}_{month}_{consol}.json"
-    file_path = os.path.join("/data", filename)
+class HostRateLimiter:
+    """Spaces out requests to the same host so at most `rate` requests start per second"""
+
+    def __init__(self, rate: float = FETCH_RATE_PER_HOST):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, url: str) -> None:
+        host = urlparse(url).netloc
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
 
-    # Check if the file already exists
-    if os.path.exists(file_path):
-        logger.info(f"File {filename} already exists in /data. Skipping API call.")
-        return None  # Return None to indicate that no new data was fetched
 
+def _finalize_download(part_path, file_path):
+    """Validates a streamed API response and keeps only its data, written atomically"""
     try:
-        # Build the API URL and headers
-        url = f"{DATA_API_URL}?n_tahun={year}&n_bulan={month}&limit=13000&v_consolidated={consol}"
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-            "Authorization": f"Bearer {BEARER_TOKEN}"
-        }
-
-        # Make the API request
-        response = httpx.get(url, headers=headers, timeout=httpx.Timeout(10.0, read=30.0))
-        response.raise_for_status()  # Raises exception for HTTP errors
-
-        # Parse JSON response
-        json_response = response.json()
-
-        # Validate API response status
+        with open(part_path, 'rb') as f:
+            json_response = json.load(f)
         if json_response.get('status') != 'success':
             raise ValueError(f"API returned status: {json_response.get('status')}")
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(json_response.get('data', []), f)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=1, min=4, max=60),
+    retry=retry_if_exception_type((httpx.HTTPError, ValueError)),
+    reraise=True
+)
+async def fetch_api_data_async(client, limiter, year, month, consol):
+    """
+    Fetches one month x consolidation from the API into a JSON file. The response body
+    is streamed to disk instead of being held in memory.
 
-        # Return the data from the API
-        return json_response.get('data', [])
+    Returns:
+        tuple: (file path or None if the file already exists, bytes downloaded)
+    """
+    filename = f"HCM_Insight_{year}_{month}_{consol}.json"
+    file_path = os.path.join(DATA_DIR, filename)
 
-    except httpx.RequestError as e:
-        logger.error(f"Network/HTTP error: {e}")
-        raise  # Re-raise to trigger retry or external handling
+    if os.path.exists(file_path):
+        logger.info(f"File {filename} already exists in {DATA_DIR}. Skipping API call.")
+        return None, 0
+
+    url = f"{DATA_API_URL}?n_tahun={year}&n_bulan={month}&limit=13000&v_consolidated={consol}"
+    headers = {
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Authorization": f"Bearer {BEARER_TOKEN}"
+    }
+    part_path = f"{file_path}.part"
+    downloaded = 0
+
+    await limiter.acquire(url)
+    try:
+        async with client.stream("GET", url, headers=headers) as response:
+            response.raise_for_status()
+            with open(part_path, 'wb') as f:
+                async for chunk in response.aiter_bytes():
+                    f.write(chunk)
+                    downloaded += len(chunk)
+    except httpx.HTTPError as e:
+        logger.error(f"Network/HTTP error for {filename}: {e}")
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
 
+    try:
+        await asyncio.to_thread(_finalize_download, part_path, file_path)
     except Exception as e:
-        logger.error(f"Validation error: {e}")
-        raise  # Re-raise to trigger retry or external handling
+        logger.error(f"Validation error for {filename}: {e}")
+        raise
+    return file_path, downloaded
+
+
+async def fetch_all_api_data(year_month_list, consol_list, concurrency=FETCH_CONCURRENCY, transport=None, result=None):
+    """
+    Fetches every (year month, consolidation) pair concurrently over one shared client,
+    with at most `concurrency` requests in flight and per-host rate limiting.
+    Pass a `result` dict to follow the progress while the fetch is running.
 
-def save_to_json(data, year, month, consol):
-    # Ensure data directory exists
+    Returns:
+        dict: "files" fetched, "skipped" pairs already on disk, "failed" pairs and "bytes" downloaded.
+    """
     os.makedirs(DATA_DIR, exist_ok=True)
-    
-    # Create filename with year and month
-    filename = f"HCM_Insight_{year}_{month}_{consol}.json"
-    file_path = os.path.join(DATA_DIR, filename)
-    
-    # Write JSON data to file
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=4)
-    print(f"Data saved to {file_path}")
-    
-    return file_path
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = HostRateLimiter()
+    if result is None:
+        result = {}
+    result.update({"files": [], "skipped": 0, "failed": [], "bytes": 0})
+
+    async def fetch_one(client, year, month, consol):
+        async with semaphore:
+            try:
+                file_path, downloaded = await fetch_api_data_async(client, limiter, year, month, consol)
+            except Exception as e:
+                logger.error(f"Failed to fetch API data for {year} {month} {consol}: {e}")
+                result["failed"].append(f"{year} {month} {consol}")
+                return
+        if file_path is None:
+            result["skipped"] += 1
+        else:
+            result["files"].append(file_path)
+            result["bytes"] += downloaded
+            logger.info(f"API Data {file_path} fetched successfully")
+
+    timeout = httpx.Timeout(10.0, read=30.0)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits, transport=transport) as client:
+        await asyncio.gather(*(
+            fetch_one(client, *year_month.split(), consol)
+            for year_month in year_month_list
+            for consol in consol_list
+        ))
+    return result
+
+
+def _file_md5(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
-def download_minio_data():
+
+def _load_sync_manifest(local_folder):
+    try:
+        with open(os.path.join(local_folder, MINIO_SYNC_MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_sync_manifest(local_folder, manifest):
+    manifest_path = os.path.join(local_folder, MINIO_SYNC_MANIFEST)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def _needs_download(obj, local_file_path, entry):
     """
-    Download all files from a MinIO bucket prefix to a local folder.
+    Decides whether an object has to be fetched, based on its ETag rather than its size:
+    an in-place correction with the same byte count still changes the ETag.
     """
+    if not os.path.exists(local_file_path):
+        return True
+    stat = os.stat(local_file_path)
+    if entry is not None:
+        # Also re-download when the local copy was modified after the last sync
+        return (
+            entry.get("etag") != obj.etag
+            or entry.get("size") != stat.st_size
+            or entry.get("mtime_ns") != stat.st_mtime_ns
+        )
+    # No manifest entry yet (first sync, or files copied by `mc cp`): single-part
+    # uploads have the MD5 of the content as ETag
+    etag = (obj.etag or "").strip('"')
+    if len(etag) == 32 and "-" not in etag and stat.st_size == obj.size:
+        return _file_md5(local_file_path) != etag
+    return True
 
-    # Initialize MinIO client
-    client = Minio(
-        minio_endpoint,
-        access_key=minio_access_key,
-        secret_key=minio_secret_key,
-        secure=True  # Use HTTPS
-    )
-    
-    local_folder = '/data'
-    overwrite = False
-    
-    logger.info(f"Minio Download started from endpoint '{minio_endpoint}' for bucket '{minio_bucket}' with prefix '{minio_prefix}'.")
-    
+
+def _download_object(client, obj, local_file_path):
+    """Streams one object into a temp file and renames it into place. Returns bytes written."""
+    os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
+    part_path = f"{local_file_path}.part"
+    written = 0
+    response = client.get_object(minio_bucket, obj.object_name)
     try:
-        # List objects recursively under the prefix
-        objects = list(client.list_objects(minio_bucket, prefix=minio_prefix, recursive=True))
-        logger.info(f"Found {len(objects)} objects under prefix '{minio_prefix}' in bucket '{minio_bucket}'.")
-
-        if not objects:
-            logger.warning("No objects found to download.")
-            return
-
-        for obj in objects:
-            # Skip directories
-            if obj.is_dir:
-                logger.debug(f"Skipping directory: {obj.object_name}")
-                continue
-
-            # Build local file path
-            relative_path = obj.object_name[len(minio_prefix):]
-            local_file_path = os.path.join(local_folder, relative_path.lstrip('/'))  # Avoid leading slashes
-
-            # Check if file already exists
-            if os.path.exists(local_file_path):
-                local_size = os.path.getsize(local_file_path)
-                remote_size = obj.size
-
-                if local_size == remote_size and not overwrite:
-                    print(f"⏭️ Skipping (already exists and same size): {local_file_path}")
+        with open(part_path, 'wb') as f:
+            for chunk in response.stream(1024 * 1024):
+                f.write(chunk)
+                written += len(chunk)
+        os.replace(part_path, local_file_path)
+    finally:
+        response.close()
+        response.release_conn()
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return written
+
+
+def download_minio_data(client=None, local_folder=DATA_DIR, workers=MINIO_DOWNLOAD_WORKERS):
+    """
+    Sync all files from a MinIO bucket prefix to a local folder.
+
+    Objects are compared by ETag against a local sync manifest and only new or
+    changed ones are downloaded, concurrently on a bounded thread pool. Each
+    download goes to a temp file that is renamed into place.
+
+    Returns:
+        dict: Sync statistics (downloaded, skipped, failed, bytes, seconds, throughput).
+    """
+    if client is None:
+        # Initialize MinIO client
+        client = Minio(
+            minio_endpoint,
+            access_key=minio_access_key,
+            secret_key=minio_secret_key,
+            secure=True  # Use HTTPS
+        )
+
+    stats = {"downloaded": [], "skipped": 0, "failed": [], "bytes": 0, "seconds": 0.0, "throughput_mb_s": 0.0}
+    started = time.perf_counter()
+    logger.info(f"Minio sync started from endpoint '{minio_endpoint}' for bucket '{minio_bucket}' with prefix '{minio_prefix}'.")
+
+    os.makedirs(local_folder, exist_ok=True)
+    manifest = _load_sync_manifest(local_folder)
+    prefix = minio_prefix or ""
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="minio-sync") as pool:
+            futures = {}
+            # The listing is consumed lazily, downloads start while it is still being paged
+            for obj in client.list_objects(minio_bucket, prefix=minio_prefix, recursive=True):
+                # Skip directories
+                if obj.is_dir:
                     continue
-                elif overwrite:
-                    print(f"🔁 Overwriting file: {local_file_path}")
-                else:
-                    print(f"⚠️ File size differs. Re-downloading: {local_file_path}")
 
-            # Create parent directory if needed
-            os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
+                # Build local file path
+                relative_path = obj.object_name[len(prefix):]
+                local_file_path = os.path.join(local_folder, relative_path.lstrip('/'))  # Avoid leading slashes
 
-            # Download the file
-            print(f"📥 Downloading {obj.object_name} → {local_file_path}")
-            client.fget_object(minio_bucket, obj.object_name, local_file_path)
+                if not _needs_download(obj, local_file_path, manifest.get(obj.object_name)):
+                    stats["skipped"] += 1
+                    if obj.object_name not in manifest:
+                        local_stat = os.stat(local_file_path)
+                        manifest[obj.object_name] = {"etag": obj.etag, "size": local_stat.st_size, "mtime_ns": local_stat.st_mtime_ns}
+                    continue
 
-        print("✅ All files processed.")
+                futures[pool.submit(_download_object, client, obj, local_file_path)] = (obj, local_file_path)
 
-    except Exception as e:
-        print(f"❌ Error downloading files: {e}")
-        logger.exception("Exception occurred during MinIO download.")
\ No newline at end of file
+            for future in as_completed(futures):
+                obj, local_file_path = futures[future]
+                try:
+                    stats["bytes"] += future.result()
+                except Exception as e:
+                    logger.error(f"Failed to download {obj.object_name}: {e}")
+                    stats["failed"].append(obj.object_name)
+                    continue
+                local_stat = os.stat(local_file_path)
+                manifest[obj.object_name] = {"etag": obj.etag, "size": local_stat.st_size, "mtime_ns": local_stat.st_mtime_ns}
+                stats["downloaded"].append(local_file_path)
+                logger.debug(f"Downloaded {obj.object_name} -> {local_file_path}")
+
+    except Exception:
+        logger.exception("Exception occurred during MinIO download.")
+    finally:
+        _save_sync_manifest(local_folder, manifest)
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    if stats["seconds"] > 0:
+        stats["throughput_mb_s"] = round(stats["bytes"] / stats["seconds"] / (1024 * 1024), 2)
+    logger.info(
+        f"Minio sync finished: {len(stats['downloaded'])} downloaded, {stats['skipped']} unchanged, "
+        f"{len(stats['failed'])} failed, {stats['bytes']} bytes in {stats['seconds']}s ({stats['throughput_mb_s']} MB/s)"
+    )
+    return stats
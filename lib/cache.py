@@ -0,0 +1,93 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+# Cache configuration
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '512'))
+CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', '86400'))
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache where every entry also expires after a fixed TTL"""
+
+    def __init__(self, name: str, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] < now:
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class InsightCache:
+    """
+    Three-tier cache for the insight pipeline:
+        sql     - (normalized query, month, year, schema hash) -> generated SQL
+        rows    - (SQL, data version) -> (result columns, rows)
+        insight - (normalized query, month, year, rows digest) -> insight text
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.sql = TTLCache("sql", max_entries, ttl)
+        self.rows = TTLCache("rows", max_entries, ttl)
+        self.insight = TTLCache("insight", max_entries, ttl)
+
+    def clear(self) -> None:
+        for tier in (self.sql, self.rows, self.insight):
+            tier.clear()
+
+    def stats(self) -> dict:
+        return {tier.name: tier.stats() for tier in (self.sql, self.rows, self.insight)}
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different questions share a key"""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def schema_hash(columns_list: list) -> str:
+    return hashlib.sha256("\x1f".join(columns_list).encode()).hexdigest()[:16]
+
+
+def rows_digest(rows: list) -> str:
+    return hashlib.sha256(repr(rows).encode()).hexdigest()
+
+
+insight_cache = InsightCache()
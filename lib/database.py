@@ -0,0 +1,179 @@
+import os
+import queue
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+from lib.db_versions import resolve_database, data_version
+from lib.metrics import SQL_QUERY_PLANS
+from lib.sql_guard import (
+    SQLValidationError, QueryBudget, validate_sql, read_only_authorizer, explain_plan_rows, check_query_plan, fetch_limited,
+    derived_tables, stored_table_scan
+)
+
+# Read pool configuration
+SQLITE_READ_POOL_SIZE = int(os.getenv('SQLITE_READ_POOL_SIZE', '4'))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', str(64 * 1024)))
+
+
+def record_query_plan(sql: str, plan: list) -> list:
+    """
+    Counts the query in SQL_QUERY_PLANS and logs its plan, with a warning when it scans a
+    stored table in full, so the LLM queries that still do can be found.
+
+    Args:
+        plan (list): (id, parent, detail) rows from explain_plan_rows.
+
+    Returns:
+        list: Plan steps that scan a stored table in full.
+    """
+    derived = derived_tables(plan)
+    details = [detail for _, _, detail in plan]
+    full_scans = [detail for detail in details if stored_table_scan(detail, derived)]
+    SQL_QUERY_PLANS.inc(full_scan="true" if full_scans else "false")
+    if full_scans:
+        logger.warning(f"Query scans the whole table ({'; '.join(full_scans)}): {sql}")
+    else:
+        logger.debug(f"Query plan: {details}")
+    return full_scans
+
+
+class ReadOnlyPool:
+    """
+    Pool of read-only SQLite connections with a bounded thread pool to run queries on,
+    so SQL execution never blocks the event loop.
+    """
+
+    def __init__(self, db_path: str, size: int = SQLITE_READ_POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle: queue.SimpleQueue = queue.SimpleQueue()
+        self._generation = 0
+        self._version = data_version(db_path)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="sqlite-read")
+
+    def _connect(self) -> sqlite3.Connection:
+        path = resolve_database(self.db_path)
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        conn.execute("PRAGMA query_only=ON")
+        conn.set_authorizer(read_only_authorizer)
+        return conn
+
+    def _acquire(self) -> tuple:
+        # Move to a newly published database version between queries; queries
+        # already running keep their connection to the previous version.
+        version = data_version(self.db_path)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    logger.info(f"Read pool switching to database version {version}")
+                    self._version = version
+                    self._generation += 1
+        while True:
+            try:
+                generation, conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._generation, self._connect()
+            if generation == self._generation:
+                return generation, conn
+            conn.close()
+
+    def _release(self, generation: int, conn: sqlite3.Connection) -> None:
+        if generation == self._generation:
+            self._idle.put((generation, conn))
+        else:
+            conn.close()
+
+    def _execute(self, sql: str) -> tuple:
+        sql = validate_sql(sql)
+        generation, conn = self._acquire()
+        try:
+            try:
+                plan = explain_plan_rows(conn, sql)
+            except sqlite3.DatabaseError as e:
+                if "not authorized" in str(e):
+                    raise SQLValidationError(f"Statement is not read-only: {e}") from e
+                # Let the real execution below report the error
+                logger.debug(f"EXPLAIN QUERY PLAN failed: {e}")
+                plan = None
+            if plan is not None:
+                record_query_plan(sql, plan)
+                check_query_plan(plan)
+            cursor = conn.cursor()
+            try:
+                with QueryBudget(conn):
+                    cursor.execute(sql)
+                    rows = fetch_limited(cursor)
+                columns = [col[0] for col in cursor.description or ()]
+            finally:
+                cursor.close()
+            return columns, rows
+        finally:
+            self._release(generation, conn)
+
+    async def execute(self, sql: str) -> tuple:
+        """
+        Runs a query on the pool's threads, under the checks and budget of lib.sql_guard.
+
+        Returns:
+            tuple: (column names, rows)
+
+        Raises:
+            SQLGuardError: When the query is refused, interrupted or returns too many rows.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._execute, sql)
+
+    def reset(self) -> None:
+        """Retire all current connections, e.g. after the database has been reloaded"""
+        with self._lock:
+            self._generation += 1
+        while True:
+            try:
+                _, conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self.reset()
+
+
+_read_pool: ReadOnlyPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_read_pool(db_path: str) -> ReadOnlyPool:
+    global _read_pool
+    with _pool_lock:
+        if _read_pool is None or _read_pool.db_path != db_path:
+            if _read_pool is not None:
+                _read_pool.close()
+            _read_pool = ReadOnlyPool(db_path)
+            logger.info(f"SQLite read pool opened for {db_path} with {_read_pool.size} connections")
+        return _read_pool
+
+
+def reset_read_pool() -> None:
+    if _read_pool is not None:
+        _read_pool.reset()
+
+
+def close_read_pool() -> None:
+    global _read_pool
+    with _pool_lock:
+        if _read_pool is not None:
+            _read_pool.close()
+            _read_pool = None
+            logger.info("SQLite read pool closed")
+
+
+async def execute_query(db_path: str, sql: str) -> tuple:
+    """Runs a read-only query without blocking the event loop. Returns (column names, rows)."""
+    return await get_read_pool(db_path).execute(sql)
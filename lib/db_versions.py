@@ -0,0 +1,132 @@
+import os
+import glob
+import sqlite3
+from datetime import datetime
+from loguru import logger
+
+# How many published database versions to keep on disk (current + previous)
+KEEP_DATABASE_VERSIONS = int(os.getenv('KEEP_DATABASE_VERSIONS', '2'))
+
+
+def pointer_path(db_path: str) -> str:
+    return f"{db_path}.current"
+
+
+def version_path(db_path: str, version: str) -> str:
+    base, ext = os.path.splitext(db_path)
+    return f"{base}.{version}{ext}"
+
+
+def _read_pointer(db_path: str) -> str | None:
+    try:
+        with open(pointer_path(db_path)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def resolve_database(db_path: str) -> str:
+    """
+    Returns the file readers should open for the logical database path: the version
+    named by the pointer file, or the plain db_path when nothing was published yet.
+    """
+    version = _read_pointer(db_path)
+    if version:
+        path = version_path(db_path, version)
+        if os.path.exists(path):
+            return path
+    return db_path
+
+
+def data_version(db_path: str) -> str | None:
+    """Version token of the database, changes whenever a new version is published"""
+    version = _read_pointer(db_path)
+    if version:
+        return version
+    # Databases written before versioning: use the file's identity instead
+    try:
+        stat = os.stat(db_path)
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def _copy_database(source: str, target: str) -> None:
+    """Consistent copy through the SQLite backup API"""
+    src = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def publish_version(db_path: str, version: str) -> None:
+    """Atomically points readers at a new version by replacing the pointer file"""
+    tmp_pointer = f"{pointer_path(db_path)}.tmp"
+    with open(tmp_pointer, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, pointer_path(db_path))
+
+
+def cleanup_versions(db_path: str, keep: int = KEEP_DATABASE_VERSIONS) -> None:
+    """Removes old published versions. Readers still holding them open keep working (POSIX unlink)."""
+    base, ext = os.path.splitext(db_path)
+    current = resolve_database(db_path)
+    versions = sorted(glob.glob(f"{glob.escape(base)}.*{ext}"), reverse=True)
+    versions = [path for path in versions if path != db_path]
+    stale = [path for path in versions if path != current][max(keep - 1, 0):]
+    for path in stale:
+        try:
+            os.remove(path)
+            logger.debug(f"Removed old database version {path}")
+        except OSError as e:
+            logger.warning(f"Could not remove old database version {path}: {e}")
+
+
+def build_version(db_path: str, build, copy_current: bool = True, unchanged=None) -> tuple:
+    """
+    Builds a new database version off to the side and publishes it atomically.
+
+    The current version (if any) is copied to a temporary file, build(path) applies
+    its changes to that copy and returns (result, changed). Only when changed is
+    true is the file renamed into its versioned name and the pointer swapped;
+    otherwise the copy is discarded and readers never notice anything.
+
+    unchanged(path), when given, is called on the current version before anything is
+    copied. A non-None return value means there is nothing to build: it is returned
+    as the result and the copy is skipped.
+
+    Returns:
+        tuple: (build result, published file path or None)
+    """
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    target = version_path(db_path, version)
+    building = f"{target}.building"
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+    current = resolve_database(db_path)
+    if unchanged is not None and os.path.exists(current):
+        result = unchanged(current)
+        if result is not None:
+            return result, None
+    try:
+        if copy_current and os.path.exists(current):
+            _copy_database(current, building)
+        result, changed = build(building)
+        if not changed:
+            os.remove(building)
+            return result, None
+        os.replace(building, target)
+    except Exception:
+        if os.path.exists(building):
+            os.remove(building)
+        raise
+
+    publish_version(db_path, version)
+    logger.info(f"Published database version {version} ({target})")
+    cleanup_versions(db_path)
+    return result, target
@@ -0,0 +1,386 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import multiprocessing
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from loguru import logger
+from lib.summary import refresh_summaries, rebuild_summaries, summaries_exist
+
+MANIFEST_TABLE = "ingest_manifest"
+# Every source file holds exactly one (year, month, consolidation) snapshot
+PARTITION_COLUMNS = ("n_tahun", "n_bulan", "v_consolidated")
+
+# Parallel ingest configuration
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', str(min(4, os.cpu_count() or 1))))
+INGEST_CHUNK_ROWS = int(os.getenv('INGEST_CHUNK_ROWS', '5000'))
+
+# Composite indexes for the access patterns the SQL prompt steers the LLM toward.
+# Each entry is (index suffix, columns); the leading period columns let SQLite seek
+# straight to one month instead of scanning every month x consolidation snapshot.
+INDEX_DEFINITIONS = [
+    ("period_consol_company", ("n_tahun", "n_bulan", "v_consolidated", "v_company_code")),
+    ("period_company", ("n_tahun", "n_bulan", "v_company_code", "c_jenis_kelamin")),
+    ("period_gender", ("n_tahun", "n_bulan", "c_jenis_kelamin", "n_jumlah_keluarga")),
+    ("period_age", ("n_tahun", "n_bulan", "n_usia")),
+    ("period_band", ("n_tahun", "n_bulan", "v_band_posisi")),
+    ("company_period", ("v_company_code", "n_tahun", "n_bulan")),
+]
+
+
+def create_indexes(conn: sqlite3.Connection, table_name: str) -> list:
+    """
+    Creates the composite indexes for the table and refreshes the planner statistics.
+    Indexes referring to columns the table does not have are skipped.
+
+    Returns:
+        list: Names of the indexes present after the call.
+    """
+    existing_columns = {col[1] for col in conn.execute(f"PRAGMA table_info({table_name})")}
+    created = []
+    for suffix, columns in INDEX_DEFINITIONS:
+        missing = [col for col in columns if col not in existing_columns]
+        if missing:
+            logger.debug(f"Skipping index {suffix}: {missing} not in {table_name}")
+            continue
+        index_name = f"idx_{table_name}_{suffix}"
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({', '.join(columns)})"
+        )
+        created.append(index_name)
+
+    conn.execute(f"ANALYZE {table_name}")
+    logger.info(f"Indexes ready on {table_name}: {created}")
+    return created
+
+
+@dataclass
+class SourceFile:
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str | None = None
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+
+@dataclass
+class IngestResult:
+    ingested: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    failed: list = field(default_factory=list)
+    removed: list = field(default_factory=list)  # files gone from the source folder
+    rows: int = 0
+    duration: float = 0.0
+    summaries_rebuilt: bool = False
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.ingested) or bool(self.removed) or self.summaries_rebuilt
+
+
+def process_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """Standard processing for dataframes containing 'n_usia' column"""
+    df['n_usia'] = pd.to_numeric(df['n_usia'], errors='coerce')
+    df['n_usia'] = df['n_usia'].fillna(-1).astype(int)
+    df['n_usia'] = df['n_usia'].round().astype(int)
+    return df
+
+
+def read_source_file(path: str) -> pd.DataFrame:
+    df = pd.read_json(path, encoding='latin1')
+    return process_dataframe(df)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def ensure_manifest(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        f"""CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            file_name TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            ingested_at REAL NOT NULL,
+            partitions TEXT
+        )"""
+    )
+
+
+def find_changed_files(conn: sqlite3.Connection, paths: list) -> tuple:
+    """
+    Compares source files against the manifest. Size and mtime are checked first;
+    the content hash is only computed when they differ, so a touched but identical
+    file is not re-ingested.
+
+    Returns:
+        tuple: (changed SourceFiles, unchanged SourceFiles)
+    """
+    manifest = {
+        row[0]: row[1:]
+        for row in conn.execute(f"SELECT file_name, size, mtime_ns, sha256 FROM {MANIFEST_TABLE}")
+    }
+    changed, unchanged = [], []
+    for path in sorted(paths):
+        stat = os.stat(path)
+        source = SourceFile(path=path, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        known = manifest.get(source.name)
+        if known and known[0] == source.size and known[1] == source.mtime_ns:
+            source.sha256 = known[2]
+            unchanged.append(source)
+            continue
+        source.sha256 = file_sha256(path)
+        if known and known[2] == source.sha256:
+            # Same content with a new mtime, only the manifest needs refreshing
+            conn.execute(
+                f"UPDATE {MANIFEST_TABLE} SET size = ?, mtime_ns = ? WHERE file_name = ?",
+                (source.size, source.mtime_ns, source.name)
+            )
+            unchanged.append(source)
+        else:
+            changed.append(source)
+    return changed, unchanged
+
+
+def unchanged_sources(db_path: str, table_name: str, paths: list) -> "IngestResult | None":
+    """
+    Read-only check whether ingest_files would leave the database as it is: the table
+    and its summaries exist and the source files are exactly those of the manifest, with
+    the same size and mtime. Lets a caller skip copying the database for a build with
+    nothing to do.
+
+    Returns:
+        IngestResult | None: All files as unchanged, or None when there is work to do.
+    """
+    if not os.path.exists(db_path):
+        return None
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        table = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+        ).fetchone()
+        if table is None or not summaries_exist(conn, table_name):
+            return None
+        manifest = {
+            row[0]: row[1:]
+            for row in conn.execute(f"SELECT file_name, size, mtime_ns FROM {MANIFEST_TABLE}")
+        }
+    except sqlite3.OperationalError:
+        # No manifest yet
+        return None
+    finally:
+        conn.close()
+
+    if set(manifest) != {os.path.basename(path) for path in paths}:
+        return None
+    result = IngestResult()
+    for path in sorted(paths):
+        stat = os.stat(path)
+        if manifest.get(os.path.basename(path)) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        result.unchanged.append(os.path.basename(path))
+    return result
+
+
+def _table_columns(conn: sqlite3.Connection, table_name: str) -> list:
+    return [col[1] for col in conn.execute(f"PRAGMA table_info({table_name})")]
+
+
+def ensure_table(conn: sqlite3.Connection, table_name: str, df: pd.DataFrame) -> None:
+    """Creates the table from the frame's dtypes, or adds columns the table does not have yet"""
+    existing = _table_columns(conn, table_name)
+    if not existing:
+        conn.execute(pd.io.sql.get_schema(df, table_name))
+        return
+    new_columns = [col for col in df.columns if col not in existing]
+    if new_columns:
+        column_types = pd.io.sql.get_schema(df[new_columns], table_name).splitlines()[1:-1]
+        for definition in column_types:
+            conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {definition.strip().rstrip(',')}")
+        logger.info(f"Added columns {new_columns} to {table_name}")
+
+
+def _to_records(df: pd.DataFrame) -> list:
+    """Converts a frame into sqlite3-compatible tuples (native types, None for missing values)"""
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+    df = df.astype(object).where(df.notna(), None)
+    return list(df.itertuples(index=False, name=None))
+
+
+@dataclass
+class ParsedFile:
+    """A source file parsed in a worker process, ready to be written by the parent"""
+    source: SourceFile
+    template: pd.DataFrame | None = None  # zero-row frame carrying the column names and dtypes
+    partitions: list = field(default_factory=list)
+    records: list = field(default_factory=list)
+    error: str | None = None
+
+
+def parse_source_file(source: SourceFile) -> ParsedFile:
+    """Reads, processes and converts one source file. Runs in the ingest process pool."""
+    try:
+        df = read_source_file(source.path)
+    except Exception as e:
+        return ParsedFile(source=source, error=f"Failed to process file {source.path}: {e}")
+    missing = [col for col in PARTITION_COLUMNS if col not in df.columns]
+    if missing:
+        return ParsedFile(source=source, error=f"File {source.path} has no partition columns {missing}")
+    return ParsedFile(
+        source=source,
+        template=df.iloc[:0],
+        partitions=_to_records(df[list(PARTITION_COLUMNS)].drop_duplicates()),
+        records=_to_records(df)
+    )
+
+
+def iter_parsed_files(sources: list, workers: int = INGEST_WORKERS):
+    """
+    Parses source files on a process pool and yields them as they finish. At most
+    two files per worker are in flight, so memory stays bounded by the window size
+    rather than by the number of files.
+    """
+    if workers <= 1 or len(sources) <= 1:
+        for source in sources:
+            yield parse_source_file(source)
+        return
+
+    pending_sources = iter(sources)
+    window = workers * 2
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        in_flight = set()
+        for source in pending_sources:
+            in_flight.add(pool.submit(parse_source_file, source))
+            if len(in_flight) >= window:
+                break
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            # Keep the workers busy while the parent writes the finished files
+            for source in pending_sources:
+                in_flight.add(pool.submit(parse_source_file, source))
+                if len(in_flight) >= window:
+                    break
+            for future in done:
+                yield future.result()
+
+
+def insert_records(conn: sqlite3.Connection, table_name: str, columns: list, records: list,
+                   chunk_rows: int = INGEST_CHUNK_ROWS) -> int:
+    column_names = ", ".join(f'"{col}"' for col in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    statement = f"INSERT INTO {table_name} ({column_names}) VALUES ({placeholders})"
+    for start in range(0, len(records), chunk_rows):
+        conn.executemany(statement, records[start:start + chunk_rows])
+    return len(records)
+
+
+def replace_partitions(conn: sqlite3.Connection, table_name: str, parsed: ParsedFile) -> int:
+    """Deletes the (n_tahun, n_bulan, v_consolidated) partitions of a parsed file, then inserts its rows"""
+    delete_partitions(conn, table_name, parsed.partitions)
+    return insert_records(conn, table_name, list(parsed.template.columns), parsed.records)
+
+
+def record_manifest(conn: sqlite3.Connection, source: SourceFile, row_count: int, partitions: list) -> None:
+    conn.execute(
+        f"INSERT OR REPLACE INTO {MANIFEST_TABLE} "
+        f"(file_name, size, mtime_ns, sha256, row_count, ingested_at, partitions) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (source.name, source.size, source.mtime_ns, source.sha256, row_count, time.time(), json.dumps(partitions))
+    )
+
+
+def manifest_partitions(conn: sqlite3.Connection) -> dict:
+    """Partitions each file of the manifest holds, as a set of (n_tahun, n_bulan, v_consolidated)"""
+    return {
+        file_name: {tuple(partition) for partition in json.loads(partitions or "[]")}
+        for file_name, partitions in conn.execute(f"SELECT file_name, partitions FROM {MANIFEST_TABLE}")
+    }
+
+
+def delete_partitions(conn: sqlite3.Connection, table_name: str, partitions) -> None:
+    condition = " AND ".join(f"{col} = ?" for col in PARTITION_COLUMNS)
+    for partition in partitions:
+        conn.execute(f"DELETE FROM {table_name} WHERE {condition}", partition)
+
+
+def ingest_files(db_path: str, table_name: str, paths: list) -> IngestResult:
+    """
+    Incrementally loads JSON source files into the table. Only files that are new or
+    changed according to the manifest are parsed (in parallel, see iter_parsed_files),
+    and each one replaces just its own partitions. Rows are written in executemany
+    chunks as files finish parsing, all in one transaction. paths is the complete set
+    of source files: partitions no file holds any more, because a corrected file
+    dropped them or the file was deleted, are deleted. The summary tables (see
+    lib.summary) are recomputed for the replaced and deleted partitions only.
+    """
+    started = time.perf_counter()
+    result = IngestResult()
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        ensure_manifest(conn)
+        changed, unchanged = find_changed_files(conn, paths)
+        result.unchanged = [source.name for source in unchanged]
+        previous = manifest_partitions(conn)
+        partitions = set()
+
+        for parsed in iter_parsed_files(changed):
+            source = parsed.source
+            if parsed.error:
+                logger.error(parsed.error)
+                result.failed.append(source.name)
+                continue
+            ensure_table(conn, table_name, parsed.template)
+            row_count = replace_partitions(conn, table_name, parsed)
+            partitions.update(parsed.partitions)
+            record_manifest(conn, source, row_count, parsed.partitions)
+            result.ingested.append(source.name)
+            result.rows += row_count
+
+        names = {os.path.basename(path) for path in paths}
+        result.removed = sorted(set(previous) - names)
+        conn.executemany(f"DELETE FROM {MANIFEST_TABLE} WHERE file_name = ?", [(name,) for name in result.removed])
+        # Partitions held before that no file of the manifest holds any more
+        held = set().union(*manifest_partitions(conn).values())
+        stale = set().union(*previous.values()) - held
+        if stale:
+            delete_partitions(conn, table_name, stale)
+            partitions.update(stale)
+            logger.info(f"Deleted {len(stale)} partitions no source file holds any more: {sorted(stale)}")
+
+        if result.ingested or stale:
+            create_indexes(conn, table_name)
+            refresh_summaries(conn, table_name, partitions)
+        elif not summaries_exist(conn, table_name):
+            # Database from before the summary tables existed
+            rebuild_summaries(conn, table_name)
+            result.summaries_rebuilt = True
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    result.duration = time.perf_counter() - started
+    logger.info(
+        f"Ingest finished in {result.duration:.2f}s: {len(result.ingested)} files ingested "
+        f"({result.rows} rows), {len(result.unchanged)} unchanged, {len(result.removed)} removed, "
+        f"{len(result.failed)} failed"
+    )
+    return result
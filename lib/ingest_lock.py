@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import fcntl
+import hashlib
+import threading
+from loguru import logger
+from lib.db_versions import data_version
+
+
+def lock_path(db_path: str) -> str:
+    return f"{db_path}.ingest.lock"
+
+
+def ready_marker_path(db_path: str) -> str:
+    return f"{db_path}.ready"
+
+
+class IngestLock:
+    """
+    Exclusive lock on a database's ingest, held by one thread of one process at a time
+    (fcntl.flock on a lock file next to the database). Reentrant for the thread holding
+    it, so a startup load can hold it around the ingest functions that take it too.
+    The OS drops the lock when the holding process dies.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._thread_lock.acquire(blocking=blocking):
+            return False
+        if self._depth == 0:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            lock_file = open(self.path, "a+")
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BaseException:
+                lock_file.close()
+                self._thread_lock.release()
+                if not blocking:
+                    return False
+                raise
+            self._file = lock_file
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+_ingest_locks: dict = {}
+_ingest_locks_guard = threading.Lock()
+
+
+def ingest_lock(db_path: str) -> IngestLock:
+    """The process-wide IngestLock of a logical database path"""
+    path = lock_path(db_path)
+    with _ingest_locks_guard:
+        lock = _ingest_locks.get(path)
+        if lock is None:
+            lock = _ingest_locks[path] = IngestLock(path)
+        return lock
+
+
+def source_fingerprint(paths: list) -> str:
+    """Identity of a set of source files by name, size and mtime"""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        digest.update(f"{os.path.basename(path)}\x1f{stat.st_size}\x1f{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def write_ready_marker(db_path: str, fingerprint: str) -> None:
+    """Records that the current database version holds the source files with this fingerprint"""
+    marker = {
+        "data_version": data_version(db_path),
+        "sources": fingerprint,
+        "pid": os.getpid(),
+        "written_at": time.time(),
+    }
+    tmp_path = f"{ready_marker_path(db_path)}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(marker, f)
+    os.replace(tmp_path, ready_marker_path(db_path))
+
+
+def ready_marker_matches(db_path: str, fingerprint: str) -> bool:
+    """True when the published database version already holds exactly these source files"""
+    try:
+        with open(ready_marker_path(db_path)) as f:
+            marker = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (
+        marker.get("sources") == fingerprint
+        and marker.get("data_version") is not None
+        and marker.get("data_version") == data_version(db_path)
+    )
+
+
+def load_once(db_path: str, fingerprint, load) -> bool:
+    """
+    Runs the initial data load in a single worker. The first worker to take the ingest
+    lock loads; the others block on the lock and, once the leader has published its
+    ready marker for the same source files, start without loading anything. Should the
+    leader die, the next worker to get the lock loads instead.
+
+    Args:
+        db_path (str): Logical path of the SQLite database.
+        fingerprint: Callable returning the source_fingerprint of the current source files.
+        load: Callable doing the load; expected to write the ready marker when it succeeds.
+
+    Returns:
+        bool: Whether this worker ran load.
+    """
+    if ready_marker_matches(db_path, fingerprint()):
+        logger.info("Database already holds the current source files, nothing to load")
+        return False
+
+    lock = ingest_lock(db_path)
+    if not lock.acquire(blocking=False):
+        logger.info("Another worker is loading the data, waiting for it to finish")
+        started = time.monotonic()
+        lock.acquire()
+        logger.info(f"Waited {time.monotonic() - started:.1f}s for the data load of another worker")
+    try:
+        if ready_marker_matches(db_path, fingerprint()):
+            logger.info("Data loaded by another worker")
+            return False
+        load()
+        return True
+    finally:
+        lock.release()
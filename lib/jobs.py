@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict, fields
+from loguru import logger
+from lib.single_flight import SINGLE_FLIGHT_DB
+
+JOB_HISTORY_SIZE = 20
+# Job state shared by the uvicorn workers, in a SQLite file next to the single-flight leases
+DATA_UPDATE_JOBS_DB = os.getenv(
+    'DATA_UPDATE_JOBS_DB', os.path.join(os.path.dirname(SINGLE_FLIGHT_DB), 'HCM_Insight_jobs.db')
+)
+# A running job is saved every heartbeat; one not saved for the stale period lost its worker
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', '2'))
+JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', '60'))
+
+
+@dataclass
+class DataUpdateJob:
+    job_id: str
+    status: str = "running"  # running, succeeded, failed
+    stage: str | None = None
+    started_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    files_fetched: list = field(default_factory=list)
+    files_skipped: int = 0
+    bytes_downloaded: int = 0
+    failures: list = field(default_factory=list)
+    durations: dict = field(default_factory=dict)  # seconds per stage
+    ingested_files: int = 0
+    minio: dict = field(default_factory=dict)  # MinIO sync statistics
+    error: str | None = None
+
+    @property
+    def active(self) -> bool:
+        return self.status == "running"
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DataUpdateJob":
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+
+class SharedJobStore:
+    """
+    Job table shared by all workers on the host, so any worker answers status polls and
+    at most one data update runs at a time. The worker running a job saves it on every
+    heartbeat; a running job whose heartbeat stopped is reported as failed.
+    """
+
+    def __init__(self, path: str, history_size: int = JOB_HISTORY_SIZE, stale_seconds: float = JOB_STALE_SECONDS):
+        self.path = path
+        self.history_size = history_size
+        self.stale_seconds = stale_seconds
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+            "started_at REAL NOT NULL, heartbeat_at REAL NOT NULL, state TEXT NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # Called from asyncio.to_thread, so every thread gets its own connection
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def _load(self, state: str, status: str, heartbeat_at: float) -> DataUpdateJob:
+        job = DataUpdateJob.from_dict(json.loads(state))
+        if status == "running" and heartbeat_at < time.time() - self.stale_seconds:
+            job.status = "failed"
+            job.stage = None
+            job.error = job.error or "The worker running the job stopped"
+        return job
+
+    def claim(self, job: DataUpdateJob) -> DataUpdateJob | None:
+        """
+        Records job as the running job, unless another job is still running.
+
+        Returns:
+            DataUpdateJob | None: The job already running, or None when job was recorded.
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT state, status, heartbeat_at FROM jobs WHERE status = 'running' AND heartbeat_at >= ? "
+                "ORDER BY started_at DESC LIMIT 1",
+                (now - self.stale_seconds,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("COMMIT")
+                return self._load(*row)
+            # Jobs of workers that died are closed before a new one starts
+            for job_id, state, status, heartbeat_at in conn.execute(
+                "SELECT job_id, state, status, heartbeat_at FROM jobs WHERE status = 'running'"
+            ).fetchall():
+                stale = self._load(state, status, heartbeat_at)
+                conn.execute(
+                    "UPDATE jobs SET status = ?, state = ? WHERE job_id = ?",
+                    (stale.status, json.dumps(stale.to_dict()), job_id)
+                )
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, started_at, heartbeat_at, state) VALUES (?, ?, ?, ?, ?)",
+                (job.job_id, job.status, job.started_at, now, json.dumps(job.to_dict()))
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE job_id NOT IN (SELECT job_id FROM jobs ORDER BY started_at DESC LIMIT ?)",
+                (self.history_size,)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return None
+
+    def save(self, job: DataUpdateJob) -> None:
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, heartbeat_at = ?, state = ? WHERE job_id = ?",
+            (job.status, time.time(), json.dumps(job.to_dict()), job.job_id)
+        )
+
+    def get(self, job_id: str) -> DataUpdateJob | None:
+        row = self._conn().execute(
+            "SELECT state, status, heartbeat_at FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return self._load(*row) if row else None
+
+
+class JobManager:
+    """
+    Runs data update jobs in the background, one at a time across the workers. Starting
+    a job while another one is active returns the active job instead of starting a
+    second one. Without the shared store (see SharedJobStore) jobs are tracked per worker.
+    """
+
+    def __init__(self, history_size: int = JOB_HISTORY_SIZE, store_path: str | None = DATA_UPDATE_JOBS_DB):
+        self.history_size = history_size
+        self.store_path = store_path
+        self._store: SharedJobStore | None = None
+        self._store_failed = False
+        self._jobs: OrderedDict = OrderedDict()
+        self._current: DataUpdateJob | None = None
+        self._tasks = set()
+
+    def _get_store(self) -> SharedJobStore | None:
+        if self._store is None and self.store_path and not self._store_failed:
+            try:
+                self._store = SharedJobStore(self.store_path, history_size=self.history_size)
+            except Exception as e:
+                self._store_failed = True
+                logger.warning(f"Shared data update jobs disabled, cannot open {self.store_path}: {e}")
+        return self._store
+
+    async def start(self, runner) -> tuple:
+        """
+        Args:
+            runner: Coroutine function taking the DataUpdateJob, which it updates as it goes.
+
+        Returns:
+            tuple: (job, created) where created is False if an active job was reused.
+        """
+        if self._current is not None and self._current.active:
+            return self._current, False
+
+        job = DataUpdateJob(job_id=uuid.uuid4().hex)
+        store = self._get_store()
+        if store is not None:
+            active = await asyncio.to_thread(store.claim, job)
+            if active is not None:
+                return active, False
+
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self.history_size:
+            self._jobs.popitem(last=False)
+        self._current = job
+
+        task = asyncio.create_task(self._run(job, runner))
+        # Keep a reference so the task is not garbage collected while running
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job, True
+
+    async def _save(self, job: DataUpdateJob) -> None:
+        if self._store is None:
+            return
+        try:
+            await asyncio.to_thread(self._store.save, job)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to save data update job {job.job_id}: {e}")
+
+    async def _heartbeat(self, job: DataUpdateJob) -> None:
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            await self._save(job)
+
+    async def _run(self, job: DataUpdateJob, runner) -> None:
+        logger.info(f"Data update job {job.job_id} started")
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            await runner(job)
+            job.status = "succeeded"
+        except Exception as e:
+            logger.exception(f"Data update job {job.job_id} failed")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            heartbeat.cancel()
+            job.stage = None
+            job.finished_at = time.time()
+            await self._save(job)
+            logger.info(f"Data update job {job.job_id} {job.status} in {job.finished_at - job.started_at:.1f}s")
+
+    async def get(self, job_id: str) -> DataUpdateJob | None:
+        # Jobs of this worker are read in memory, they are fresher than their last save
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        store = self._get_store()
+        if store is None:
+            return None
+        return await asyncio.to_thread(store.get, job_id)
+
+    @property
+    def current(self) -> DataUpdateJob | None:
+        return self._current
+
+
+data_update_jobs = JobManager()
@@ -0,0 +1,196 @@
+import os
+import time
+import asyncio
+import statistics
+from collections import deque
+from loguru import logger
+from lib.metrics import LLM_CALLS, LLM_FALLBACK_CALLS, LLM_SECONDS
+
+# Circuit breaker settings, per endpoint
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+# Hedging: the secondary endpoint is called when the primary is slower than its recent p95
+LLM_HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+LLM_HEDGE_MIN_DELAY = float(os.getenv('LLM_HEDGE_MIN_DELAY', '1'))
+LLM_HEDGE_MAX_DELAY = float(os.getenv('LLM_HEDGE_MAX_DELAY', '30'))
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv('LLM_HEDGE_DEFAULT_DELAY', '15'))
+LLM_LATENCY_WINDOW = int(os.getenv('LLM_LATENCY_WINDOW', '200'))
+# Below this many samples the p95 is not meaningful and the default delay is used
+LLM_HEDGE_MIN_SAMPLES = 20
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class LLMCallError(Exception):
+    """Raised when an LLM endpoint call fails or no endpoint is available"""
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through, consecutive failures are counted.
+    open: calls are refused until reset_timeout has passed since the last failure.
+    half_open: a single trial call is let through; success closes, failure reopens.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_timeout: float = LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning(f"Circuit breaker opened after {self.failures} failures")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """A call let through was cancelled before it had an outcome"""
+        self._trial_in_flight = False
+
+
+class LLMEndpoint:
+    """An LLM endpoint with its circuit breaker and recent latencies per call kind"""
+
+    def __init__(self, name: str, url: str | None, token: str | None):
+        self.name = name
+        self.url = url
+        self.token = token
+        self.breaker = CircuitBreaker()
+        self._latencies: dict = {}
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.url)
+
+    def record_latency(self, kind: str, latency: float) -> None:
+        self._latencies.setdefault(kind, deque(maxlen=LLM_LATENCY_WINDOW)).append(latency)
+
+    def record_success(self, kind: str, latency: float) -> None:
+        self.record_latency(kind, latency)
+        self.breaker.record_success()
+
+    def record_failure(self) -> None:
+        self.breaker.record_failure()
+
+    def p95(self, kind: str) -> float | None:
+        latencies = self._latencies.get(kind)
+        if not latencies or len(latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return statistics.quantiles(latencies, n=20)[-1]
+
+    def hedge_delay(self, kind: str) -> float:
+        p95 = self.p95(kind)
+        if p95 is None:
+            return LLM_HEDGE_DEFAULT_DELAY
+        return min(max(p95, LLM_HEDGE_MIN_DELAY), LLM_HEDGE_MAX_DELAY)
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "state": self.breaker.state,
+            "failures": self.breaker.failures,
+            "p95": {kind: self.p95(kind) for kind in self._latencies},
+        }
+
+
+async def _attempt(endpoint: LLMEndpoint, kind: str, call):
+    started = time.monotonic()
+    try:
+        result = await call(endpoint)
+    except asyncio.CancelledError:
+        endpoint.breaker.release()
+        LLM_CALLS.inc(endpoint=endpoint.name, kind=kind, outcome="cancelled")
+        raise
+    except Exception as e:
+        endpoint.record_failure()
+        LLM_CALLS.inc(endpoint=endpoint.name, kind=kind, outcome="error")
+        raise LLMCallError(f"{endpoint.name}: {e}") from e
+    latency = time.monotonic() - started
+    endpoint.record_success(kind, latency)
+    LLM_CALLS.inc(endpoint=endpoint.name, kind=kind, outcome="ok")
+    LLM_SECONDS.observe(latency, endpoint=endpoint.name, kind=kind)
+    return result
+
+
+async def hedged_call(endpoints: list, kind: str, call, hedge: bool = LLM_HEDGE_ENABLED):
+    """
+    Calls the first available endpoint and, if it has not answered within its p95 latency
+    for this kind of call (or fails earlier), also the next one; the first success wins
+    and the slower call is cancelled, its elapsed time still counting as a latency sample.
+    Endpoints whose circuit breaker is open are skipped.
+
+    Args:
+        endpoints (list): LLMEndpoints in order of preference.
+        kind (str): Call kind, latencies are tracked per kind (prompts differ a lot in size).
+        call: Coroutine function taking an LLMEndpoint, raising on failure.
+        hedge (bool): Start the next endpoint after the hedge delay instead of only on failure.
+
+    Raises:
+        LLMCallError: When every endpoint failed or none was available.
+    """
+    candidates = iter([endpoint for endpoint in endpoints if endpoint.configured])
+    pending = set()
+    launched = {}  # task -> (endpoint, start time)
+    errors = []
+
+    def launch_next() -> LLMEndpoint | None:
+        for endpoint in candidates:
+            if endpoint.breaker.allow():
+                if pending:
+                    logger.info(f"Hedging LLM {kind} call to {endpoint.name}")
+                    LLM_FALLBACK_CALLS.inc(endpoint=endpoint.name, kind=kind, reason="hedge")
+                elif errors:
+                    LLM_FALLBACK_CALLS.inc(endpoint=endpoint.name, kind=kind, reason="failover")
+                task = asyncio.create_task(_attempt(endpoint, kind, call))
+                launched[task] = (endpoint, time.monotonic())
+                pending.add(task)
+                return endpoint
+            errors.append(f"{endpoint.name}: circuit open")
+        return None
+
+    try:
+        current = launch_next()
+        while pending:
+            timeout = current.hedge_delay(kind) if hedge and current is not None else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    result = task.result()
+                except LLMCallError as e:
+                    errors.append(str(e))
+                    continue
+                # Calls that lost the race took at least this long. Without these samples the
+                # slow calls would never count and p95, hence the hedge delay, would drift down.
+                now = time.monotonic()
+                for loser in pending:
+                    endpoint, started = launched[loser]
+                    endpoint.record_latency(kind, now - started)
+                return result
+            # Either a call failed or the hedge delay passed: bring in the next endpoint
+            current = launch_next()
+    finally:
+        for task in pending:
+            task.cancel()
+    raise LLMCallError("; ".join(errors) or "No LLM endpoint configured")
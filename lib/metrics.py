@@ -0,0 +1,193 @@
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Histogram buckets: seconds for stages and requests, characters for prompts, rows for results
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120)
+SIZE_BUCKETS = (250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+ROW_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 500, 1000, 5000)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(labelnames, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels.get(name, "") for name in self.labelnames), 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labels -> [count per bucket (not cumulative), sum, count]
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            series = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._values.get(tuple(labels.get(name, "") for name in self.labelnames))
+        return series[2] if series else 0
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    le = 'le="{}"'.format(_format_number(bound))
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms in the Prometheus text format. Values are kept per process:
+    every uvicorn worker reports its own, so the scraped worker varies between scrapes.
+    """
+
+    def __init__(self):
+        self._metrics: dict = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "hcm_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+)
+STAGE_SECONDS = registry.histogram(
+    "hcm_stage_duration_seconds", "Time spent per insight pipeline stage", ("stage",)
+)
+SQL_QUERIES = registry.counter(
+    "hcm_sql_queries_total", "SQL statements used to answer questions, by where the SQL came from", ("source",)
+)
+SQL_FIX_RETRIES = registry.counter(
+    "hcm_sql_fix_retries_total", "Failed SQL statements sent to the fix_sql LLM call, by outcome", ("outcome",)
+)
+SQL_QUERY_PLANS = registry.counter(
+    "hcm_sql_query_plans_total", "Executed SQL statements by whether their plan scans a stored table in full",
+    ("full_scan",)
+)
+SQL_ROWS = registry.histogram(
+    "hcm_sql_rows_returned", "Rows returned by the executed SQL", buckets=ROW_BUCKETS
+)
+LLM_CALLS = registry.counter(
+    "hcm_llm_calls_total", "LLM endpoint calls by endpoint, call kind and outcome", ("endpoint", "kind", "outcome")
+)
+LLM_FALLBACK_CALLS = registry.counter(
+    "hcm_llm_fallback_calls_total",
+    "Calls sent to a further endpoint because the previous one failed (failover) or was slow (hedge)",
+    ("endpoint", "kind", "reason")
+)
+LLM_SECONDS = registry.histogram(
+    "hcm_llm_call_duration_seconds", "LLM endpoint call latency", ("endpoint", "kind")
+)
+LLM_PROMPT_CHARS = registry.histogram(
+    "hcm_llm_prompt_chars", "Characters sent to the LLM per call", ("kind",), SIZE_BUCKETS
+)
+LLM_RESPONSE_CHARS = registry.histogram(
+    "hcm_llm_response_chars", "Characters received from the LLM per call", ("kind",), SIZE_BUCKETS
+)
+
+# Stage timings of the current request. The middleware sets a fresh dict per request;
+# the endpoint runs in a copy of its context, so the dict itself is shared and mutated.
+_request_timings: ContextVar = ContextVar("request_timings", default=None)
+
+
+def begin_request() -> dict:
+    timings: dict = {}
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def stage(name: str):
+    """Times a pipeline stage into STAGE_SECONDS and the current request's Server-Timing"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def server_timing(timings: dict, total: float | None = None) -> str:
+    """Server-Timing header value, durations in milliseconds"""
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
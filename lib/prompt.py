@@ -1,83 +1,96 @@
-generate_sql_prompt = '''
+# Abbreviations/terms users write for a company and the v_company_code value they stand for.
+# Shared by the SQL prompt compiler (lib.prompt_compiler) and the intent router (lib.router).
+COMPANY_ABBREVIATIONS = [
+    ('Telkomsel / Tsel', 'PT. TELKOMSEL'),
+    ('Telkom / Telkom Parent', 'PT. TELEKOMUNIKASI INDONESIA,TBK'),
+    ('YPT', 'YAYASAN PENDIDIKAN TELKOM'),
+    ('Sigma / Telkomsigma', 'PT. SIGMA CIPTA CARAKA'),
+    ('TA / Telkom Akses', 'PT. TELKOM AKSES'),
+    ('TIF', 'PT. TELKOM INFRASTRUKTUR INDONESIA'),
+    ('GSD', 'PT. GRAHA SARANA DUTA'),
+    ('Admedika', 'PT. ADMEDIKA'),
+    ('Mitratel', 'PT. DAYA MITRATEL'),
+    ('Yakes', 'YAYASAN KESEHATAN TELKOM'),
+    ('MDM', 'PT. METRA DIGITAL MEDIA'),
+    ('Bangtelindo', 'PT. BANGTELINDO'),
+    ('Telkomedika', 'PT. TELKOMEDIKA'),
+    ('Collega', 'PT. COLLEGA INTI PRATAMA'),
+    ('Telin', 'PT. TELKOM INDONESIA INTERNATIONAL'),
+    ('Finnet', 'PT. FINNET'),
+    ('Infomedia', 'PT. INFOMEDIA NUSANTARA'),
+    ('Telkomsat', 'PT. TELKOMSAT'),
+    ('Metranet', 'PT. METRA NET'),
+    ('ISH', 'PT. INFOMEDIA SOLUSI HUMANIKA'),
+    ('Digiserve', 'PT. DIGITAL APLIKASI SOLUSI (DIGISERVE)'),
+    ('Telkominfra', 'PT. TELKOM INFRA'),
+    ('TDE', 'PT. TELKOM DATA EKOSISTEM'),
+    ('Pins', 'PT. PINS'),
+    ('SSI', 'PT. SWADHARMA SARANA INFORMATIKA'),
+    ('Nuon', 'PT NUON DIGITAL INDONESIA'),
+    ('Nutech', 'PT. NUTECH INTEGRASI'),
+    ('Telkomcel', 'TELKOMCEL'),
+    ('Metra', 'PT. MULTIMEDIA NUSANTARA'),
+    ('TLT', 'PT. TELKOM LANDMARK TOWER'),
+    ('PST', 'PT. PERSADA SOKKA TAMA'),
+    ('Koprima', 'KOPRIMA'),
+    ('Dapen / Dapen Telkom', 'DANA PENSIUN TELKOM'),
+    ('MDI', 'PT. MD INVESTAMA'),
+    ('Pointer', 'PT. POJOK CELEBES MANDIRI'),
+    ('TSGN', 'PT. TS GLOBAL NETWORK'),
+    ('Neutradc', 'NEUTRADC SINGAPORE PTE LTD'),
+    ('SJU', 'SARANA JANESIA UTAMA'),
+    ('Telin Singapore', 'PT. TELIN SINGAPORE SINGAPORE'),
+    ('Gratika', 'PT. GRATIKA'),
+    ('Bosnet', 'PT. BOSNET DISTRIBUTION'),
+    ('Telin Hongkong', 'PT. TELIN HONGKONG HONGKONG'),
+    ('Media Nusantara', 'PT. MEDIA NUSANTARA DATA GLOBAL'),
+    ('Koptel', 'KOPTEL'),
+    ('Balebat', 'PT. BALEBAT DEDIKASI PRIMA'),
+    ('Telin Malaysia', 'TELKOM INTERNATIONAL MALAYSIA'),
+    ('GYS', 'PT. GRAHA YASA SELARAS'),
+    ('GTS', 'PT. GRAHA TELKOM SIGMA'),
+    ('SMI', 'PT. SATELIT MULTIMEDIA INDONESIA'),
+    ('Telin Taiwan', 'TELKOM INTERNATIONAL TAIWAN'),
+    ('TMI', 'PT. TELKOMSEL MITRA INOVASI'),
+    ('Telin USA', 'TELKOM INTERNATIONAL USA'),
+    ('TSGI', 'PT. TSG INT SDN.BHD'),
+    ('Linkaja', 'PT. FINTEK KARYA NUSANTARA (LINK AJA)'),
+    ('MDI Singapore', 'PT. MDI SG'),
+    ('Telin Australia', 'PT. TELKOM AUSTRALIA'),
+    ('Telkom & 13 Group Direct Subsidiaries', 'Telkom Consol'),
+]
+
+# The SQL generation prompt is compiled per question (see lib.prompt_compiler) from three parts:
+# a static prefix that only changes with the schema, the question templates and company
+# abbreviations relevant to the question, and a suffix with the latest period.
+sql_prompt_prefix = '''
 You are an expert SQL Generator. You are provided with a table name and its column list. Based on the natural language request below, generate a valid SQLLite query that adheres strictly to these guidelines:
 
-    Use Only Provided Elements: The query must reference only the table "{table_name}" and the columns list: {columns_list}. Do not include or assume any additional columns or tables. Do not change any of the column name in the columns list.
-    
+    Use Only Provided Elements: The query must reference only the table "{table_name}" with the columns list: {columns_list}, or a summary table listed below with its own columns. Do not include or assume any other columns or tables. Do not change any of the column name in the columns list.
+
+    {summary_tables}
+
     General Context:
     1. Telkom Group means the data about the whole data. If there is query about specific company or filter by company names, use column 'v_company_code' to filter the query to the specific company.
-    2. The latest period of data is based on {month}, {year}. If there are specific period or date range mentioned by the question, use column 'n_tahun' and 'n_bulan' to filter the data and only for that single month, for example n_tahun=2025, and n_bulan=1 means January 2025. 
+    2. The latest period of data is given at the end of these guidelines. If there are specific period or date range mentioned by the question, use column 'n_tahun' and 'n_bulan' to filter the data and only for that single month, for example n_tahun=2025, and n_bulan=1 means January 2025.
     3. BP means Band Position, use the column v_band_posisi to filter the BP category. For questions regarding band position always use ordering by the Band Position value in ascending order.
-    4. Other important abbreviations to filter using v_company_code are listed below: 
-    Abbreviations/terms v_company_code	
-    Telkomsel / Tsel	PT. TELKOMSEL
-    Telkom / Telkom Parent	PT. TELEKOMUNIKASI INDONESIA,TBK
-    YPT	YAYASAN PENDIDIKAN TELKOM
-    Sigma / Telkomsigma	PT. SIGMA CIPTA CARAKA
-    TA / Telkom Akses	PT. TELKOM AKSES
-    TIF	PT. TELKOM INFRASTRUKTUR INDONESIA
-    GSD	PT. GRAHA SARANA DUTA
-    Admedika	PT. ADMEDIKA
-    Mitratel	PT. DAYA MITRATEL
-    Yakes	YAYASAN KESEHATAN TELKOM
-    MDM	PT. METRA DIGITAL MEDIA
-    Bangtelindo	PT. BANGTELINDO
-    Telkomedika	PT. TELKOMEDIKA
-    Collega	PT. COLLEGA INTI PRATAMA
-    Telin	PT. TELKOM INDONESIA INTERNATIONAL
-    Finnet	PT. FINNET
-    Infomedia	PT. INFOMEDIA NUSANTARA
-    Telkomsat	PT. TELKOMSAT
-    Metranet	PT. METRA NET
-    ISH	PT. INFOMEDIA SOLUSI HUMANIKA
-    Digiserve	PT. DIGITAL APLIKASI SOLUSI (DIGISERVE)
-    Telkominfra	PT. TELKOM INFRA
-    TDE	PT. TELKOM DATA EKOSISTEM
-    Pins	PT. PINS
-    SSI	PT. SWADHARMA SARANA INFORMATIKA
-    Nuon	PT NUON DIGITAL INDONESIA
-    Nutech	PT. NUTECH INTEGRASI
-    Telkomcel	TELKOMCEL
-    Metra	PT. MULTIMEDIA NUSANTARA
-    TLT	PT. TELKOM LANDMARK TOWER
-    PST	PT. PERSADA SOKKA TAMA
-    Koprima	KOPRIMA
-    Dapen / Dapen Telkom	DANA PENSIUN TELKOM
-    MDI	PT. MD INVESTAMA
-    Pointer	PT. POJOK CELEBES MANDIRI
-    TSGN	PT. TS GLOBAL NETWORK
-    Neutradc	NEUTRADC SINGAPORE PTE LTD
-    SJU	SARANA JANESIA UTAMA
-    Telin Singapore	PT. TELIN SINGAPORE SINGAPORE
-    Gratika	PT. GRATIKA
-    Bosnet	PT. BOSNET DISTRIBUTION
-    Telin Hongkong	PT. TELIN HONGKONG HONGKONG
-    Media Nusantara	PT. MEDIA NUSANTARA DATA GLOBAL
-    Koptel	KOPTEL
-    Balebat	PT. BALEBAT DEDIKASI PRIMA
-    Telin Malaysia	TELKOM INTERNATIONAL MALAYSIA
-    GYS	PT. GRAHA YASA SELARAS
-    GTS	PT. GRAHA TELKOM SIGMA
-    SMI	PT. SATELIT MULTIMEDIA INDONESIA
-    Telin Taiwan	TELKOM INTERNATIONAL TAIWAN
-    TMI	PT. TELKOMSEL MITRA INOVASI
-    Telin USA	TELKOM INTERNATIONAL USA
-    TSGI	PT. TSG INT SDN.BHD
-    Linkaja	PT. FINTEK KARYA NUSANTARA (LINK AJA)
-    MDI Singapore	PT. MDI SG
-    Telin Australia	PT. TELKOM AUSTRALIA
-    Telkom & 13 Group Direct Subsidiaries	Telkom Consol
-
+    4. Company abbreviations mentioned in the question are listed at the end of these guidelines with the v_company_code value to filter on.
 
     Query Format: The output must begin with "WITH or SELECT" (and not "sql" or any other prefix). Use subqueries and avoid using the "DISTINCT" function for complex queries.
-    
-    Possible Questions:
 
-        1. If the question is about demography report, respond with this SQL template:
-        
+    Accuracy: Ensure that the SQL query returns only the relevant data as specified in the natural language request, using strictly the provided table and columns. ALWAYS return the total number and percentage of the data that related to the query.
+
+    Output: Provide only one SQL query without additional commentary, markdown formatting, or code fences.
+'''
+
+# Question templates, keyed like the intents in lib.router. "other" is always included.
+SQL_QUESTION_TEMPLATES = {
+    "demography_report": '''If the question is about demography report, respond with this SQL template:
+
         WITH top10 AS (
             SELECT v_company_code
-            FROM employee_demography
-            WHERE n_tahun = {year} AND n_bulan = {month}  AND v_company_code IS NOT NULL
+            FROM {table_name}
+            WHERE n_tahun = <latest year> AND n_bulan = <latest month number> AND v_company_code IS NOT NULL
             GROUP BY v_company_code
             ORDER BY COUNT(*) DESC
             LIMIT 10
@@ -90,7 +103,8 @@ You are an expert SQL Generator. You are provided with a table name and its colu
                     ELSE 'others'
                 END AS company,
                 COUNT(*) AS total_employees
-            FROM employee_demography
+            FROM {table_name}
+            WHERE n_tahun = <latest year> AND n_bulan = <latest month number>
             GROUP BY
                 CASE
                     WHEN v_company_code IN (SELECT v_company_code FROM top10)
@@ -101,39 +115,42 @@ You are an expert SQL Generator. You are provided with a table name and its colu
         SELECT
             company,
             total_employees,
-            ROUND(100.0 * total_employees / (SELECT COUNT(*) FROM employee_demography), 2) AS percentage
+            ROUND(100.0 * total_employees / (SELECT SUM(total_employees) FROM grouped_data), 2) AS percentage
         FROM grouped_data
         UNION ALL
         SELECT
             'Total' AS company,
             SUM(total_employees) AS total_employees,
-            ROUND(100.0 * SUM(total_employees) / (SELECT COUNT(*) FROM employee_demography), 2) AS percentage
+            100.0 AS percentage
         FROM grouped_data
 
-        ORDER BY total_employees DESC;
-
-        2. If the question is about total number of Millenial employees, use the column 'n_usia' (age) to calculate the number of employees aged 0 to 41 and not null or negative, and its percentage from total employees. If the question is about total number of employees in certain age range, also use the column 'n_usia' (age) to calculate the number of employees in that age range and its percentage from total employee. For the period use column n_tahun and n_bulan to filter only the recent employee data.
-        
-        3. If the question is about number of retired employee or retirement report in certain year, use the query:
+        ORDER BY total_employees DESC;''',
+    "millennials": '''If the question is about total number of Millenial employees, use the column 'n_usia' (age) to calculate the number of employees aged 0 to 41 and not null or negative, and its percentage from total employees. If the question is about total number of employees in certain age range, also use the column 'n_usia' (age) to calculate the number of employees in that age range and its percentage from total employee. For the period use column n_tahun and n_bulan to filter only the recent employee data.''',
+    "retirement": '''If the question is about number of retired employee or retirement report in certain year, use the query:
             SELECT COUNT(*) AS retiring_employees
             FROM {table_name}
-            WHERE 
+            WHERE
             strftime('%Y', d_tgl_pensiun) = '<year>'
             AND v_employee_group = 'Karyawan Tetap'
             AND v_fte IN ('FTE', 'FTE-DIRECT', 'FTE-PARENT')
-            AND n_tahun = <Previous Year from the year that the user asked> AND n_bulan = 12; to calculate the number of employee that will retire in the year that the user ask. 
-            
-        4. If the question is about (Consol) or consolidated, use lower(v_consolidated)="consolidated" queries to filter only the consolidated companies and generate the query using the other columns that relevant to user's questions The period should be the latest period ({month} {year}) or specific period that the user asked.
-        
-        5. If the question is about how many mother in the company, use 'WHERE n_jumlah_keluarga>1 and c_jenis_kelamin=2' query to calculate the number of mothers and generate the query using the other columns that relevant to user's questions in the most recent period.
-        
-        6. If the question is about the number of women, men or women compared to men, compare between value of  c_jenis_kelamin=2 (women) and c_jenis_kelamin=1 (men) query to answer the user query in the queried period ({month} {year}). 
-        
-        7. For other questions, use the most relevant columns from the column lists to answer the question. Calculate the top 10 number and percentage, and put the other category into 'others' category in the queried period ({month} {year}).
+            AND n_tahun = <Previous Year from the year that the user asked> AND n_bulan = 12; to calculate the number of employee that will retire in the year that the user ask.''',
+    "consolidated": '''If the question is about (Consol) or consolidated, use lower(v_consolidated)="consolidated" queries to filter only the consolidated companies and generate the query using the other columns that relevant to user's questions The period should be the latest period or specific period that the user asked.''',
+    "mothers": '''If the question is about how many mother in the company, use 'WHERE n_jumlah_keluarga>1 and c_jenis_kelamin=2' query to calculate the number of mothers and generate the query using the other columns that relevant to user's questions in the most recent period.''',
+    "gender": '''If the question is about the number of women, men or women compared to men, compare between value of  c_jenis_kelamin=2 (women) and c_jenis_kelamin=1 (men) query to answer the user query in the queried period.''',
+    "other": '''For other questions, use the most relevant columns from the column lists to answer the question. Calculate the top 10 number and percentage, and put the other category into 'others' category in the queried period.''',
+}
+# Router intents that share a template
+SQL_TEMPLATE_ALIASES = {"age_range": "millennials", "band_position": "other"}
 
-    Accuracy: Ensure that the SQL query returns only the relevant data as specified in the natural language request, using strictly the provided table and columns. ALWAYS return the total number and percentage of the data that related to the query.
+sql_prompt_suffix = '''
+    Possible Questions:
 
-    Output: Provide only one SQL query without additional commentary, markdown formatting, or code fences.
+{templates}
+
+    Company abbreviations/terms and their v_company_code:
+{abbreviations}
+
+    Latest period: {month} {year} (n_tahun = {year}, n_bulan = {month_number}).
 '''
 
 generate_insight_prompt = '''
@@ -0,0 +1,108 @@
+import re
+import difflib
+from dataclasses import dataclass
+from loguru import logger
+from lib.prompt import (
+    COMPANY_ABBREVIATIONS, SQL_QUESTION_TEMPLATES, SQL_TEMPLATE_ALIASES, sql_prompt_prefix, sql_prompt_suffix
+)
+from lib.router import MONTHS, normalize_question, match_intents, match_company, is_consolidated
+from lib.summary import describe_summary_tables
+
+# Rough size of a token for the Indonesian/English/SQL mix in these prompts
+CHARS_PER_TOKEN = 4
+# How close a word of the question has to be to an abbreviation to count as a typo of it
+COMPANY_FUZZY_CUTOFF = 0.85
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    text: str
+    prefix_tokens: int
+    tokens: int
+    templates: tuple
+    companies: tuple
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def render_sql_prompt_prefix(table_name: str, columns: tuple, summary_tables: dict = None) -> str:
+    """The static part of the SQL prompt: identical for every question against the same schema"""
+    return sql_prompt_prefix.format(
+        table_name=table_name,
+        columns_list=list(columns),
+        summary_tables=describe_summary_tables(table_name, summary_tables or {})
+    )
+
+
+def relevant_abbreviations(text: str) -> list:
+    """
+    Abbreviation rows for the companies a normalized question mentions, by exact alias
+    match or, for misspellings, by a close match of a single word.
+    """
+    codes = set(match_company(text))
+    aliases = {
+        alias.strip().lower(): code
+        for names, code in COMPANY_ABBREVIATIONS for alias in names.split("/")
+    }
+    for word in re.findall(r"[\w.&-]{4,}", text):
+        for alias in difflib.get_close_matches(word, aliases, n=1, cutoff=COMPANY_FUZZY_CUTOFF):
+            codes.add(aliases[alias])
+    return [(names, code) for names, code in COMPANY_ABBREVIATIONS if code in codes]
+
+
+def relevant_templates(text: str) -> list:
+    templates = []
+    for intent in match_intents(text):
+        template = SQL_TEMPLATE_ALIASES.get(intent, intent)
+        if template not in templates:
+            templates.append(template)
+    if is_consolidated(text) and "consolidated" not in templates:
+        templates.append("consolidated")
+    if "other" not in templates:
+        templates.append("other")
+    # Keep the order of the full prompt so equal selections render byte-identically
+    return [name for name in SQL_QUESTION_TEMPLATES if name in templates]
+
+
+def compile_sql_prompt(snapshot, user_query: str, month: str, year: str) -> CompiledPrompt:
+    """
+    Builds the SQL generation system prompt for one question: the schema's static prefix
+    (see SchemaSnapshot.sql_prompt_prefix) followed by only the question templates and
+    company abbreviations the question needs, with the latest period last. Keeping the
+    variable parts at the end lets the upstream server reuse the cached prefix.
+
+    Args:
+        snapshot (SchemaSnapshot): Current schema with its rendered prompt prefix.
+        user_query (str): The user's question.
+        month (str): Latest period month name, as returned by get_previous_month.
+        year (str): Latest period year.
+    """
+    text = normalize_question(user_query)
+    templates = relevant_templates(text)
+    abbreviations = relevant_abbreviations(text)
+
+    suffix = sql_prompt_suffix.format(
+        templates="\n\n".join(
+            f"        {i}. " + SQL_QUESTION_TEMPLATES[name].format(table_name=snapshot.table_name)
+            for i, name in enumerate(templates, start=1)
+        ),
+        abbreviations="\n".join(f"    {names}\t{code}" for names, code in abbreviations) or "    (none mentioned)",
+        month=month,
+        year=year,
+        month_number=MONTHS[month.lower()]
+    )
+    prompt = snapshot.sql_prompt_prefix + suffix
+    compiled = CompiledPrompt(
+        text=prompt,
+        prefix_tokens=estimate_tokens(snapshot.sql_prompt_prefix),
+        tokens=estimate_tokens(prompt),
+        templates=tuple(templates),
+        companies=tuple(code for _, code in abbreviations)
+    )
+    logger.info(
+        f"SQL prompt compiled: ~{compiled.tokens} tokens (~{compiled.prefix_tokens} static prefix), "
+        f"templates {list(compiled.templates)}, {len(compiled.companies)} company abbreviations"
+    )
+    return compiled
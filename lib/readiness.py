@@ -0,0 +1,90 @@
+import os
+import glob
+import time
+import asyncio
+import sqlite3
+from loguru import logger
+from lib.db_versions import resolve_database
+
+# Background data load at startup
+STARTUP_FILE_POLL_SECONDS = float(os.getenv('STARTUP_FILE_POLL_SECONDS', '30'))
+STARTUP_RETRY_SECONDS = float(os.getenv('STARTUP_RETRY_SECONDS', '60'))
+# Retry-After sent with the 503 answered before the data is ready
+NOT_READY_RETRY_AFTER = int(os.getenv('NOT_READY_RETRY_AFTER', '30'))
+
+STARTING, WAITING_FOR_FILES, LOADING, READY, FAILED = "starting", "waiting_for_files", "loading", "ready", "failed"
+
+
+class DataReadiness:
+    """
+    Whether this worker has data to answer questions from. Once ready it stays ready:
+    later data updates publish new versions while the current one keeps being served.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.state = STARTING
+        self.rows: int | None = None
+        self.load_seconds: float | None = None
+        self.loaded_at: float | None = None
+        self.error: str | None = None
+        self.since = time.time()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def set_state(self, state: str, error: str | None = None) -> None:
+        if state != self.state:
+            logger.info(f"Data readiness: {self.state} -> {state}")
+            self.since = time.time()
+        self.state = state
+        self.error = error
+
+    def mark_ready(self, rows: int, load_seconds: float) -> None:
+        self.rows = rows
+        self.load_seconds = round(load_seconds, 3)
+        self.loaded_at = time.time()
+        self.set_state(READY)
+
+    def to_dict(self, data_version: str | None) -> dict:
+        return {
+            "status": self.state,
+            "data_version": data_version,
+            "rows": self.rows,
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at,
+            "error": self.error,
+        }
+
+
+def count_rows(db_path: str, table_name: str) -> int | None:
+    """Rows in the published version of the table, None when there is no such table yet"""
+    path = resolve_database(db_path)
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+
+async def wait_for_files(folder: str, pattern: str = "*.json", poll_seconds: float = STARTUP_FILE_POLL_SECONDS) -> list:
+    """Waits without blocking the event loop until the folder holds matching files"""
+    warned = False
+    while True:
+        files = glob.glob(os.path.join(folder, pattern))
+        if files:
+            return files
+        if not warned:
+            logger.warning(f"No {pattern} files in {folder} yet, checking every {poll_seconds:g} seconds")
+            warned = True
+        await asyncio.sleep(poll_seconds)
+
+
+data_readiness = DataReadiness()
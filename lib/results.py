@@ -0,0 +1,149 @@
+import os
+import re
+from dataclasses import dataclass
+from loguru import logger
+from lib.prompt_compiler import estimate_tokens
+
+# Result shaping for the insight prompt
+RESULT_MAX_ROWS = int(os.getenv('RESULT_MAX_ROWS', '25'))
+RESULT_TOKEN_BUDGET = int(os.getenv('RESULT_TOKEN_BUDGET', '2000'))
+# max_tokens for the insight call: room for commentary plus the table written back out
+INSIGHT_BASE_TOKENS = int(os.getenv('INSIGHT_BASE_TOKENS', '800'))
+INSIGHT_MAX_TOKENS = int(os.getenv('INSIGHT_MAX_TOKENS', '28000'))
+
+# Rows that summarize the others and therefore always stay, at the bottom
+_PINNED_LABELS = {"total", "others"}
+# Integer columns that are identifiers or periods, not quantities: no thousands separator
+_PLAIN_NUMBER_COLUMNS = re.compile(r"tahun|bulan|year|month|(^|_)id$|code|retirement_year")
+# Columns whose values add up across rows, so folded rows can be summed: counts and shares
+_ADDITIVE_COLUMNS = re.compile(r"count|jumlah|total|sum|cnt|headcount|employee|karyawan|pegawai|percent|persen|pct|share|porsi|%")
+# Averages, ratios and extremes do not add up even when their name mentions a count
+_NON_ADDITIVE_COLUMNS = re.compile(r"avg|average|rata|mean|median|ratio|rasio|usia|(^|_)(rate|min|max|age)(_|$)")
+
+
+@dataclass(frozen=True)
+class ShapedResult:
+    table_data: str
+    rows_total: int
+    rows_shown: int
+    tokens: int
+    max_tokens: int
+
+    @property
+    def truncated(self) -> bool:
+        return self.rows_shown < self.rows_total
+
+
+def format_value(value, grouped: bool = True) -> str:
+    """Numbers are formatted once here (thousands separated by ',') so the LLM only copies them"""
+    if value is None:
+        return "None"
+    if isinstance(value, bool) or (isinstance(value, int) and not grouped):
+        return str(value)
+    if isinstance(value, int):
+        return f"{value:,}"
+    if isinstance(value, float):
+        return f"{value:,.0f}" if value.is_integer() and abs(value) >= 1000 else f"{value:,.2f}"
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def _markdown_table(columns: list, rows: list) -> str:
+    lines = [
+        "| " + " | ".join(columns) + " |",
+        "|" + "|".join("---" for _ in columns) + "|",
+    ]
+    grouped = [not _PLAIN_NUMBER_COLUMNS.search(column.lower()) for column in columns]
+    lines.extend(
+        "| " + " | ".join(format_value(value, group) for value, group in zip(row, grouped)) + " |"
+        for row in rows
+    )
+    return "\n".join(lines)
+
+
+def _pinned_label(row: tuple) -> str | None:
+    for value in row:
+        if isinstance(value, str) and value.strip().lower() in _PINNED_LABELS:
+            return value.strip().lower()
+    return None
+
+
+def _is_additive(column: str) -> bool:
+    name = column.lower()
+    return (
+        bool(_ADDITIVE_COLUMNS.search(name))
+        and not _NON_ADDITIVE_COLUMNS.search(name)
+        and not _PLAIN_NUMBER_COLUMNS.search(name)
+    )
+
+
+def _fold_rows(columns: list, rows: list, label: str) -> tuple:
+    """
+    Folds rows into one row labelled in the first text column. Only count and share
+    columns are summed; periods, identifiers, averages and ratios are left empty.
+    """
+    folded = []
+    labelled = False
+    for column, values in zip(columns, zip(*rows)):
+        present = [value for value in values if value is not None]
+        numbers = [value for value in present if isinstance(value, (int, float)) and not isinstance(value, bool)]
+        numeric = bool(numbers) and len(numbers) == len(present)
+        if numeric and _is_additive(column):
+            total = sum(numbers)
+            folded.append(round(total, 2) if isinstance(total, float) else total)
+        elif not numeric and not labelled:
+            folded.append(label)
+            labelled = True
+        else:
+            folded.append(None)
+    if not labelled:
+        # No text column: the label takes the first column that was not summed
+        for i, value in enumerate(folded):
+            if value is None:
+                folded[i] = label
+                break
+    return tuple(folded)
+
+
+def shape_result(columns: list, rows: list, max_rows: int = RESULT_MAX_ROWS,
+                 token_budget: int = RESULT_TOKEN_BUDGET) -> ShapedResult:
+    """
+    Serializes a query result for the insight prompt as a compact markdown table with
+    headers. Long results keep their leading rows (the SQL decides the order) and the
+    tail is folded into a single "others" row, so the table stays within the row cap
+    and the token budget. Existing Total/others rows are kept at the bottom.
+
+    Args:
+        columns (list): Column names from the cursor description.
+        rows (list): Result rows.
+        max_rows (int): Maximum number of data rows before folding.
+        token_budget (int): Approximate token budget for the serialized table.
+    """
+    if not rows:
+        table_data = "(no rows)"
+        return ShapedResult(table_data, 0, 0, estimate_tokens(table_data), INSIGHT_BASE_TOKENS)
+
+    columns = list(columns) or [f"column_{i + 1}" for i in range(len(rows[0]))]
+    body = [row for row in rows if _pinned_label(row) is None]
+    others = [row for row in rows if _pinned_label(row) == "others"]
+    totals = [row for row in rows if _pinned_label(row) == "total"]
+
+    keep = min(len(body), max_rows)
+    while True:
+        tail = body[keep:]
+        shown = body[:keep] + ([_fold_rows(columns, tail + others, "others")] if tail else others)
+        table_data = _markdown_table(columns, shown + totals)
+        tokens = estimate_tokens(table_data)
+        if tokens <= token_budget or keep <= 1:
+            break
+        # Drop rows in proportion to how far over budget the table is
+        keep = max(1, min(keep - 1, int(keep * token_budget / tokens)))
+
+    if keep < len(body):
+        logger.info(f"Query result shaped for the insight prompt: {keep} of {len(body)} rows kept, rest folded into others")
+    return ShapedResult(
+        table_data=table_data,
+        rows_total=len(rows),
+        rows_shown=len(shown) + len(totals),
+        tokens=tokens,
+        max_tokens=min(INSIGHT_MAX_TOKENS, INSIGHT_BASE_TOKENS + 2 * tokens)
+    )
@@ -0,0 +1,320 @@
+import re
+from dataclasses import dataclass
+from loguru import logger
+from lib.prompt import COMPANY_ABBREVIATIONS
+
+# Month names as users write them (Indonesian and English) and as get_previous_month returns them
+MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ("januari", "january"), ("februari", "february"), ("maret", "march"), ("april",),
+        ("mei", "may"), ("juni", "june"), ("juli", "july"), ("agustus", "august"),
+        ("september",), ("oktober", "october"), ("november",), ("desember", "december"),
+    ], start=1)
+    for name in names
+}
+
+# Keywords of the question families in the SQL prompt (lib.prompt), matched on word boundaries
+INTENT_PATTERNS = {
+    "demography_report": r"demogra(fi|phy|phic)",
+    "millennials": r"mill?enn?ials?",
+    "retirement": r"pensiun|retire(d|ment)?|retiring",
+    "mothers": r"ibu|mothers?",
+    "age_range": r"(usia|umur|age)\s+(antara\s+|between\s+)?\d{1,2}\s*(-|sampai|hingga|s/d|to|and|dan)\s*\d{1,2}",
+    "gender": r"gender|jenis kelamin|perempuan|wanita|laki-laki|pria|women|woman|female|male|men",
+    "band_position": r"band posisi|band position|bp",
+}
+CONSOLIDATED_PATTERN = r"consol(idated)?|konsol(idasi)?"
+# The templates only filter on consolidated data or not at all
+NEGATED_CONSOLIDATED_PATTERN = r"(un|non|non-|tidak\s+|bukan\s+|not\s+)(consol(idated)?|konsol(idasi)?)"
+TELKOM_GROUP_PATTERN = r"telkom group|telkom grup"
+
+# Words a routable question may contain besides its family keyword, company and period.
+# Anything else (an aggregate like rata-rata or tertinggi, another filter, a person) asks
+# something the templates do not answer, so the question goes to the LLM.
+ROUTABLE_WORDS = frozenset("""
+    berapa jumlah total banyak banyaknya persen persentase proporsi porsi komposisi perbandingan
+    distribusi sebaran rekap ringkasan laporan report buatkan buat tampilkan tunjukkan lihat
+    berikan minta tolong mohon saya kami ingin mau data info informasi terbaru terkini saat ini
+    karyawan karyawannya pegawai employee employees staff headcount orang
+    yang di dan pada untuk dari per berdasarkan menurut bulan tahun periode ada adalah
+    bagaimana apa the of in at for by and how many much what is are show give number share
+    percentage composition breakdown distribution latest current month year please me
+""".split())
+
+
+@dataclass(frozen=True)
+class RoutedQuery:
+    intent: str
+    sql: str
+
+
+def _search(pattern: str, text: str):
+    return re.search(rf"(?<![\w-])(?:{pattern})(?![\w-])", text)
+
+
+def normalize_question(user_query: str) -> str:
+    """Lowercases the question and drops "Telkom Group", which means no company filter"""
+    return re.sub(TELKOM_GROUP_PATTERN, " ", user_query.lower())
+
+
+def match_intents(text: str) -> list:
+    """Question families of the SQL prompt a normalized question mentions"""
+    return [intent for intent, pattern in INTENT_PATTERNS.items() if _search(pattern, text)]
+
+
+def is_consolidated(text: str) -> bool:
+    return _search(CONSOLIDATED_PATTERN, text) is not None
+
+
+def uncovered_words(text: str, intent: str) -> list:
+    """
+    Words of a normalized question outside the vocabulary of its routed template: the
+    family keyword, company aliases, period, consolidation and ROUTABLE_WORDS.
+    """
+    spans = [INTENT_PATTERNS[intent], CONSOLIDATED_PATTERN, rf"{'|'.join(MONTHS)}", r"20\d\d"]
+    spans += [
+        re.escape(alias.strip().lower()) for names, _ in COMPANY_ABBREVIATIONS for alias in names.split("/")
+    ]
+    for pattern in sorted(spans, key=len, reverse=True):
+        text = re.sub(rf"(?<![\w-])(?:{pattern})(?![\w-])", " ", text)
+    return [word for word in re.findall(r"[\w]+(?:-[\w]+)*", text) if word not in ROUTABLE_WORDS]
+
+
+def match_company(text: str) -> list:
+    """
+    Resolves company abbreviations in a lowercased question to v_company_code values.
+    Longer aliases win, so "telin singapore" is not also read as "telin".
+    """
+    aliases = sorted(
+        ((alias.strip().lower(), code) for names, code in COMPANY_ABBREVIATIONS for alias in names.split("/")),
+        key=lambda item: len(item[0]),
+        reverse=True
+    )
+    codes = []
+    for alias, code in aliases:
+        match = _search(re.escape(alias), text)
+        if match:
+            text = text[:match.start()] + " " + text[match.end():]
+            if code not in codes:
+                codes.append(code)
+    return codes
+
+
+def match_period(text: str, month: str, year: str) -> tuple | None:
+    """
+    Returns (year, month number) the question asks about, defaulting to the latest period.
+    None when the question names a year without a month, which the templates cannot answer.
+    """
+    month_number = MONTHS[month.lower()]
+    year_number = int(year)
+    month_match = None
+    for candidate in re.finditer(rf"\b({'|'.join(MONTHS)})\b(\s+(20\d\d))?", text):
+        # "may" is far more often the English verb than the month
+        if candidate.group(1) != "may" or candidate.group(3):
+            month_match = candidate
+            break
+    if month_match:
+        month_number = MONTHS[month_match.group(1)]
+        if month_match.group(3):
+            year_number = int(month_match.group(3))
+    elif re.search(r"\b20\d\d\b", text):
+        return None
+    return year_number, month_number
+
+
+def _count_source(snapshot, required: tuple) -> tuple:
+    """(table, weight) to count from: the demography summary when it has the columns, else the employee table"""
+    summary_columns = snapshot.summary_tables.get("demography_summary", ())
+    if all(col in summary_columns for col in required):
+        return "demography_summary", "employee_count"
+    return snapshot.table_name, "1"
+
+
+def _filters(year: int, month: int, company: str | None, consolidated: bool) -> str:
+    conditions = [f"n_tahun = {year}", f"n_bulan = {month}"]
+    if company:
+        conditions.append("v_company_code = '{}'".format(company.replace("'", "''")))
+    if consolidated:
+        conditions.append("lower(v_consolidated) = 'consolidated'")
+    return " AND ".join(conditions)
+
+
+def _share_sql(table: str, weight: str, condition: str, label: str, where: str) -> str:
+    return f"""SELECT
+    SUM(CASE WHEN {condition} THEN {weight} ELSE 0 END) AS {label},
+    SUM({weight}) AS total_employees,
+    ROUND(100.0 * SUM(CASE WHEN {condition} THEN {weight} ELSE 0 END) / SUM({weight}), 2) AS percentage
+FROM {table}
+WHERE {where};"""
+
+
+def _grouped_sql(table: str, weight: str, category: str, label: str, where: str, order_by: str) -> str:
+    return f"""WITH grouped_data AS (
+    SELECT
+        {category} AS {label},
+        SUM({weight}) AS total_employees
+    FROM {table}
+    WHERE {where}
+    GROUP BY {category}
+)
+SELECT * FROM (
+    SELECT
+        {label},
+        total_employees,
+        ROUND(100.0 * total_employees / (SELECT SUM(total_employees) FROM grouped_data), 2) AS percentage
+    FROM grouped_data
+    UNION ALL
+    SELECT
+        'Total' AS {label},
+        SUM(total_employees) AS total_employees,
+        100.0 AS percentage
+    FROM grouped_data
+)
+ORDER BY {order_by};"""
+
+
+def _demography_report_sql(table: str, weight: str, where: str) -> str:
+    return f"""WITH top10 AS (
+    SELECT v_company_code
+    FROM {table}
+    WHERE {where} AND v_company_code IS NOT NULL
+    GROUP BY v_company_code
+    ORDER BY SUM({weight}) DESC
+    LIMIT 10
+),
+grouped_data AS (
+    SELECT
+        CASE
+            WHEN v_company_code IN (SELECT v_company_code FROM top10)
+            THEN v_company_code
+            ELSE 'others'
+        END AS company,
+        SUM({weight}) AS total_employees
+    FROM {table}
+    WHERE {where}
+    GROUP BY
+        CASE
+            WHEN v_company_code IN (SELECT v_company_code FROM top10)
+            THEN v_company_code
+            ELSE 'others'
+        END
+)
+SELECT
+    company,
+    total_employees,
+    ROUND(100.0 * total_employees / (SELECT SUM(total_employees) FROM grouped_data), 2) AS percentage
+FROM grouped_data
+UNION ALL
+SELECT
+    'Total' AS company,
+    SUM(total_employees) AS total_employees,
+    100.0 AS percentage
+FROM grouped_data
+
+ORDER BY total_employees DESC;"""
+
+
+def _retirement_sql(snapshot, retirement_year: int, company: str | None, consolidated: bool) -> str:
+    # Employees retiring in a year are counted in the December snapshot of the year before
+    where = _filters(retirement_year - 1, 12, company, consolidated)
+    if "retirement_summary" in snapshot.summary_tables:
+        # COALESCE: no matching rows count as 0, like COUNT(*) on the plain table
+        return f"""SELECT COALESCE(SUM(employee_count), 0) AS retiring_employees
+FROM retirement_summary
+WHERE retirement_year = '{retirement_year}'
+AND v_employee_group = 'Karyawan Tetap'
+AND v_fte IN ('FTE', 'FTE-DIRECT', 'FTE-PARENT')
+AND {where};"""
+    return f"""SELECT COUNT(*) AS retiring_employees
+FROM {snapshot.table_name}
+WHERE strftime('%Y', d_tgl_pensiun) = '{retirement_year}'
+AND v_employee_group = 'Karyawan Tetap'
+AND v_fte IN ('FTE', 'FTE-DIRECT', 'FTE-PARENT')
+AND {where};"""
+
+
+def route_query(user_query: str, snapshot, month: str, year: str) -> RoutedQuery | None:
+    """
+    Matches a question to one of the question families of the SQL prompt and fills
+    its SQL template directly, so the SQL generation LLM call can be skipped. Only
+    questions the template answers in full are routed: every word has to belong to
+    the family, a company, the period or the generic question vocabulary.
+
+    Args:
+        user_query (str): The user's question.
+        snapshot (SchemaSnapshot): Current schema, decides which tables the SQL reads.
+        month (str): Latest period month name, as returned by get_previous_month.
+        year (str): Latest period year.
+
+    Returns:
+        RoutedQuery | None: The routed SQL, or None when the question should go to the LLM.
+    """
+    text = normalize_question(user_query)
+    intents = match_intents(text)
+    if len(intents) != 1:
+        # Unknown or combined question families are left to the LLM
+        return None
+    intent = intents[0]
+    if _search(NEGATED_CONSOLIDATED_PATTERN, text):
+        return None
+    extra_words = uncovered_words(text, intent)
+    if extra_words:
+        logger.debug(f"Question not routed, {extra_words} are outside the {intent} template")
+        return None
+
+    companies = match_company(text)
+    if len(companies) > 1:
+        return None
+    company = companies[0] if companies else None
+    consolidated = is_consolidated(text)
+    columns = set(snapshot.columns)
+
+    if intent == "retirement":
+        years = re.findall(r"\b(20\d\d)\b", text)
+        required = {"d_tgl_pensiun", "v_employee_group", "v_fte", "n_tahun", "n_bulan"}
+        if len(years) != 1 or not required <= columns:
+            return None
+        sql = _retirement_sql(snapshot, int(years[0]), company, consolidated)
+        return _routed(intent, sql)
+
+    period = match_period(text, month, year)
+    if period is None:
+        return None
+    where = _filters(*period, company, consolidated)
+
+    if intent == "demography_report":
+        if company:
+            return None
+        table, weight = _count_source(snapshot, ("v_company_code", "v_consolidated"))
+        sql = _demography_report_sql(table, weight, where)
+    elif intent == "millennials":
+        table, weight = _count_source(snapshot, ("millennial", "v_company_code", "v_consolidated"))
+        condition = "millennial = 1" if table == "demography_summary" else "n_usia BETWEEN 0 AND 41"
+        sql = _share_sql(table, weight, condition, "millennial_employees", where)
+    elif intent == "mothers":
+        if not {"n_jumlah_keluarga", "c_jenis_kelamin"} <= columns:
+            return None
+        sql = _share_sql(snapshot.table_name, "1", "n_jumlah_keluarga > 1 AND c_jenis_kelamin = 2", "mothers", where)
+    elif intent == "age_range":
+        low, high = sorted(int(age) for age in re.findall(r"\d{1,2}", _search(INTENT_PATTERNS["age_range"], text).group(0)))
+        condition = f"n_usia BETWEEN {low} AND {high}"
+        sql = _share_sql(snapshot.table_name, "1", condition, "employees_in_age_range", where)
+    elif intent == "gender":
+        table, weight = _count_source(snapshot, ("c_jenis_kelamin", "v_company_code", "v_consolidated"))
+        category = "CASE c_jenis_kelamin WHEN 1 THEN 'Laki-laki' WHEN 2 THEN 'Perempuan' ELSE 'None' END"
+        order_by = "gender = 'Total', total_employees DESC"
+        sql = _grouped_sql(table, weight, category, "gender", where, order_by=order_by)
+    else:  # band_position
+        if "v_band_posisi" not in columns:
+            return None
+        table, weight = _count_source(snapshot, ("v_band_posisi", "v_company_code", "v_consolidated"))
+        # Band positions ascending, None and Total last
+        order_by = "CASE WHEN band_posisi = 'Total' THEN 2 WHEN band_posisi IS NULL THEN 1 ELSE 0 END, band_posisi"
+        sql = _grouped_sql(table, weight, "v_band_posisi", "band_posisi", where, order_by=order_by)
+    return _routed(intent, sql)
+
+
+def _routed(intent: str, sql: str) -> RoutedQuery:
+    logger.info(f"Question routed to the {intent} template")
+    return RoutedQuery(intent=intent, sql=sql)
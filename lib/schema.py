@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping
+from loguru import logger
+from lib.cache import schema_hash
+from lib.summary import SUMMARY_TABLES
+from lib.prompt_compiler import render_sql_prompt_prefix
+from lib.db_versions import data_version, resolve_database
+
+
+@dataclass(frozen=True)
+class SchemaSnapshot:
+    """Immutable view of the table schema and the static SQL prompt prefix rendered for it"""
+    table_name: str
+    columns: tuple
+    schema_hash: str
+    data_version: str | None
+    sql_prompt_prefix: str = ""
+    summary_tables: Mapping = field(default_factory=lambda: MappingProxyType({}))  # name -> columns
+
+    @property
+    def column_list(self) -> list:
+        return list(self.columns)
+
+
+# The registry is a single reference that is replaced as a whole, never mutated,
+# so readers always see a complete snapshot without taking a lock.
+_current: SchemaSnapshot | None = None
+_write_lock = threading.Lock()
+
+
+def load_schema(db_path: str, table_name: str) -> SchemaSnapshot | None:
+    """
+    Reads the table schema once and publishes a new snapshot to the registry.
+
+    Args:
+        db_path (str): Logical path of the SQLite database (see lib.db_versions).
+        table_name (str): Name of the table to describe.
+    """
+    global _current
+    version = data_version(db_path)
+    path = resolve_database(db_path)
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"PRAGMA table_info({table_name})")
+        columns_info = cursor.fetchall()
+        summary_tables = {}
+        for summary in SUMMARY_TABLES:
+            summary_columns = tuple(col[1] for col in cursor.execute(f"PRAGMA table_info({summary})"))
+            if summary_columns:
+                summary_tables[summary] = summary_columns
+    finally:
+        conn.close()
+
+    if not columns_info:
+        return None
+
+    columns = tuple(col[1] for col in columns_info)
+    # Generated SQL may refer to the summary tables, so they are part of the schema identity
+    hashed_columns = list(columns) + [f"{name}.{col}" for name, cols in summary_tables.items() for col in cols]
+    snapshot = SchemaSnapshot(
+        table_name=table_name,
+        columns=columns,
+        schema_hash=schema_hash(hashed_columns),
+        data_version=version,
+        sql_prompt_prefix=render_sql_prompt_prefix(table_name, columns, summary_tables),
+        summary_tables=MappingProxyType(summary_tables)
+    )
+    with _write_lock:
+        _current = snapshot
+    logger.info(
+        f"Schema registry loaded for {table_name}: {len(columns)} columns, "
+        f"summary tables {list(summary_tables)}, version {version}"
+    )
+    return snapshot
+
+
+def get_schema(db_path: str, table_name: str) -> SchemaSnapshot | None:
+    """Returns the current snapshot, reloading it only when the database file has changed"""
+    snapshot = _current
+    if (
+        snapshot is not None
+        and snapshot.table_name == table_name
+        and snapshot.data_version is not None
+        and snapshot.data_version == data_version(db_path)
+    ):
+        return snapshot
+    return load_schema(db_path, table_name)
+
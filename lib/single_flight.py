@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from loguru import logger
+
+# Cross-worker coordination through a small SQLite file shared by the uvicorn workers
+SINGLE_FLIGHT_DB = os.getenv('SINGLE_FLIGHT_DB', '/app/data/HCM_Insight_single_flight.db')
+SINGLE_FLIGHT_LEASE_SECONDS = float(os.getenv('SINGLE_FLIGHT_LEASE_SECONDS', '180'))
+SINGLE_FLIGHT_RESULT_TTL = float(os.getenv('SINGLE_FLIGHT_RESULT_TTL', '60'))
+SINGLE_FLIGHT_POLL_SECONDS = float(os.getenv('SINGLE_FLIGHT_POLL_SECONDS', '0.25'))
+
+_MISSING = object()
+
+
+def flight_key(*parts) -> str:
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+
+
+class SharedFlightStore:
+    """
+    Lease and result table shared by all workers on the host. The worker holding the
+    lease for a key computes the result and publishes it; the others poll for it.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = SINGLE_FLIGHT_LEASE_SECONDS,
+                 result_ttl: float = SINGLE_FLIGHT_RESULT_TTL):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        self.owner = uuid.uuid4().hex
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # Called from asyncio.to_thread, so every thread gets its own connection
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def claim(self, key: str) -> bool:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, self.owner, now + self.lease_seconds)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def is_claimed(self, key: str) -> bool:
+        return self._conn().execute(
+            "SELECT 1 FROM leases WHERE key = ? AND expires_at >= ?", (key, time.time())
+        ).fetchone() is not None
+
+    def publish(self, key: str, value) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+        conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), now + self.result_ttl)
+        )
+
+    def fetch(self, key: str):
+        row = self._conn().execute(
+            "SELECT value FROM results WHERE key = ? AND expires_at >= ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else _MISSING
+
+    def release(self, key: str) -> None:
+        self._conn().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical computations. Within a worker, callers with the same
+    key await one shared task. Across workers, the optional SharedFlightStore makes a
+    single worker compute while the others wait for its published result.
+    """
+
+    def __init__(self, store_path: str | None = SINGLE_FLIGHT_DB):
+        self.store_path = store_path
+        self._store: SharedFlightStore | None = None
+        self._store_failed = False
+        self._inflight: dict = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _get_store(self) -> SharedFlightStore | None:
+        if self._store is None and self.store_path and not self._store_failed:
+            try:
+                self._store = SharedFlightStore(self.store_path)
+            except Exception as e:
+                # Without the shared file requests are still coalesced within the worker
+                self._store_failed = True
+                logger.warning(f"Cross-worker single-flight disabled, cannot open {self.store_path}: {e}")
+        return self._store
+
+    async def do(self, key: str, compute, shareable=lambda result: True):
+        """
+        Args:
+            key (str): Identity of the computation (see flight_key).
+            compute: Coroutine function producing the result, JSON serializable if shared across workers.
+            shareable: Decides whether a result may be published to the other workers.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.create_task(self._across_workers(key, compute, shareable))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+            logger.debug(f"Joined in-flight computation {key[:12]}")
+        # A caller going away must not cancel the computation the others wait for
+        return await asyncio.shield(task)
+
+    async def _across_workers(self, key: str, compute, shareable):
+        store = self._get_store()
+        if store is None:
+            return await compute()
+
+        try:
+            # A worker may have just finished the same computation
+            result = await asyncio.to_thread(store.fetch, key)
+            if result is not _MISSING:
+                self.coalesced += 1
+                return result
+            claimed = await asyncio.to_thread(store.claim, key)
+        except sqlite3.Error as e:
+            logger.warning(f"Single-flight lease failed, computing locally: {e}")
+            return await compute()
+
+        if claimed:
+            try:
+                result = await compute()
+                if shareable(result):
+                    try:
+                        await asyncio.to_thread(store.publish, key, result)
+                    except sqlite3.Error as e:
+                        # The other workers compute it themselves once the lease is gone
+                        logger.warning(f"Single-flight publish failed, result not shared: {e}")
+                return result
+            finally:
+                try:
+                    await asyncio.to_thread(store.release, key)
+                except sqlite3.Error as e:
+                    logger.warning(f"Single-flight release failed, the lease expires on its own: {e}")
+
+        # Another worker is computing: wait for its result while its lease is alive
+        deadline = time.monotonic() + store.lease_seconds
+        while time.monotonic() < deadline:
+            # Lease checked before the result: the leader publishes before releasing
+            claimed = await asyncio.to_thread(store.is_claimed, key)
+            result = await asyncio.to_thread(store.fetch, key)
+            if result is not _MISSING:
+                self.coalesced += 1
+                logger.debug(f"Result of {key[:12]} taken from another worker")
+                return result
+            if not claimed:
+                break
+            await asyncio.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+        # The other worker failed or timed out without a result
+        return await compute()
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+insight_flights = SingleFlight()
+# The streaming endpoint shares only the SQL side, whose result stays within the worker
+prepare_flights = SingleFlight(store_path=None)
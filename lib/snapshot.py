@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import sqlite3
+from loguru import logger
+from lib.ingest import MANIFEST_TABLE, ensure_manifest, insert_records, create_indexes
+from lib.summary import rebuild_summaries
+
+# pyarrow is optional: without it the snapshot is simply not written or used
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+
+SNAPSHOT_BATCH_ROWS = int(os.getenv('SNAPSHOT_BATCH_ROWS', '50000'))
+MANIFEST_METADATA_KEY = b"hcm_insight.manifest"
+TABLE_METADATA_KEY = b"hcm_insight.table"
+# Low-cardinality labels repeated on every row of every month x consolidation snapshot.
+# They stay plain TEXT in SQLite, where joining integer-keyed dimension tables back made
+# every GROUP BY slower, and are dictionary arrays in the snapshot only.
+DICTIONARY_COLUMNS = ("v_company_code", "v_band_posisi", "v_employee_group", "v_fte", "v_consolidated")
+
+
+def _arrow_type(column: str, declared_type: str):
+    if column in DICTIONARY_COLUMNS:
+        # Repeated labels are written once per batch, rows hold their dictionary index
+        return pa.dictionary(pa.int32(), pa.string())
+    declared_type = (declared_type or "").upper()
+    if "INT" in declared_type:
+        return pa.int64()
+    if "REAL" in declared_type or "FLOA" in declared_type or "DOUB" in declared_type:
+        return pa.float64()
+    return pa.string()
+
+
+def _sqlite_type(arrow_type) -> str:
+    if pa.types.is_integer(arrow_type):
+        return "INTEGER"
+    if pa.types.is_floating(arrow_type):
+        return "REAL"
+    return "TEXT"
+
+
+def _dictionary_array(values, dictionary: dict):
+    """Dictionary-encodes values against a dictionary (value -> index) that new values are appended to"""
+    indices = [None if value is None else dictionary.setdefault(value, len(dictionary)) for value in values]
+    return pa.DictionaryArray.from_arrays(pa.array(indices, type=pa.int32()), pa.array(list(dictionary), type=pa.string()))
+
+
+def write_snapshot(db_path: str, table_name: str, snapshot_path: str) -> bool:
+    """
+    Writes the processed table as a typed Arrow IPC file next to the database, with
+    the ingest manifest stored in the schema metadata. The file is written under a
+    temporary name and renamed into place, so readers never see a partial snapshot.
+    """
+    if pa is None:
+        logger.debug("pyarrow is not installed, skipping data snapshot")
+        return False
+
+    started = time.perf_counter()
+    tmp_path = f"{snapshot_path}.tmp"
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        columns_info = conn.execute(f"PRAGMA table_info({table_name})").fetchall()
+        manifest = conn.execute(
+            f"SELECT file_name, size, mtime_ns, sha256, row_count, ingested_at, partitions FROM {MANIFEST_TABLE}"
+        ).fetchall()
+        schema = pa.schema(
+            [pa.field(col[1], _arrow_type(col[1], col[2])) for col in columns_info],
+            metadata={
+                MANIFEST_METADATA_KEY: json.dumps(manifest).encode(),
+                TABLE_METADATA_KEY: table_name.encode(),
+            }
+        )
+        column_names = ", ".join(f'"{col[1]}"' for col in columns_info)
+        cursor = conn.execute(f"SELECT {column_names} FROM {table_name}")
+        rows_written = 0
+        # One dictionary per column that only grows, written as deltas: an IPC file
+        # cannot replace a dictionary between batches
+        dictionaries = {field.name: {} for field in schema if pa.types.is_dictionary(field.type)}
+        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+            while True:
+                rows = cursor.fetchmany(SNAPSHOT_BATCH_ROWS)
+                if not rows:
+                    break
+                arrays = [
+                    _dictionary_array(values, dictionaries[field.name]) if field.name in dictionaries
+                    else pa.array(values, type=field.type)
+                    for values, field in zip(zip(*rows), schema)
+                ]
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                rows_written += len(rows)
+        os.replace(tmp_path, snapshot_path)
+    except Exception as e:
+        logger.error(f"Failed to write data snapshot {snapshot_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    finally:
+        conn.close()
+
+    logger.info(f"Data snapshot written to {snapshot_path}: {rows_written} rows in {time.perf_counter() - started:.2f}s")
+    return True
+
+
+def snapshot_is_fresh(snapshot_path: str, source_paths: list) -> bool:
+    """The snapshot is usable when it is newer than every source file and covers all of them"""
+    if pa is None or not os.path.exists(snapshot_path):
+        return False
+    snapshot_mtime = os.stat(snapshot_path).st_mtime_ns
+    if any(os.stat(path).st_mtime_ns >= snapshot_mtime for path in source_paths):
+        return False
+    with pa.memory_map(snapshot_path, "r") as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    covered = {entry[0] for entry in json.loads(metadata.get(MANIFEST_METADATA_KEY, b"[]"))}
+    return all(os.path.basename(path) in covered for path in source_paths)
+
+
+def restore_snapshot(snapshot_path: str, db_path: str, table_name: str) -> int:
+    """
+    Loads a snapshot into an empty database through a memory map, including the
+    ingest manifest, so the following incremental ingest only has to verify files.
+
+    Returns:
+        int: Number of rows restored.
+    """
+    started = time.perf_counter()
+    rows_restored = 0
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        with pa.memory_map(snapshot_path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            schema = reader.schema
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                f"CREATE TABLE {table_name} ("
+                + ", ".join(f'"{field.name}" {_sqlite_type(field.type)}' for field in schema)
+                + ")"
+            )
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                columns = (
+                    column.dictionary_decode() if pa.types.is_dictionary(column.type) else column
+                    for column in batch.columns
+                )
+                records = list(zip(*(column.to_pylist() for column in columns)))
+                rows_restored += insert_records(conn, table_name, schema.names, records)
+
+            ensure_manifest(conn)
+            manifest = json.loads(schema.metadata.get(MANIFEST_METADATA_KEY, b"[]"))
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {MANIFEST_TABLE} "
+                f"(file_name, size, mtime_ns, sha256, row_count, ingested_at, partitions) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                manifest
+            )
+            create_indexes(conn, table_name)
+            rebuild_summaries(conn, table_name)
+            conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    logger.info(f"Restored {rows_restored} rows from snapshot {snapshot_path} in {time.perf_counter() - started:.2f}s")
+    return rows_restored
+
+
+def table_exists(db_path: str, table_name: str) -> bool:
+    if not os.path.exists(db_path):
+        return False
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+        ).fetchone() is not None
+    finally:
+        conn.close()
@@ -0,0 +1,202 @@
+import os
+import re
+import time
+import sqlite3
+from loguru import logger
+
+# Execution budget for a single query on the read pool
+SQL_TIMEOUT_SECONDS = float(os.getenv('SQL_TIMEOUT_SECONDS', '10'))
+SQL_MAX_VM_STEPS = int(os.getenv('SQL_MAX_VM_STEPS', '1000000000'))
+SQL_MAX_ROWS = int(os.getenv('SQL_MAX_ROWS', '5000'))
+# The progress handler runs every this many SQLite VM instructions
+SQL_PROGRESS_INTERVAL = 10000
+
+# Statements that change data or the connection, rejected anywhere in the query
+_FORBIDDEN_KEYWORDS = re.compile(
+    r"\b(insert|update|delete|replace\s+into|create|drop|alter|attach|detach|pragma|vacuum|reindex)\b",
+    re.IGNORECASE
+)
+# String literals, quoted identifiers and comments, blanked out before looking at keywords
+_QUOTED = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+# Authorizer actions a read-only query needs
+_READ_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    getattr(sqlite3, "SQLITE_RECURSIVE", 33),
+}
+
+
+class SQLGuardError(sqlite3.OperationalError):
+    """A query refused or stopped by the guard; callers treating it as an SQLite error keep working"""
+
+
+class SQLValidationError(SQLGuardError):
+    """The statement is not a single read-only SELECT/WITH query"""
+
+
+class QueryPlanRejected(SQLGuardError):
+    """The query plan joins or rescans whole tables"""
+
+
+class QueryTimeoutError(SQLGuardError):
+    """The query ran past its wall-clock or VM-step budget"""
+
+
+class RowLimitExceeded(SQLGuardError):
+    """The query returned more rows than may be fetched"""
+
+
+def validate_sql(sql: str) -> str:
+    """
+    Checks that sql is a single read-only SELECT/WITH statement.
+
+    Returns:
+        str: The statement without surrounding whitespace and trailing semicolons.
+
+    Raises:
+        SQLValidationError: When the statement is empty, not a query, or several statements.
+    """
+    statement = sql.strip().rstrip(";").strip()
+    bare = _QUOTED.sub(lambda match: " " if match.group(0)[0] in "-/" else "''", statement).strip()
+    if not bare:
+        raise SQLValidationError("Empty SQL statement")
+    if ";" in bare:
+        raise SQLValidationError("Only a single SQL statement is allowed")
+    if not re.match(r"(select|with)\b", bare, re.IGNORECASE):
+        raise SQLValidationError("Only SELECT or WITH queries are allowed")
+    forbidden = _FORBIDDEN_KEYWORDS.search(bare)
+    if forbidden:
+        raise SQLValidationError(f"{forbidden.group(1).upper()} is not allowed in a read-only query")
+    return statement
+
+
+def read_only_authorizer(action: int, *_) -> int:
+    """sqlite3 authorizer refusing everything but reading, the backstop behind validate_sql"""
+    return sqlite3.SQLITE_OK if action in _READ_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def explain_plan_rows(conn: sqlite3.Connection, sql: str) -> list:
+    """EXPLAIN QUERY PLAN rows as (id, parent, detail)"""
+    return [(row[0], row[1], row[3]) for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def derived_tables(plan: list) -> set:
+    """Names of the CTEs and subqueries a plan materializes or runs as co-routines"""
+    return {
+        detail.split()[1] for _, _, detail in plan
+        if detail.startswith(("MATERIALIZE ", "CO-ROUTINE ")) and len(detail.split()) > 1
+    }
+
+
+def stored_table_scan(detail: str, derived: set) -> str | None:
+    """
+    Name (or alias) read by a full "SCAN" step of a stored table. Plans print aliases,
+    so every scan that is not of a CTE/subquery and not through a covering index counts.
+    "SCAN CONSTANT ROW" is the single row of a SELECT without FROM.
+    """
+    words = detail.split()
+    if len(words) < 2 or words[0] != "SCAN" or "COVERING INDEX" in detail or detail == "SCAN CONSTANT ROW":
+        return None
+    # SQLite < 3.36 prints "SCAN TABLE <name>"
+    name = words[2] if words[1] == "TABLE" and len(words) > 2 else words[1]
+    if name.startswith("(") or name in derived:
+        return None
+    return name
+
+
+def check_query_plan(plan: list) -> None:
+    """
+    Rejects plans whose cost grows with the product of table sizes:
+    - two or more stored tables scanned in full in the same join (cartesian product)
+    - a stored table scanned in full inside a correlated subquery (rescanned for every outer row)
+    A single full scan is left to the execution budget.
+
+    Args:
+        plan (list): (id, parent, detail) rows from explain_plan_rows.
+
+    Raises:
+        QueryPlanRejected
+    """
+    derived = derived_tables(plan)
+    details = {node: detail for node, _, detail in plan}
+    parents = {node: parent for node, parent, _ in plan}
+
+    scans_per_level: dict = {}
+    for node, parent, detail in plan:
+        name = stored_table_scan(detail, derived)
+        if name is None:
+            continue
+        scans_per_level.setdefault(parent, []).append(name)
+
+        ancestor = parent
+        while ancestor in details:
+            if details[ancestor].startswith("CORRELATED"):
+                raise QueryPlanRejected(
+                    f"Table {name} is scanned in full for every row of the outer query "
+                    f"({details[ancestor]}); filter on indexed columns or rewrite the subquery as a join or CTE"
+                )
+            ancestor = parents[ancestor]
+
+    for names in scans_per_level.values():
+        if len(names) > 1:
+            raise QueryPlanRejected(
+                f"Tables {', '.join(names)} are joined without a join condition on indexed columns "
+                "(cartesian product); add a join condition or aggregate in separate CTEs"
+            )
+
+
+class QueryBudget:
+    """
+    Wall-clock and VM-step budget for the statement running on a connection, enforced
+    through SQLite's progress handler, which interrupts the query when it runs out.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, timeout: float = SQL_TIMEOUT_SECONDS,
+                 max_steps: int = SQL_MAX_VM_STEPS, interval: int = SQL_PROGRESS_INTERVAL):
+        self.conn = conn
+        self.timeout = timeout
+        self.max_steps = max_steps
+        self.interval = interval
+        self.steps = 0
+        self.exceeded: str | None = None
+
+    def _progress(self) -> int:
+        self.steps += self.interval
+        if self.steps > self.max_steps:
+            self.exceeded = f"Query stopped after {self.max_steps:,} SQLite steps"
+        elif time.monotonic() > self.deadline:
+            self.exceeded = f"Query stopped after {self.timeout:g} seconds"
+        # A non-zero return interrupts the statement
+        return 1 if self.exceeded else 0
+
+    def __enter__(self):
+        self.deadline = time.monotonic() + self.timeout
+        self.conn.set_progress_handler(self._progress, self.interval)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Pooled connections are reused: the handler must not outlive the query
+        self.conn.set_progress_handler(None, 0)
+        if self.exceeded and isinstance(exc, sqlite3.OperationalError) and not isinstance(exc, SQLGuardError):
+            logger.warning(f"{self.exceeded}: query interrupted")
+            raise QueryTimeoutError(
+                f"{self.exceeded}; the query is too expensive, filter on the latest period or aggregate"
+            ) from exc
+        return False
+
+
+def fetch_limited(cursor: sqlite3.Cursor, max_rows: int = SQL_MAX_ROWS) -> list:
+    """
+    Fetches at most max_rows rows, one more is read only to detect a larger result.
+
+    Raises:
+        RowLimitExceeded
+    """
+    rows = cursor.fetchmany(max_rows + 1)
+    if len(rows) > max_rows:
+        raise RowLimitExceeded(
+            f"Query returns more than {max_rows:,} rows; aggregate with GROUP BY or add a LIMIT"
+        )
+    return rows
@@ -0,0 +1,155 @@
+import sqlite3
+from loguru import logger
+
+# Per-period aggregates for the canonical questions of the SQL prompt. Each table
+# is (dimensions, source columns it needs); a dimension is (column name, SQL expression).
+# Every table also carries employee_count, so answers are SUM(employee_count) over a
+# few hundred rows per period instead of COUNT(*) over the full employee table.
+AGE_BAND_SQL = """CASE
+    WHEN n_usia < 0 THEN 'unknown'
+    WHEN n_usia < 25 THEN '<25'
+    WHEN n_usia < 30 THEN '25-29'
+    WHEN n_usia < 35 THEN '30-34'
+    WHEN n_usia < 42 THEN '35-41'
+    WHEN n_usia < 46 THEN '42-45'
+    WHEN n_usia < 51 THEN '46-50'
+    WHEN n_usia < 56 THEN '51-55'
+    ELSE '56+'
+END"""
+
+SUMMARY_TABLES = {
+    "demography_summary": (
+        [
+            ("n_tahun", "n_tahun"),
+            ("n_bulan", "n_bulan"),
+            ("v_consolidated", "v_consolidated"),
+            ("v_company_code", "v_company_code"),
+            ("c_jenis_kelamin", "c_jenis_kelamin"),
+            ("age_band", AGE_BAND_SQL),
+            ("millennial", "CASE WHEN n_usia BETWEEN 0 AND 41 THEN 1 ELSE 0 END"),
+            ("v_band_posisi", "v_band_posisi"),
+        ],
+        ("n_tahun", "n_bulan", "v_consolidated", "v_company_code", "c_jenis_kelamin", "n_usia", "v_band_posisi"),
+    ),
+    "retirement_summary": (
+        [
+            ("n_tahun", "n_tahun"),
+            ("n_bulan", "n_bulan"),
+            ("v_consolidated", "v_consolidated"),
+            ("v_company_code", "v_company_code"),
+            ("retirement_year", "strftime('%Y', d_tgl_pensiun)"),
+            ("v_employee_group", "v_employee_group"),
+            ("v_fte", "v_fte"),
+        ],
+        ("n_tahun", "n_bulan", "v_consolidated", "v_company_code", "d_tgl_pensiun", "v_employee_group", "v_fte"),
+    ),
+}
+
+SUMMARY_NOTES = {
+    "demography_summary": (
+        "age_band is one of 'unknown', '<25', '25-29', '30-34', '35-41', '42-45', '46-50', '51-55', '56+'; "
+        "millennial is 1 for employees aged 0 to 41"
+    ),
+    "retirement_summary": "retirement_year is strftime('%Y', d_tgl_pensiun) as text",
+}
+
+# Same partition key as the employee table (see lib.ingest.PARTITION_COLUMNS)
+SUMMARY_PARTITION_COLUMNS = ("n_tahun", "n_bulan", "v_consolidated")
+
+
+def _select_sql(table_name: str, dimensions: list, where: str = "") -> str:
+    expressions = ",\n    ".join(f"{expression} AS {name}" for name, expression in dimensions)
+    group_by = ", ".join(str(i) for i in range(1, len(dimensions) + 1))
+    return (
+        f"SELECT\n    {expressions},\n    COUNT(*) AS employee_count\n"
+        f"FROM {table_name}\n"
+        + (f"WHERE {where}\n" if where else "")
+        + f"GROUP BY {group_by}"
+    )
+
+
+def _available_summaries(conn: sqlite3.Connection, table_name: str) -> list:
+    columns = {col[1] for col in conn.execute(f"PRAGMA table_info({table_name})")}
+    available = []
+    for summary, (_, required) in SUMMARY_TABLES.items():
+        missing = [col for col in required if col not in columns]
+        if missing:
+            logger.debug(f"Skipping summary table {summary}: {missing} not in {table_name}")
+            continue
+        available.append(summary)
+    return available
+
+
+def summaries_exist(conn: sqlite3.Connection, table_name: str) -> bool:
+    """True when every summary the table's columns allow has been built"""
+    existing = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    return all(summary in existing for summary in _available_summaries(conn, table_name))
+
+
+def rebuild_summaries(conn: sqlite3.Connection, table_name: str) -> list:
+    """
+    Recreates every summary table from the full employee table.
+
+    Returns:
+        list: Names of the summary tables built.
+    """
+    built = []
+    for summary in _available_summaries(conn, table_name):
+        dimensions, _ = SUMMARY_TABLES[summary]
+        conn.execute(f"DROP TABLE IF EXISTS {summary}")
+        conn.execute(f"CREATE TABLE {summary} AS {_select_sql(table_name, dimensions)}")
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{summary}_period "
+            f"ON {summary} ({', '.join(SUMMARY_PARTITION_COLUMNS)})"
+        )
+        built.append(summary)
+    logger.info(f"Summary tables rebuilt from {table_name}: {built}")
+    return built
+
+
+def refresh_summaries(conn: sqlite3.Connection, table_name: str, partitions: set) -> list:
+    """
+    Recomputes only the given (n_tahun, n_bulan, v_consolidated) partitions of the
+    summary tables, after the ingest replaced those partitions in the employee table.
+    Summary tables that do not exist yet are built in full instead.
+
+    Returns:
+        list: Names of the summary tables touched.
+    """
+    if not summaries_exist(conn, table_name):
+        return rebuild_summaries(conn, table_name)
+
+    condition = " AND ".join(f"{col} IS ?" for col in SUMMARY_PARTITION_COLUMNS)
+    refreshed = []
+    for summary in _available_summaries(conn, table_name):
+        dimensions, _ = SUMMARY_TABLES[summary]
+        names = ", ".join(name for name, _ in dimensions)
+        insert = (
+            f"INSERT INTO {summary} ({names}, employee_count) "
+            f"{_select_sql(table_name, dimensions, where=condition)}"
+        )
+        for partition in partitions:
+            conn.execute(f"DELETE FROM {summary} WHERE {condition}", partition)
+            conn.execute(insert, partition)
+        refreshed.append(summary)
+    logger.info(f"Summary tables refreshed for {len(partitions)} partitions: {refreshed}")
+    return refreshed
+
+
+def describe_summary_tables(table_name: str, summary_tables: dict) -> str:
+    """Renders the summary table section of the SQL prompt, empty when there are none"""
+    if not summary_tables:
+        return ""
+    lines = [
+        f'Summary Tables: Besides "{table_name}", the pre-aggregated tables below may be used. '
+        f"Each row holds employee_count, the number of employees for that combination of column values "
+        f"within one period (n_tahun, n_bulan) and v_consolidated value, so count employees with "
+        f'SUM(employee_count) instead of COUNT(*). Prefer a summary table whenever it has every column '
+        f'the question needs, otherwise query "{table_name}".'
+    ]
+    for summary, columns in summary_tables.items():
+        note = SUMMARY_NOTES.get(summary)
+        lines.append(f"    - {summary}: {list(columns)}" + (f". {note}" if note else ""))
+    return "\n".join(lines)
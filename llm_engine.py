@@ -1,14 +1,97 @@
 import os
+import json
+import time
 import httpx
+from loguru import logger
 from dotenv import load_dotenv
+from lib.llm_endpoints import LLMEndpoint, LLMCallError, hedged_call
+from lib.metrics import LLM_CALLS, LLM_FALLBACK_CALLS, LLM_SECONDS, LLM_PROMPT_CHARS, LLM_RESPONSE_CHARS
 
 load_dotenv('.env')
 
 URL_CUSTOM_LLM_APILOGY = os.getenv('URL_CUSTOM_LLM')
 TOKEN_CUSTOM_LLM_APILOGY = os.getenv('TOKEN_CUSTOM_LLM')
 
-URL_CUSTOM_LLM_K3S = os.getenv('URL_CUSTOM_LLM')
-TOKEN_CUSTOM_LLM_K3S = os.getenv('TOKEN_CUSTOM_LLM')
+# Secondary endpoint, used when the primary is failing or slower than usual
+URL_CUSTOM_LLM_K3S = os.getenv('URL_CUSTOM_LLM_K3S')
+TOKEN_CUSTOM_LLM_K3S = os.getenv('TOKEN_CUSTOM_LLM_K3S', TOKEN_CUSTOM_LLM_APILOGY)
+
+# Endpoints in order of preference, each with its own circuit breaker and latency stats
+LLM_ENDPOINTS = [LLMEndpoint("apilogy", URL_CUSTOM_LLM_APILOGY, TOKEN_CUSTOM_LLM_APILOGY)]
+if URL_CUSTOM_LLM_K3S and URL_CUSTOM_LLM_K3S != URL_CUSTOM_LLM_APILOGY:
+    LLM_ENDPOINTS.append(LLMEndpoint("k3s", URL_CUSTOM_LLM_K3S, TOKEN_CUSTOM_LLM_K3S))
+
+# Connection pool settings for the shared LLM client
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '50'))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', '20'))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv('LLM_KEEPALIVE_EXPIRY', '30'))
+LLM_HTTP2 = os.getenv('LLM_HTTP2', 'false').lower() in ('1', 'true', 'yes')
+
+# Per-phase timeouts in seconds
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', '10'))
+LLM_READ_TIMEOUT = float(os.getenv('LLM_READ_TIMEOUT', '60'))
+LLM_WRITE_TIMEOUT = float(os.getenv('LLM_WRITE_TIMEOUT', '10'))
+LLM_POOL_TIMEOUT = float(os.getenv('LLM_POOL_TIMEOUT', '10'))
+
+_llm_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional 'h2' package (httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _create_llm_client() -> httpx.AsyncClient:
+    http2 = LLM_HTTP2
+    if http2 and not _http2_available():
+        logger.warning("LLM_HTTP2 is enabled but the 'h2' package is not installed. Falling back to HTTP/1.1.")
+        http2 = False
+
+    logger.info(
+        f"Starting LLM client (max_connections={LLM_MAX_CONNECTIONS}, "
+        f"keepalive={LLM_MAX_KEEPALIVE_CONNECTIONS}, http2={http2})"
+    )
+    return httpx.AsyncClient(
+        verify=False,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(
+            connect=LLM_CONNECT_TIMEOUT,
+            read=LLM_READ_TIMEOUT,
+            write=LLM_WRITE_TIMEOUT,
+            pool=LLM_POOL_TIMEOUT
+        )
+    )
+
+
+async def start_llm_client() -> httpx.AsyncClient:
+    """Create the worker-wide LLM client. Called from the FastAPI lifespan."""
+    return get_llm_client()
+
+
+async def close_llm_client() -> None:
+    """Close the worker-wide LLM client and its pooled connections."""
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.aclose()
+        _llm_client = None
+        logger.info("LLM client closed")
+
+
+def get_llm_client() -> httpx.AsyncClient:
+    """Return the shared LLM client, creating it lazily when used outside the lifespan"""
+    global _llm_client
+    if _llm_client is None or _llm_client.is_closed:
+        _llm_client = _create_llm_client()
+    return _llm_client
 
 
 async def make_async_api_call(url, token, payload):
@@ -17,34 +100,97 @@ async def make_async_api_call(url, token, payload):
         "Accept": "application/json",
         "x-api-key": token
     }
-    async with httpx.AsyncClient(timeout=60.0, verify=False) as client:
-        try:
-            response = await client.post(url, json=payload, headers=headers)
-            if response.status_code == 200:
-                return response.json()['choices'][0]['message']['content']
-            else:
-                error_message = response.text
+    client = get_llm_client()
+    try:
+        response = await client.post(url, json=payload, headers=headers)
+        if response.status_code == 200:
+            return response.json()['choices'][0]['message']['content']
+        else:
+            error_message = response.text
+            print(f"API Error {response.status_code}: {error_message}")
+            return {"error": f"API call failed with status {response.status_code}"}
+    except Exception as e:
+        print(f"Exception during API call: {e}")
+        return {"error": str(e)}
+
+
+async def call_llm(kind, payload):
+    """
+    Runs a chat completion against the configured endpoints with hedging and circuit
+    breaking (see lib.llm_endpoints). Returns the content, or {"error": ...} like
+    make_async_api_call when no endpoint answered.
+    """
+    async def call(endpoint):
+        result = await make_async_api_call(endpoint.url, endpoint.token, payload)
+        if isinstance(result, dict) and "error" in result:
+            raise LLMCallError(result["error"])
+        return result
+
+    LLM_PROMPT_CHARS.observe(_prompt_chars(payload), kind=kind)
+    try:
+        result = await hedged_call(LLM_ENDPOINTS, kind, call)
+    except LLMCallError as e:
+        logger.error(f"LLM {kind} call failed on every endpoint: {e}")
+        return {"error": str(e)}
+    LLM_RESPONSE_CHARS.observe(len(result), kind=kind)
+    return result
+
+
+def _prompt_chars(payload) -> int:
+    return sum(len(message["content"]) for message in payload["messages"])
+
+
+class LLMStreamError(Exception):
+    """Raised when a streaming LLM call fails"""
+
+
+async def make_async_stream_call(url, token, payload):
+    """
+    Calls an OpenAI compatible chat completion endpoint with "stream": true and
+    yields the content deltas from its Server-Sent Events as they arrive.
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "Accept": "text/event-stream",
+        "x-api-key": token
+    }
+    client = get_llm_client()
+    try:
+        async with client.stream("POST", url, json=payload, headers=headers) as response:
+            if response.status_code != 200:
+                error_message = (await response.aread()).decode(errors="replace")
                 print(f"API Error {response.status_code}: {error_message}")
-                return {"error": f"API call failed with status {response.status_code}"}
-        except Exception as e:
-            print(f"Exception during API call: {e}")
-            return {"error": str(e)}
+                raise LLMStreamError(f"API call failed with status {response.status_code}")
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                content = (choices[0].get("delta") or {}).get("content")
+                if content:
+                    yield content
+    except LLMStreamError:
+        raise
+    except Exception as e:
+        print(f"Exception during API stream: {e}")
+        raise LLMStreamError(str(e)) from e
 
 
-async def telkomllm_generate_sql(prompt, table_name, columns_list, month, year, user_query):
-    url = URL_CUSTOM_LLM_APILOGY
-    token = TOKEN_CUSTOM_LLM_APILOGY
+async def telkomllm_generate_sql(system_prompt, user_query):
+    """
+    Args:
+        system_prompt (str): SQL generation prompt compiled for the question (see lib.prompt_compiler).
+        user_query (str): The user's question.
+    """
     payload = {
         "model": "telkom-ai-instruct",
         "messages": [
             {
                 "role": "system",
-                "content": prompt.format(
-                    table_name=table_name,
-                    columns_list=columns_list,
-                    month=month,
-                    year=year
-                )
+                "content": system_prompt
             },
             {
                 "role": "user",
@@ -56,17 +202,11 @@ async def telkomllm_generate_sql(prompt, table_name, columns_list, month, year,
         "stream": False
     }
 
-    result = await make_async_api_call(url, token, payload)
-    if isinstance(result, dict) and "error" in result:
-        # Fallback to secondary endpoint
-        result = await make_async_api_call(URL_CUSTOM_LLM_K3S, TOKEN_CUSTOM_LLM_K3S, payload)
-    return result
+    return await call_llm("generate_sql", payload)
 
 
-async def telkomllm_infer_sql(prompt, user_query, table_name, columns_list, table_data, year, month):
-    url = URL_CUSTOM_LLM_APILOGY
-    token = TOKEN_CUSTOM_LLM_APILOGY
-    payload = {
+def _build_infer_payload(prompt, user_query, table_name, columns_list, table_data, year, month, stream=False, max_tokens=28000):
+    return {
         "model": "telkom-ai-instruct",
         "messages": [
             {
@@ -85,21 +225,68 @@ async def telkomllm_infer_sql(prompt, user_query, table_name, columns_list, tabl
                 "content": user_query
             }
         ],
-        "max_tokens": 28000,
+        "max_tokens": max_tokens,
         "temperature": 0,
-        "stream": False
+        "stream": stream
     }
 
-    result = await make_async_api_call(url, token, payload)
-    if isinstance(result, dict) and "error" in result:
-        # Fallback to secondary endpoint
-        result = await make_async_api_call(URL_CUSTOM_LLM_K3S, TOKEN_CUSTOM_LLM_K3S, payload)
-    return result
+
+async def telkomllm_infer_sql(prompt, user_query, table_name, columns_list, table_data, year, month, max_tokens=28000):
+    payload = _build_infer_payload(prompt, user_query, table_name, columns_list, table_data, year, month, max_tokens=max_tokens)
+
+    return await call_llm("infer", payload)
+
+
+async def telkomllm_infer_sql_stream(prompt, user_query, table_name, columns_list, table_data, year, month, max_tokens=28000):
+    """Same as telkomllm_infer_sql, but yields the insight text chunk by chunk as the LLM produces it"""
+    payload = _build_infer_payload(
+        prompt, user_query, table_name, columns_list, table_data, year, month, stream=True, max_tokens=max_tokens
+    )
+
+    # A stream cannot be hedged once it is relayed to the client, so endpoints are only
+    # tried in turn, skipping those with an open circuit, until one starts streaming
+    kind = "infer_stream"
+    LLM_PROMPT_CHARS.observe(_prompt_chars(payload), kind=kind)
+    last_error = LLMStreamError("No LLM endpoint available")
+    failover = False
+    for endpoint in LLM_ENDPOINTS:
+        if not endpoint.configured or not endpoint.breaker.allow():
+            failover = failover or endpoint.configured
+            continue
+        if failover:
+            LLM_FALLBACK_CALLS.inc(endpoint=endpoint.name, kind=kind, reason="failover")
+        started = False
+        response_chars = 0
+        begin = time.monotonic()
+        try:
+            async for chunk in make_async_stream_call(endpoint.url, endpoint.token, payload):
+                started = True
+                response_chars += len(chunk)
+                yield chunk
+        except LLMStreamError as e:
+            endpoint.record_failure()
+            LLM_CALLS.inc(endpoint=endpoint.name, kind=kind, outcome="error")
+            if started:
+                raise
+            logger.warning(f"LLM stream on {endpoint.name} failed, trying the next endpoint: {e}")
+            last_error = e
+            failover = True
+            continue
+        except BaseException:
+            # Client went away (generator closed or cancelled), not the endpoint's fault
+            endpoint.breaker.release()
+            LLM_CALLS.inc(endpoint=endpoint.name, kind=kind, outcome="cancelled")
+            raise
+        latency = time.monotonic() - begin
+        endpoint.record_success(kind, latency)
+        LLM_CALLS.inc(endpoint=endpoint.name, kind=kind, outcome="ok")
+        LLM_SECONDS.observe(latency, endpoint=endpoint.name, kind=kind)
+        LLM_RESPONSE_CHARS.observe(response_chars, kind=kind)
+        return
+    raise last_error
 
 
 async def telkomllm_fix_sql(prompt, error_sql, error_message):
-    url = URL_CUSTOM_LLM_APILOGY
-    token = TOKEN_CUSTOM_LLM_APILOGY
     payload = {
         "model": "telkom-ai-instruct",
         "messages": [
@@ -116,8 +303,4 @@ async def telkomllm_fix_sql(prompt, error_sql, error_message):
         "stream": False
     }
 
-    result = await make_async_api_call(url, token, payload)
-    if isinstance(result, dict) and "error" in result:
-        # Fallback to secondary endpoint
-        result = await make_async_api_call(URL_CUSTOM_LLM_K3S, TOKEN_CUSTOM_LLM_K3S, payload)
-    return result
\ No newline at end of file
+    return await call_llm("fix_sql", payload)
\ No newline at end of file
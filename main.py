@@ -1,13 +1,14 @@
 import os
 import sys
+import json
+import asyncio
 import time
-import sqlite3
-import pandas as pd
 import glob
 from datetime import datetime, timedelta, date
 from fastapi import FastAPI, Depends, Security, HTTPException, Response
 from fastapi.security.api_key import APIKey, APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from starlette.status import HTTP_403_FORBIDDEN
 from starlette.middleware.base import BaseHTTPMiddleware
 from pydantic import BaseModel
@@ -15,9 +16,30 @@ from dotenv import load_dotenv
 import warnings
 from secure import Secure
 from loguru import logger
-from lib.prompt import generate_sql_prompt, generate_insight_prompt, sql_fix_prompt
-from llm_engine import telkomllm_generate_sql, telkomllm_infer_sql, telkomllm_fix_sql
-from db_update import fetch_api_data, save_to_json, download_minio_data
+from lib.prompt import generate_insight_prompt, sql_fix_prompt
+from lib.prompt_compiler import compile_sql_prompt
+from lib.results import shape_result
+from lib.single_flight import insight_flights, prepare_flights, flight_key
+from lib.cache import insight_cache, normalize_query, rows_digest
+from lib.db_versions import data_version, resolve_database, build_version
+from lib.schema import load_schema, get_schema
+from lib.router import route_query
+from lib.ingest import ingest_files, unchanged_sources, IngestResult
+from lib.snapshot import write_snapshot, snapshot_is_fresh, restore_snapshot, table_exists
+from lib.jobs import DataUpdateJob, data_update_jobs
+from lib.ingest_lock import ingest_lock, load_once, source_fingerprint, write_ready_marker
+from lib.readiness import (
+    data_readiness, count_rows, wait_for_files, WAITING_FOR_FILES, LOADING, FAILED,
+    STARTUP_RETRY_SECONDS, NOT_READY_RETRY_AFTER
+)
+from lib.database import execute_query, get_read_pool, reset_read_pool, close_read_pool
+from lib.sql_guard import SQLGuardError, QueryTimeoutError
+from lib.metrics import (
+    registry, stage, begin_request, server_timing, PROMETHEUS_CONTENT_TYPE,
+    HTTP_REQUEST_SECONDS, SQL_QUERIES, SQL_FIX_RETRIES, SQL_ROWS
+)
+from llm_engine import telkomllm_generate_sql, telkomllm_infer_sql, telkomllm_infer_sql_stream, telkomllm_fix_sql, start_llm_client, close_llm_client
+from db_update import fetch_all_api_data, download_minio_data, DATA_DIR
 
 # Load environment variables and suppress unimportant warnings
 load_dotenv('.env', override=True)
@@ -33,7 +55,16 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         super().__init__(app)
 
     async def dispatch(self, request, call_next):
+        # Pipeline stages record their durations into this dict (see lib.metrics.stage)
+        timings = begin_request()
+        started = time.perf_counter()
         response: Response = await call_next(request)
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            elapsed, method=request.method, route=getattr(route, "path", "unmatched"), status=response.status_code
+        )
+        response.headers["Server-Timing"] = server_timing(timings, total=elapsed)
         await secure_headers.set_headers_async(response)
         response.headers['Cross-Origin-Embedder-Policy'] = 'require-corp'
         response.headers['Cross-Origin-Resource-Policy'] = 'same-origin'
@@ -59,25 +90,11 @@ logger.add(sys.stderr, level="TRACE")
 logger.add(sys.stderr, format="{time} | {level} | {message}")
 logger.add("log/HCM Insight bot.log", rotation="1 hour")
 
-# Initialize FastAPI app with CORS settings
-app = FastAPI(
-    title='HCM INSIGHT GENERATOR BOT',
-    description='HCM INSIGHT GENERATOR bot services using FastAPI',
-    version='0.1',
-    docs_url=None,
-    redoc_url=None
-)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=['*'],
-    allow_credentials=True,
-    allow_methods=["DELETE", "GET", "POST", "PUT"],
-    allow_headers=["*"],
-)
-
 # Configuration constants
 TABLE_NAME = "employee_demography"
-DATABASE_API = "/app/data/HCM_Insight_API.db"
+# The folder the data update downloads into is the one ingested at startup
+DATA_FOLDER = DATA_DIR
+DATABASE_API = os.getenv('DATABASE_API', os.path.join(DATA_FOLDER, 'HCM_Insight_API.db'))
 
 class QueryInput(BaseModel):
     query: str
@@ -85,13 +102,6 @@ class QueryInput(BaseModel):
 class ChatResponse(BaseModel):
     output: str
 
-def process_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    """Standard processing for dataframes containing 'n_usia' column"""
-    df['n_usia'] = pd.to_numeric(df['n_usia'], errors='coerce')
-    df['n_usia'] = df['n_usia'].fillna(-1).astype(int)
-    df['n_usia'] = df['n_usia'].round().astype(int)
-    return df
-
 def generate_year_month_combinations(start_date: str) -> list:
     """Generate year/month combinations from start date to last completed month"""
     start = datetime.strptime(start_date, "%Y %m")
@@ -126,19 +136,22 @@ def get_previous_month():
     return previous_date.strftime("%B %Y").split()
 
 
-def insert_api_data_to_db(file_path: str, db_path: str, table_name: str) -> None:
+def insert_api_data_to_db(file_path: str, db_path: str, table_name: str) -> IngestResult:
     """
-    Reads all JSON files from the specified directory, processes them,
-    concatenates into a single DataFrame, and saves the result into a SQLite database.
+    Loads the JSON files from the specified directory into a SQLite database.
+    Only files that are new or changed since the last run (according to the
+    ingest manifest in the database) are parsed, and each of them replaces just
+    its own (n_tahun, n_bulan, v_consolidated) partitions.
     If no files are found initially, the function will recheck every 30 seconds until files are found.
 
     Args:
         file_path (str): Path to the directory containing JSON files.
-        db_path (str): Path to the SQLite database file to be created.
+        db_path (str): Logical path of the SQLite database, the data lives in published versions of it.
         table_name (str): Name of the table in the SQLite database.
-    """
-    dataframes = []
 
+    Returns:
+        IngestResult: Files ingested, unchanged and failed in this run.
+    """
     try:
         logger.debug(f"Start api_data_to_db: {file_path}")
 
@@ -152,154 +165,435 @@ def insert_api_data_to_db(file_path: str, db_path: str, table_name: str) -> None
             logger.warning(f"No JSON files found in directory: {file_path}. Rechecking in 30 seconds...")
             time.sleep(30)
 
-        # Process each JSON file
-        for file in json_files:
-            try:
-                df = pd.read_json(file, encoding='latin1')
-                df = process_dataframe(df)  # Assume this function is defined elsewhere
-                dataframes.append(df)
-            except Exception as e:
-                logger.error(f"Failed to process file {file}: {e}")
-
-        # Combine all processed DataFrames
-        final_df = pd.concat(dataframes, ignore_index=True) if dataframes else pd.DataFrame()
-
-        if not final_df.empty:
-            # Ensure the directory for the database exists
-            os.makedirs(os.path.dirname(db_path), exist_ok=True)
-
-            # Save to SQLite database
-            with sqlite3.connect(db_path) as conn:
-                final_df.to_sql(table_name, conn, if_exists='replace', index=False)
-
-            logger.info(f"Data successfully inserted into {db_path} from {len(json_files)} JSON files.")
+        # Build the new data in a copy of the database and publish it atomically,
+        # readers keep using the current version until then
+        def build(path):
+            result = ingest_files(path, table_name, json_files)
+            return result, result.changed
+
+        # One build at a time across workers, a concurrent one would drop the other's changes
+        with ingest_lock(db_path):
+            fingerprint = source_fingerprint(json_files)
+            # Nothing new in the sources: skip copying the database for an empty build
+            result, published_path = build_version(
+                db_path, build, unchanged=lambda path: unchanged_sources(path, table_name, json_files)
+            )
+            # Files that failed are retried on the next start
+            if (published_path or result.unchanged) and not result.failed:
+                write_ready_marker(db_path, fingerprint)
+
+        if published_path:
+            # Cached SQL, rows and insights may refer to the old table contents
+            insight_cache.clear()
+            reset_read_pool()
+            load_schema(db_path, table_name)
+            write_snapshot(published_path, table_name, snapshot_path_for(db_path))
+
+            logger.info(f"Data successfully inserted into {db_path} from {len(result.ingested)} JSON files.")
+        elif result.unchanged:
+            logger.info(f"All {len(result.unchanged)} JSON files already loaded into {db_path}.")
         else:
             logger.warning("No valid data found to insert into the database.")
+        return result
 
     except Exception as e:
         logger.error(f"Failed to insert API data into database: {e}")
         raise HTTPException(status_code=500, detail="API data processing error")
 
+def snapshot_path_for(db_path: str) -> str:
+    return os.path.splitext(db_path)[0] + ".arrow"
+
+
+def restore_from_snapshot(file_path: str, db_path: str, table_name: str) -> bool:
+    """
+    Cold start fast path: when the database has no table yet but the columnar snapshot
+    is newer than every source file, load the snapshot instead of parsing the JSON files.
+    """
+    snapshot_path = snapshot_path_for(db_path)
+    json_files = glob.glob(os.path.join(file_path, "*.json"))
+    try:
+        with ingest_lock(db_path):
+            if table_exists(resolve_database(db_path), table_name) or not snapshot_is_fresh(snapshot_path, json_files):
+                return False
+            build_version(
+                db_path,
+                lambda path: (None, restore_snapshot(snapshot_path, path, table_name) > 0),
+                copy_current=False
+            )
+        return True
+    except Exception as e:
+        logger.error(f"Snapshot restore failed, falling back to JSON ingest: {e}")
+        return False
+
+
+def load_initial_data():
+    restore_from_snapshot(
+        file_path=DATA_FOLDER,
+        table_name=TABLE_NAME,
+        db_path=DATABASE_API
+    )
+    insert_api_data_to_db(
+        file_path=DATA_FOLDER,
+        table_name=TABLE_NAME,
+        db_path=DATABASE_API
+    )
+
+
 def startup_event():
-    # API data loading is now async
+    # Every uvicorn worker runs this; only one of them loads the data, the others
+    # wait for its ready marker (see lib.ingest_lock.load_once)
     try:
         logger.info("Starting up HCM Insight Dashboard. Loading initial API data...")
-        insert_api_data_to_db(
-            file_path="/app/data",
-            table_name=TABLE_NAME,
-            db_path=DATABASE_API
+        load_once(
+            DATABASE_API,
+            lambda: source_fingerprint(glob.glob(os.path.join(DATA_FOLDER, "*.json"))),
+            load_initial_data
         )
     except Exception as e:
         logger.error(f"Initial API data load failed: {e}")
 
+
+async def load_data_in_background():
+    """
+    Waits for source files and loads them off the lifespan, so the server answers /ht
+    (and a fast 503 on the insight endpoints) while the data is not ready yet.
+    """
+    while True:
+        data_readiness.set_state(WAITING_FOR_FILES)
+        await wait_for_files(DATA_FOLDER)
+        data_readiness.set_state(LOADING)
+        started = time.perf_counter()
+        await asyncio.to_thread(startup_event)
+        rows = await asyncio.to_thread(count_rows, DATABASE_API, TABLE_NAME)
+        if rows is not None:
+            data_readiness.mark_ready(rows, time.perf_counter() - started)
+            logger.info(f"Data ready: {rows} rows in {TABLE_NAME}, version {data_version(DATABASE_API)}")
+            return
+        data_readiness.set_state(FAILED, error="Initial data load produced no table, see the logs")
+        await asyncio.sleep(STARTUP_RETRY_SECONDS)
+
+
 async def lifespan(app: FastAPI):
     # Startup logic
-    startup_event()
+    await start_llm_client()
+    get_read_pool(DATABASE_API)
+    data_readiness.reset()
+    startup_task = asyncio.create_task(load_data_in_background())
     yield  # Required to separate startup and shutdown phases
+    # Shutdown logic
+    startup_task.cancel()
+    await close_llm_client()
+    close_read_pool()
 
-# Attach the lifespan to the app
-app = FastAPI(lifespan=lifespan)
 
-# API endpoints
-@app.post("/HCM_Insight/get_insight_api", response_model=ChatResponse, tags=["Insights"])
-async def get_insight_api(
-    input_data: QueryInput,
-    x_api_key: APIKey = Depends(get_api_key)
-):
+async def require_data_ready():
+    """Answers right away while the data is still loading, instead of failing on a missing table"""
+    if not data_readiness.ready:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Data is not ready yet ({data_readiness.state})",
+            headers={"Retry-After": str(NOT_READY_RETRY_AFTER)}
+        )
+
+# Initialize FastAPI app with the lifespan, CORS settings and security headers
+app = FastAPI(
+    title='HCM INSIGHT GENERATOR BOT',
+    description='HCM INSIGHT GENERATOR bot services using FastAPI',
+    version='0.1',
+    docs_url=None,
+    redoc_url=None,
+    lifespan=lifespan
+)
+app.add_middleware(SecurityHeadersMiddleware)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=['*'],
+    allow_credentials=True,
+    allow_methods=["DELETE", "GET", "POST", "PUT"],
+    allow_headers=["*"],
+)
+
+async def prepare_insight_data(user_query: str):
+    """
+    Runs the SQL side of the insight pipeline (schema lookup, SQL generation, execution)
+    and returns what the insight LLM call needs.
+
+    Returns:
+        tuple: (column_list, month, year, shaped result for the insight prompt, insight_key)
+    """
     try:
-        conn = sqlite3.connect(DATABASE_API)
-        cursor = conn.cursor()
-        cursor.execute(f"PRAGMA table_info({TABLE_NAME})")
-        columns_info = cursor.fetchall()
-        conn.close()
+        with stage("schema"):
+            schema = get_schema(DATABASE_API, TABLE_NAME)
     except Exception as e:
         logger.error(f"Error retrieving table info: {e}")
         raise HTTPException(status_code=500, detail="Error retrieving table info")
 
-    if not columns_info:
+    if schema is None:
         raise HTTPException(status_code=404, detail="Table not found")
 
-    column_list = [col[1] for col in columns_info]
-    
-    try:
-        prev_month = get_previous_month()
-        month, year = prev_month[0], prev_month[1]
-        generated_sql = await telkomllm_generate_sql(
-            prompt = generate_sql_prompt, 
-            table_name = TABLE_NAME, 
-            columns_list = column_list, 
-            month = month,
-            year = year,
-            user_query = input_data.query
-        )
-        logger.debug(f"Generated SQL: {generated_sql}")
-    except Exception as e:
-        logger.error(f"LLM API call failed: {e}")
-        raise HTTPException(status_code=500, detail="LLM API call failed")
-
-    try:
-        conn = sqlite3.connect(DATABASE_API)
-        cursor = conn.cursor()
-        cursor.execute(generated_sql)
-        rows = cursor.fetchall()
-        logger.debug(f"Data Rows: {rows}")
-        conn.close()
-    except Exception as e:
+    column_list = schema.column_list
+    prev_month = get_previous_month()
+    month, year = prev_month[0], prev_month[1]
+
+    # Cache keys: the same question in the same period against the same schema/data
+    normalized_query = normalize_query(user_query)
+    sql_key = (normalized_query, month, year, schema.schema_hash)
+    version = data_version(DATABASE_API)
+
+    generated_sql = insight_cache.sql.get(sql_key)
+    routed = None if generated_sql is not None else route_query(user_query, schema, month, year)
+    if generated_sql is not None:
+        SQL_QUERIES.inc(source="cache")
+        logger.debug(f"SQL cache hit: {generated_sql}")
+    elif routed is not None:
+        # Known question family, the SQL template is filled locally without an LLM call
+        generated_sql = routed.sql
+        SQL_QUERIES.inc(source="routed")
+        logger.debug(f"Routed SQL ({routed.intent}): {generated_sql}")
+    else:
         try:
-            error_sql = generated_sql
-            error_message = str(e)
-            generated_sql = await telkomllm_fix_sql(
-                sql_fix_prompt, 
-                error_sql, 
-                error_message
-            )
-            conn = sqlite3.connect(DATABASE_API)
-            cursor = conn.cursor()
-            cursor.execute(generated_sql)
-            rows = cursor.fetchall()
+            with stage("generate_sql"):
+                sql_prompt = compile_sql_prompt(schema, user_query, month, year)
+                generated_sql = await telkomllm_generate_sql(
+                    system_prompt = sql_prompt.text,
+                    user_query = user_query
+                )
+            SQL_QUERIES.inc(source="llm")
+            logger.debug(f"Generated SQL: {generated_sql}")
+        except Exception as e:
+            logger.error(f"LLM API call failed: {e}")
+            raise HTTPException(status_code=500, detail="LLM API call failed")
+
+    cached_result = insight_cache.rows.get((generated_sql, version)) if version else None
+    if cached_result is not None:
+        result_columns, rows = cached_result
+        logger.debug(f"Rows cache hit for SQL: {generated_sql}")
+    else:
+        try:
+            with stage("execute_sql"):
+                result_columns, rows = await execute_query(DATABASE_API, generated_sql)
             logger.debug(f"Data Rows: {rows}")
-            conn.close()
-        except Exception as E:
-            logger.error(f"SQL execution failed: {E}")
-            raise HTTPException(status_code=500, detail=f"SQL execution failed: {E}")
-
-    insight = await telkomllm_infer_sql(
-        prompt = generate_insight_prompt, 
-            table_name = TABLE_NAME, 
+        except Exception as e:
+            try:
+                error_sql = generated_sql
+                error_message = str(e)
+                with stage("fix_sql"):
+                    generated_sql = await telkomllm_fix_sql(
+                        sql_fix_prompt, 
+                        error_sql, 
+                        error_message
+                    )
+                with stage("execute_sql"):
+                    result_columns, rows = await execute_query(DATABASE_API, generated_sql)
+                SQL_FIX_RETRIES.inc(outcome="ok")
+                logger.debug(f"Data Rows: {rows}")
+            except Exception as E:
+                SQL_FIX_RETRIES.inc(outcome="failed")
+                logger.error(f"SQL execution failed: {E}")
+                # Queries stopped by the guard are the question's fault, not the service's
+                if isinstance(E, QueryTimeoutError):
+                    status_code = 504
+                elif isinstance(E, SQLGuardError):
+                    status_code = 422
+                else:
+                    status_code = 500
+                raise HTTPException(status_code=status_code, detail=f"SQL execution failed: {E}")
+
+        # Only SQL that actually executed is worth remembering
+        insight_cache.sql.set(sql_key, generated_sql)
+        if version:
+            insight_cache.rows.set((generated_sql, version), (result_columns, rows))
+        SQL_ROWS.observe(len(rows))
+
+    insight_key = (normalized_query, month, year, rows_digest(rows))
+    return column_list, month, year, shape_result(result_columns, rows), insight_key
+
+
+# API endpoints
+@app.post("/HCM_Insight/get_insight_api", response_model=ChatResponse, tags=["Insights"],
+          dependencies=[Depends(require_data_ready)])
+async def get_insight_api(
+    input_data: QueryInput,
+    x_api_key: APIKey = Depends(get_api_key)
+):
+    month, year = get_previous_month()
+    # Identical questions against the same data are computed once, however many arrive at the same time
+    key = flight_key(normalize_query(input_data.query), data_version(DATABASE_API), month, year)
+    insight = await insight_flights.do(
+        key,
+        lambda: generate_insight(input_data.query),
+        shareable=lambda insight: isinstance(insight, str)
+    )
+    logger.info(f"Generated Insight: {insight}")
+    logger.debug(f"Cache stats: {insight_cache.stats()}, single-flight: {insight_flights.stats()}")
+    return ChatResponse(output=insight)
+
+
+async def generate_insight(user_query: str):
+    column_list, month, year, result, insight_key = await prepare_insight_data(user_query)
+
+    insight = insight_cache.insight.get(insight_key)
+    if insight is not None:
+        logger.debug("Insight cache hit")
+        return insight
+
+    with stage("infer"):
+        insight = await telkomllm_infer_sql(
+            prompt = generate_insight_prompt,
+            table_name = TABLE_NAME,
             columns_list = column_list,
-            table_data=rows,
+            table_data = result.table_data,
             month = month,
             year = year,
-            user_query = input_data.query
+            user_query = user_query,
+            max_tokens = result.max_tokens
+        )
+    if isinstance(insight, str):
+        insight_cache.insight.set(insight_key, insight)
+    return insight
+
+
+def format_sse(data: dict, event: str | None = None) -> str:
+    """Formats a single Server-Sent Event"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/HCM_Insight/get_insight_api/stream", tags=["Insights"], dependencies=[Depends(require_data_ready)])
+async def get_insight_api_stream(
+    input_data: QueryInput,
+    x_api_key: APIKey = Depends(get_api_key)
+):
+    """
+    Streaming variant of get_insight_api. The insight is sent as Server-Sent Events:
+    "data" events carry {"delta": ...} chunks, followed by a final "done" event
+    (or an "error" event if the LLM stream fails midway).
+    """
+    month, year = get_previous_month()
+    key = flight_key(normalize_query(input_data.query), data_version(DATABASE_API), month, year)
+    column_list, month, year, result, insight_key = await prepare_flights.do(
+        key, lambda: prepare_insight_data(input_data.query)
     )
-    logger.info(f"Generated Insight: {insight}")
-    return ChatResponse(output=insight)
 
-@app.get("/HCM_Insight/get_data_update", tags=["Data Update"])
-async def get_new_data():
-    download_minio_data()
+    async def event_stream():
+        insight = insight_cache.insight.get(insight_key)
+        if insight is not None:
+            logger.debug("Insight cache hit")
+            yield format_sse({"delta": insight})
+            yield format_sse({"output": insight}, event="done")
+            return
+
+        chunks = []
+        try:
+            async for chunk in telkomllm_infer_sql_stream(
+                prompt = generate_insight_prompt,
+                table_name = TABLE_NAME,
+                columns_list = column_list,
+                table_data = result.table_data,
+                month = month,
+                year = year,
+                user_query = input_data.query,
+                max_tokens = result.max_tokens
+            ):
+                chunks.append(chunk)
+                yield format_sse({"delta": chunk})
+        except Exception as e:
+            logger.error(f"LLM insight stream failed: {e}")
+            yield format_sse({"detail": "LLM API call failed"}, event="error")
+            return
+
+        insight = "".join(chunks)
+        insight_cache.insight.set(insight_key, insight)
+        logger.info(f"Generated Insight: {insight}")
+        yield format_sse({"output": insight}, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def run_data_update(job: DataUpdateJob) -> None:
+    """Downloads MinIO data, fetches missing months from the API and loads the new files into SQLite"""
+    job.stage = "minio"
+    started = time.perf_counter()
+    # MinIO download is blocking, keep it off the event loop
+    minio_stats = await asyncio.to_thread(download_minio_data)
+    job.minio = {key: value for key, value in minio_stats.items() if key != "downloaded"}
+    job.minio["downloaded"] = len(minio_stats["downloaded"])
+    job.durations["minio"] = round(time.perf_counter() - started, 3)
+
+    job.stage = "fetch"
+    started = time.perf_counter()
     start_date = "2022 05"  # Starting from May 2022
     consol_list=["CONSOLIDATED", "UNCONSOLIDATED", "TELKOMSEL"]
     year_month_list = generate_year_month_combinations(start_date)
-    list_data = []
-    for year_month in year_month_list:
-        year, month = year_month.split()
-        for consol in consol_list:
-            api_data = fetch_api_data(year, month, consol)
-            if api_data is None:
-                logger.info(f"Data for {year} {month} {consol} already exists. Skipping API call.")
-                continue
-            else:
-                file_path = save_to_json(api_data, year, month, consol)
-                list_data.append(file_path)
-                logger.info(f"API Data {file_path} fetched successfully")
-    return {"message": "Data update completed", "files": list_data}
+    progress = {}
+    fetch_task = asyncio.create_task(fetch_all_api_data(year_month_list, consol_list, result=progress))
+    while not fetch_task.done():
+        await asyncio.wait({fetch_task}, timeout=1)
+        job.files_fetched = list(progress.get("files", []))
+        job.files_skipped = progress.get("skipped", 0)
+        job.bytes_downloaded = progress.get("bytes", 0)
+        job.failures = list(progress.get("failed", []))
+    fetch_task.result()
+    job.durations["fetch"] = round(time.perf_counter() - started, 3)
+
+    if not glob.glob(os.path.join(DATA_FOLDER, "*.json")):
+        logger.warning(f"No JSON files in {DATA_FOLDER} after the update, nothing to ingest")
+        return
+
+    job.stage = "ingest"
+    started = time.perf_counter()
+    result = await asyncio.to_thread(
+        insert_api_data_to_db,
+        file_path=DATA_FOLDER,
+        table_name=TABLE_NAME,
+        db_path=DATABASE_API
+    )
+    job.ingested_files = len(result.ingested)
+    job.durations["ingest"] = round(time.perf_counter() - started, 3)
+    if result.changed:
+        rows = await asyncio.to_thread(count_rows, DATABASE_API, TABLE_NAME)
+        if rows is not None:
+            data_readiness.mark_ready(rows, job.durations["ingest"])
+
+
+@app.get("/HCM_Insight/get_data_update", status_code=202, tags=["Data Update"])
+async def get_new_data():
+    job, created = await data_update_jobs.start(run_data_update)
+    message = "Data update started" if created else "Data update already running"
+    return {"message": message, "job_id": job.job_id, "status": job.status}
+
+
+@app.get("/HCM_Insight/get_data_update/{job_id}", tags=["Data Update"])
+async def get_data_update_status(job_id: str):
+    job = await data_update_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 
 @app.get("/ht", tags=["Health"])
 async def health_check():
+    """Liveness: the process answers, whether or not the data is loaded"""
     return {"status": "ok"}
 
+
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness: 200 once the data is loaded, 503 before, with the loaded data version"""
+    return JSONResponse(
+        data_readiness.to_dict(data_version(DATABASE_API)),
+        status_code=200 if data_readiness.ready else 503
+    )
+
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics of this worker"""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=7799, workers=5)
\ No newline at end of file
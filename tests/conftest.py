@@ -0,0 +1,66 @@
+import json
+import sqlite3
+import pytest
+from lib.database import ReadOnlyPool
+
+DEMOGRAPHY_COLUMNS = (
+    "n_tahun", "n_bulan", "v_consolidated", "v_company_code", "c_jenis_kelamin", "n_usia",
+    "n_jumlah_keluarga", "v_band_posisi", "d_tgl_pensiun", "v_employee_group", "v_fte"
+)
+# Fields of a source file record that a test does not set itself
+SOURCE_RECORD_DEFAULTS = {
+    "v_company_code": "PT. TELKOMSEL", "c_jenis_kelamin": 1, "n_usia": 30, "v_band_posisi": "IV",
+    "d_tgl_pensiun": "2030-01-01", "v_employee_group": "Karyawan Tetap", "v_fte": "FTE",
+}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def demography_conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"CREATE TABLE employee_demography ({', '.join(DEMOGRAPHY_COLUMNS)})")
+    rows = [
+        (2025, 12, "CONSOLIDATED", "PT. TELKOMSEL", 2, 30, 3, "IV", "2026-05-01", "Karyawan Tetap", "FTE"),
+        (2025, 12, "CONSOLIDATED", "PT. TELKOMSEL", 1, 45, 1, "II", "2040-05-01", "Karyawan Tetap", "FTE"),
+        (2025, 12, "CONSOLIDATED", "PT. TELKOM AKSES", 2, 52, 1, None, "2026-02-01", "Karyawan Tetap", "FTE"),
+        (2025, 11, "CONSOLIDATED", "PT. TELKOMSEL", 1, 29, 1, "IV", "2045-01-01", "Karyawan Tetap", "FTE"),
+    ]
+    conn.executemany(f"INSERT INTO employee_demography VALUES ({', '.join('?' for _ in DEMOGRAPHY_COLUMNS)})", rows)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def read_pool(tmp_path):
+    db_path = str(tmp_path / "read_pool.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE employee_demography (v_company_code TEXT, n_usia INTEGER, n_tahun INTEGER)")
+        conn.execute("CREATE INDEX idx_company ON employee_demography (v_company_code)")
+        conn.executemany(
+            "INSERT INTO employee_demography VALUES (?, ?, ?)",
+            [(f"PT. {i % 7}", 20 + i % 40, 2024) for i in range(200)]
+        )
+    pool = ReadOnlyPool(db_path, size=2)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def write_source(tmp_path):
+    """
+    Factory writing a source file the way the API delivers one month x consolidation:
+    write_source(year, month, consol, records), each record a dict of the fields that
+    differ from SOURCE_RECORD_DEFAULTS. Returns the file path.
+    """
+    def write(year: int, month: int, consol: str, records: list) -> str:
+        path = tmp_path / f"HCM_Insight_{year}_{month:02d}_{consol}.json"
+        path.write_text(json.dumps([
+            {"n_tahun": year, "n_bulan": month, "v_consolidated": consol, **SOURCE_RECORD_DEFAULTS, **record}
+            for record in records
+        ]))
+        return str(path)
+    return write
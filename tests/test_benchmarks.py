@@ -0,0 +1,79 @@
+import os
+import json
+import sqlite3
+import pytest
+from datetime import date
+from benchmarks.synthetic_data import generate_dataset, recent_periods
+from benchmarks.stub_llm import StubLLM, DEFAULT_SQL
+from benchmarks.load import percentile, summarize
+from benchmarks.run import compare
+from lib.ingest import ingest_files
+
+
+def test_recent_periods_end_at_the_given_month():
+    assert recent_periods(3, date(2025, 2, 15)) == [(2024, 12), (2025, 1), (2025, 2)]
+
+
+def test_synthetic_data_is_ingestible(tmp_path):
+    paths = generate_dataset(str(tmp_path / "data"), months=2, rows_per_month=100, end=date(2025, 2, 1))
+    assert [os.path.basename(path) for path in paths][:2] == [
+        "HCM_Insight_2025_01_CONSOLIDATED.json", "HCM_Insight_2025_02_CONSOLIDATED.json"
+    ]
+    with open(paths[0]) as f:
+        record = json.load(f)[0]
+    assert {"n_usia", "v_company_code", "v_band_posisi", "c_jenis_kelamin", "d_tgl_pensiun"} <= set(record)
+    assert record["v_consolidated"] == "CONSOLIDATED"
+
+    db_path = str(tmp_path / "test.db")
+    result = ingest_files(db_path, "employee_demography", paths)
+    assert result.rows == 200
+    with sqlite3.connect(db_path) as conn:
+        consolidations = conn.execute(
+            "SELECT v_consolidated, COUNT(DISTINCT v_company_code) FROM employee_demography GROUP BY 1 ORDER BY 1"
+        ).fetchall()
+        assert [value for value, _ in consolidations] == ["CONSOLIDATED", "TELKOMSEL", "UNCONSOLIDATED"]
+        assert dict(consolidations)["TELKOMSEL"] == 1
+        # The stub's SQL answers from the latest period of the synthetic data
+        rows = conn.execute(DEFAULT_SQL).fetchall()
+    assert sum(count for _, count in rows) == 100
+
+
+@pytest.mark.anyio
+async def test_stub_llm_answers_like_the_llm_endpoint():
+    from llm_engine import make_async_api_call, make_async_stream_call
+    stub = StubLLM(latency=0).start()
+    try:
+        sql = await make_async_api_call(stub.url, "token", {
+            "messages": [{"role": "system", "content": "You are an expert SQL Generator."}]
+        })
+        chunks = [chunk async for chunk in make_async_stream_call(stub.url, "token", {
+            "messages": [{"role": "system", "content": "You are an expert Insight Generator."}], "stream": True
+        })]
+    finally:
+        stub.stop()
+    assert sql == DEFAULT_SQL
+    assert "".join(chunks) == stub.insight
+    assert stub.calls == {"generate_sql": 1, "infer": 1}
+
+
+def test_load_summary_percentiles():
+    summary = summarize([i / 1000 for i in range(1, 101)], errors=2, elapsed=10, concurrency=4)
+    assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]) == (50, 95, 99)
+    assert summary["requests"] == 102
+    assert summary["throughput_rps"] == 10
+    assert percentile([], 95) == 0.0
+
+
+def test_compare_flags_regressions_in_either_direction():
+    baseline = {
+        "startup": {"seconds": 10.0},
+        "load": [{"concurrency": 8, "p95_ms": 100.0, "throughput_rps": 50.0}],
+    }
+    results = {
+        "startup": {"seconds": 11.0},
+        "load": [{"concurrency": 8, "p95_ms": 150.0, "throughput_rps": 30.0}],
+    }
+    assert compare(results, baseline, tolerance=0.2) == [
+        ("load[c=8].p95_ms", 100.0, 150.0),
+        ("load[c=8].throughput_rps", 50.0, 30.0),
+    ]
@@ -0,0 +1,39 @@
+from unittest.mock import patch
+from lib.cache import TTLCache, InsightCache, normalize_query
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache("test", max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" is now most recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1}
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache("test", max_entries=10, ttl=5)
+    with patch("lib.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch("lib.cache.time.monotonic", return_value=104.0):
+        assert cache.get("a") == 1
+    with patch("lib.cache.time.monotonic", return_value=106.0):
+        assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_insight_cache_clear_resets_all_tiers():
+    cache = InsightCache(max_entries=10, ttl=60)
+    cache.sql.set("q", "SELECT 1")
+    cache.rows.set(("SELECT 1", "v1"), [(1,)])
+    cache.insight.set("q", "insight")
+    cache.clear()
+    assert all(tier["size"] == 0 for tier in cache.stats().values())
+
+
+def test_normalize_query():
+    assert normalize_query("  Buatkan   laporan\nDemografi ") == "buatkan laporan demografi"
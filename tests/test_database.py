@@ -0,0 +1,53 @@
+import sqlite3
+import threading
+import pytest
+
+
+@pytest.mark.anyio
+async def test_query_runs_off_the_event_loop_thread(read_pool):
+    caller = threading.get_ident()
+    threads = []
+    original_execute = read_pool._execute
+
+    def tracking_execute(sql):
+        threads.append(threading.get_ident())
+        return original_execute(sql)
+
+    read_pool._execute = tracking_execute
+    columns, rows = await read_pool.execute(
+        "SELECT v_company_code, COUNT(*) AS total FROM employee_demography GROUP BY v_company_code ORDER BY total DESC"
+    )
+    assert columns == ["v_company_code", "total"]
+    assert len(rows) == 7 and rows[0] == ("PT. 0", 29)
+    assert threads and threads[0] != caller
+
+
+@pytest.mark.anyio
+async def test_connections_are_read_only(read_pool):
+    with pytest.raises(sqlite3.OperationalError):
+        await read_pool.execute("DELETE FROM employee_demography")
+    _, rows = await read_pool.execute("SELECT COUNT(*) FROM employee_demography")
+    assert rows == [(200,)]
+
+
+@pytest.mark.anyio
+async def test_reset_retires_idle_connections(read_pool):
+    await read_pool.execute("SELECT 1")
+    generation, conn = read_pool._acquire()
+    read_pool._release(generation, conn)
+    read_pool.reset()
+    new_generation, new_conn = read_pool._acquire()
+    assert new_generation == generation + 1
+    assert new_conn is not conn
+    read_pool._release(new_generation, new_conn)
+
+
+@pytest.mark.anyio
+async def test_full_table_scans_are_recorded(read_pool):
+    from lib.metrics import SQL_QUERY_PLANS, registry
+    before = SQL_QUERY_PLANS.value(full_scan="true")
+    await read_pool.execute(
+        "WITH top AS (SELECT v_company_code FROM employee_demography WHERE n_usia > 40) SELECT * FROM top"
+    )
+    assert SQL_QUERY_PLANS.value(full_scan="true") == before + 1
+    assert 'hcm_sql_query_plans_total{full_scan="true"}' in registry.render()
@@ -0,0 +1,93 @@
+import os
+import json
+import hashlib
+import httpx
+import pytest
+import db_update
+
+
+@pytest.mark.anyio
+async def test_fetch_all_api_data_writes_files_and_skips_existing(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_update, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(db_update, "DATA_API_URL", "http://hcm.test/api")
+    (tmp_path / "HCM_Insight_2025_01_CONSOLIDATED.json").write_text("[]")
+    requested = []
+
+    def handler(request):
+        requested.append((request.url.params["n_bulan"], request.url.params["v_consolidated"]))
+        data = [{"n_bulan": request.url.params["n_bulan"], "n_usia": 30}]
+        return httpx.Response(200, json={"status": "success", "data": data})
+
+    result = await db_update.fetch_all_api_data(
+        ["2025 01", "2025 02"], ["CONSOLIDATED", "TELKOMSEL"], transport=httpx.MockTransport(handler)
+    )
+
+    assert sorted(requested) == [("01", "TELKOMSEL"), ("02", "CONSOLIDATED"), ("02", "TELKOMSEL")]
+    assert result["skipped"] == 1
+    assert result["failed"] == []
+    assert len(result["files"]) == 3
+    with open(os.path.join(tmp_path, "HCM_Insight_2025_02_TELKOMSEL.json")) as f:
+        assert json.load(f) == [{"n_bulan": "02", "n_usia": 30}]
+    assert not any(name.endswith((".part", ".tmp")) for name in os.listdir(tmp_path))
+
+
+class FakeObject:
+    def __init__(self, object_name, data, etag=None):
+        self.object_name = object_name
+        self.data = data
+        self.size = len(data)
+        self.etag = etag or hashlib.md5(data).hexdigest()
+        self.is_dir = False
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def stream(self, amt):
+        for i in range(0, len(self.data), amt):
+            yield self.data[i:i + amt]
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class FakeMinio:
+    def __init__(self, objects):
+        self.objects = {obj.object_name: obj for obj in objects}
+        self.downloads = []
+
+    def list_objects(self, bucket, prefix=None, recursive=False):
+        return iter(self.objects.values())
+
+    def get_object(self, bucket, object_name):
+        self.downloads.append(object_name)
+        return FakeResponse(self.objects[object_name].data)
+
+
+def test_download_minio_data_syncs_changed_objects_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_update, "minio_prefix", "hcm/")
+    client = FakeMinio([
+        FakeObject("hcm/a.json", b"[1, 2]"),
+        FakeObject("hcm/b.json", b"[3, 4]"),
+    ])
+    # Copied by hand before the first sync, identical content: verified through the ETag
+    (tmp_path / "b.json").write_bytes(b"[3, 4]")
+
+    stats = db_update.download_minio_data(client=client, local_folder=str(tmp_path), workers=2)
+    assert client.downloads == ["hcm/a.json"]
+    assert stats["skipped"] == 1
+    assert stats["bytes"] == 6
+    assert (tmp_path / "a.json").read_bytes() == b"[1, 2]"
+
+    # Same size, different content: only the ETag tells them apart
+    client.objects["hcm/a.json"] = FakeObject("hcm/a.json", b"[5, 6]")
+    client.downloads.clear()
+    stats = db_update.download_minio_data(client=client, local_folder=str(tmp_path), workers=2)
+    assert client.downloads == ["hcm/a.json"]
+    assert stats["skipped"] == 1
+    assert (tmp_path / "a.json").read_bytes() == b"[5, 6]"
+    assert not any(name.endswith(".part") for name in os.listdir(tmp_path))
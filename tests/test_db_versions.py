@@ -0,0 +1,71 @@
+import os
+import sqlite3
+import pytest
+from lib.db_versions import build_version, resolve_database, data_version
+from lib.database import ReadOnlyPool
+
+
+def _create_table(rows):
+    def build(path):
+        with sqlite3.connect(path) as conn:
+            conn.execute("DROP TABLE IF EXISTS employee_demography")
+            conn.execute("CREATE TABLE employee_demography (n_usia INTEGER)")
+            conn.executemany("INSERT INTO employee_demography VALUES (?)", [(age,) for age in rows])
+        return len(rows), True
+    return build
+
+
+def test_unchanged_build_is_not_published(tmp_path):
+    db_path = str(tmp_path / "HCM_Insight_API.db")
+    build_version(db_path, _create_table([30]))
+    version = data_version(db_path)
+
+    result, published = build_version(db_path, lambda path: (None, False))
+    assert published is None
+    assert data_version(db_path) == version
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".building")]
+
+
+def test_unchanged_check_skips_copying_the_database(tmp_path, monkeypatch):
+    import lib.db_versions as db_versions
+    db_path = str(tmp_path / "HCM_Insight_API.db")
+    build_version(db_path, _create_table([30]))
+    copies = []
+    monkeypatch.setattr(db_versions, "_copy_database", lambda source, target: copies.append(source))
+
+    def build(path):
+        raise AssertionError("nothing to build")
+
+    result, published = build_version(db_path, build, unchanged=lambda path: "unchanged")
+    assert (result, published) == ("unchanged", None)
+    assert copies == []
+
+
+def test_old_versions_are_cleaned_up(tmp_path):
+    db_path = str(tmp_path / "HCM_Insight_API.db")
+    published = [build_version(db_path, _create_table([age]))[1] for age in (30, 31, 32)]
+
+    assert resolve_database(db_path) == published[-1]
+    assert not os.path.exists(published[0])
+    assert os.path.exists(published[1])
+
+
+@pytest.mark.anyio
+async def test_readers_move_to_new_version_between_queries(tmp_path):
+    db_path = str(tmp_path / "HCM_Insight_API.db")
+    build_version(db_path, _create_table([30, 31]))
+    pool = ReadOnlyPool(db_path, size=1)
+    try:
+        _, rows = await pool.execute("SELECT COUNT(*) FROM employee_demography")
+        assert rows == [(2,)]
+
+        # A connection checked out before the swap keeps reading the old version
+        generation, old_conn = pool._acquire()
+        build_version(db_path, _create_table([30, 31, 32]))
+        assert old_conn.execute("SELECT COUNT(*) FROM employee_demography").fetchone() == (2,)
+        pool._release(generation, old_conn)
+
+        _, rows = await pool.execute("SELECT COUNT(*) FROM employee_demography")
+        assert rows == [(3,)]
+    finally:
+        pool.close()
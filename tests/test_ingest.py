@@ -0,0 +1,121 @@
+import sqlite3
+from lib.ingest import create_indexes
+from lib.sql_guard import explain_plan_rows
+
+
+def test_create_indexes_skips_missing_columns_and_analyzes(demography_conn):
+    created = create_indexes(demography_conn, "employee_demography")
+    assert "idx_employee_demography_period_consol_company" in created
+    stats = demography_conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0]
+    assert stats > 0
+
+    # Only the period and age columns exist in this table
+    demography_conn.execute("CREATE TABLE ages AS SELECT n_tahun, n_bulan, n_usia FROM employee_demography")
+    assert create_indexes(demography_conn, "ages") == ["idx_ages_period_age"]
+
+
+def test_period_filter_uses_index(demography_conn):
+    create_indexes(demography_conn, "employee_demography")
+    plan = explain_plan_rows(
+        demography_conn,
+        "SELECT v_company_code, COUNT(*) FROM employee_demography "
+        "WHERE n_tahun = 2025 AND n_bulan = 7 GROUP BY v_company_code"
+    )
+    assert any(detail.startswith("SEARCH") for _, _, detail in plan)
+
+
+def _ages(*ages):
+    return [{"n_usia": age} for age in ages]
+
+
+def test_ingest_only_reprocesses_changed_files(tmp_path, write_source):
+    from lib.ingest import ingest_files
+    db_path = str(tmp_path / "test.db")
+    first = write_source(2025, 1, "CONSOLIDATED", _ages(30, 40))
+    second = write_source(2025, 2, "CONSOLIDATED", _ages(31, "n/a"))
+
+    result = ingest_files(db_path, "employee_demography", [first, second])
+    assert sorted(result.ingested) == sorted([first.split("/")[-1], second.split("/")[-1]])
+    assert result.rows == 4
+
+    # Unchanged files are skipped, a rewritten file only replaces its own partition
+    write_source(2025, 2, "CONSOLIDATED", _ages(32, 33, 34))
+    result = ingest_files(db_path, "employee_demography", [first, second])
+    assert result.ingested == [second.split("/")[-1]]
+    assert result.unchanged == [first.split("/")[-1]]
+
+    with sqlite3.connect(db_path) as conn:
+        counts = conn.execute(
+            "SELECT n_bulan, COUNT(*), MIN(n_usia) FROM employee_demography GROUP BY n_bulan ORDER BY n_bulan"
+        ).fetchall()
+    assert counts == [(1, 2, 30), (2, 3, 32)]
+
+
+def test_touched_file_with_same_content_is_not_reingested(tmp_path, write_source):
+    import os
+    from lib.ingest import ingest_files
+    db_path = str(tmp_path / "test.db")
+    source = write_source(2025, 1, "CONSOLIDATED", _ages(30))
+    ingest_files(db_path, "employee_demography", [source])
+
+    os.utime(source, ns=(0, 1_000_000_000))
+    result = ingest_files(db_path, "employee_demography", [source])
+    assert result.ingested == []
+    assert result.unchanged == [os.path.basename(source)]
+
+
+def test_unchanged_sources_checks_the_manifest_read_only(tmp_path, write_source):
+    import os
+    from lib.ingest import ingest_files, unchanged_sources
+    db_path = str(tmp_path / "test.db")
+    source = write_source(2025, 1, "CONSOLIDATED", _ages(30))
+    assert unchanged_sources(db_path, "employee_demography", [source]) is None
+
+    ingest_files(db_path, "employee_demography", [source])
+    result = unchanged_sources(db_path, "employee_demography", [source])
+    assert result.unchanged == [os.path.basename(source)] and not result.changed
+
+    added = write_source(2025, 2, "CONSOLIDATED", _ages(31))
+    assert unchanged_sources(db_path, "employee_demography", [source, added]) is None
+
+
+def test_parallel_parse_matches_sequential(write_source):
+    from lib.ingest import SourceFile, iter_parsed_files
+    sources = [
+        SourceFile(path=write_source(2024, month, "UNCONSOLIDATED", _ages(20 + month, "x")), size=0, mtime_ns=0)
+        for month in range(1, 6)
+    ]
+    sequential = {p.source.name: p for p in iter_parsed_files(sources, workers=1)}
+    parallel = {p.source.name: p.records for p in iter_parsed_files(sources, workers=2)}
+    assert parallel == {name: parsed.records for name, parsed in sequential.items()}
+    first = sequential[sources[0].name]
+    assert first.records[1][list(first.template.columns).index("n_usia")] == -1
+
+
+def test_partitions_no_file_holds_any_more_are_deleted(tmp_path, write_source):
+    import os
+    from lib.ingest import ingest_files
+    db_path = str(tmp_path / "test.db")
+    first = write_source(2025, 1, "CONSOLIDATED", _ages(30, 40))
+    second = write_source(2025, 2, "CONSOLIDATED", _ages(31))
+    ingest_files(db_path, "employee_demography", [first, second])
+
+    # A corrected file that holds another month drops its old partition
+    os.replace(write_source(2025, 3, "CONSOLIDATED", _ages(33)), second)
+    result = ingest_files(db_path, "employee_demography", [first, second])
+    assert result.ingested == [os.path.basename(second)]
+    with sqlite3.connect(db_path) as conn:
+        months = conn.execute("SELECT DISTINCT n_bulan FROM employee_demography ORDER BY 1").fetchall()
+        summary_months = conn.execute("SELECT DISTINCT n_bulan FROM demography_summary ORDER BY 1").fetchall()
+    assert months == summary_months == [(1,), (3,)]
+
+    # A deleted file takes its rows with it
+    os.remove(first)
+    result = ingest_files(db_path, "employee_demography", [second])
+    assert result.removed == [os.path.basename(first)] and result.changed
+    with sqlite3.connect(db_path) as conn:
+        months = conn.execute("SELECT DISTINCT n_bulan FROM employee_demography ORDER BY 1").fetchall()
+        summary_months = conn.execute("SELECT DISTINCT n_bulan FROM demography_summary ORDER BY 1").fetchall()
+        manifest = conn.execute("SELECT file_name FROM ingest_manifest").fetchall()
+    assert months == summary_months == [(3,)]
+    assert manifest == [(os.path.basename(second),)]
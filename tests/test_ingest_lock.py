@@ -0,0 +1,91 @@
+import os
+import time
+import threading
+import multiprocessing
+from lib.db_versions import publish_version
+from lib.ingest_lock import ingest_lock, load_once, source_fingerprint, write_ready_marker, ready_marker_matches
+
+
+def _hold_lock(db_path, acquired, release):
+    with ingest_lock(db_path):
+        acquired.set()
+        release.wait(10)
+
+
+def _lead_load(db_path, loading, finish):
+    def load():
+        loading.set()
+        finish.wait(10)
+        publish_version(db_path, "v2")
+        write_ready_marker(db_path, "sources")
+    load_once(db_path, lambda: "sources", load)
+
+
+def test_lock_is_exclusive_across_processes_and_reentrant(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    context = multiprocessing.get_context("fork")
+    acquired, release = context.Event(), context.Event()
+    holder = context.Process(target=_hold_lock, args=(db_path, acquired, release))
+    holder.start()
+    try:
+        assert acquired.wait(10)
+        assert not ingest_lock(db_path).acquire(blocking=False)
+    finally:
+        release.set()
+        holder.join(10)
+
+    lock = ingest_lock(db_path)
+    with lock:
+        with lock:
+            pass
+        # Still held by this thread, other threads are kept out
+        result = []
+        thread = threading.Thread(target=lambda: result.append(lock.acquire(blocking=False)))
+        thread.start()
+        thread.join()
+        assert result == [False]
+    assert lock.acquire(blocking=False)
+    lock.release()
+
+
+def test_ready_marker_follows_sources_and_version(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    source = tmp_path / "a.json"
+    source.write_text("[]")
+    fingerprint = source_fingerprint([str(source)])
+    publish_version(db_path, "v1")
+    write_ready_marker(db_path, fingerprint)
+    assert ready_marker_matches(db_path, fingerprint)
+
+    os.utime(source, ns=(0, 0))
+    assert not ready_marker_matches(db_path, source_fingerprint([str(source)]))
+    publish_version(db_path, "v2")
+    assert not ready_marker_matches(db_path, fingerprint)
+
+
+def test_only_one_worker_loads(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    context = multiprocessing.get_context("fork")
+    loading, finish = context.Event(), context.Event()
+    leader = context.Process(target=_lead_load, args=(db_path, loading, finish))
+    leader.start()
+    try:
+        assert loading.wait(10)
+        loads = []
+        follower = threading.Thread(target=lambda: loads.append(load_once(db_path, lambda: "sources", lambda: None)))
+        follower.start()
+        time.sleep(0.2)
+        # The follower waits for the leader instead of loading or serving
+        assert follower.is_alive()
+        finish.set()
+        follower.join(10)
+    finally:
+        finish.set()
+        leader.join(10)
+    assert loads == [False]
+    assert ready_marker_matches(db_path, "sources")
+
+    # A change in the sources makes the next start load again
+    ran = []
+    assert load_once(db_path, lambda: "other sources", lambda: ran.append(True))
+    assert ran == [True]
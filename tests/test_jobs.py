@@ -0,0 +1,65 @@
+import asyncio
+import time
+import pytest
+from lib.jobs import DataUpdateJob, JobManager, SharedJobStore
+
+
+@pytest.mark.anyio
+async def test_workers_share_one_data_update_job(tmp_path):
+    store_path = str(tmp_path / "jobs.db")
+    # Two JobManagers on one file behave like two uvicorn workers
+    worker_a, worker_b = JobManager(store_path=store_path), JobManager(store_path=store_path)
+    release = asyncio.Event()
+    runs = []
+
+    async def runner(job):
+        runs.append(job.job_id)
+        job.files_fetched = ["HCM_Insight_2025_01_CONSOLIDATED.json"]
+        await release.wait()
+
+    job, created = await worker_a.start(runner)
+    other, other_created = await worker_b.start(runner)
+    assert created and not other_created
+    assert other.job_id == job.job_id
+
+    # The other worker answers status polls from the shared store
+    polled = await worker_b.get(job.job_id)
+    assert polled.status == "running"
+
+    release.set()
+    for _ in range(50):
+        polled = await worker_b.get(job.job_id)
+        if polled.status != "running":
+            break
+        await asyncio.sleep(0.02)
+
+    assert polled.status == "succeeded"
+    assert polled.files_fetched == ["HCM_Insight_2025_01_CONSOLIDATED.json"]
+    assert runs == [job.job_id]
+    assert await worker_b.get("unknown") is None
+
+
+def test_job_of_a_stopped_worker_is_failed_and_replaced(tmp_path):
+    store = SharedJobStore(str(tmp_path / "jobs.db"), stale_seconds=60)
+    stopped = DataUpdateJob(job_id="stopped")
+    assert store.claim(stopped) is None
+    assert store.claim(DataUpdateJob(job_id="second")).job_id == "stopped"
+
+    # No heartbeat for longer than the stale period
+    store._conn().execute("UPDATE jobs SET heartbeat_at = ?", (time.time() - 120,))
+    assert store.get("stopped").status == "failed"
+    assert store.claim(DataUpdateJob(job_id="next")) is None
+    assert store.get("stopped").status == "failed"
+    assert store.get("next").status == "running"
+
+
+def test_job_history_is_pruned(tmp_path):
+    store = SharedJobStore(str(tmp_path / "jobs.db"), history_size=2)
+    for i in range(3):
+        job = DataUpdateJob(job_id=f"job-{i}", started_at=i)
+        assert store.claim(job) is None
+        job.status = "succeeded"
+        store.save(job)
+
+    assert store.get("job-0") is None
+    assert store.get("job-2").status == "succeeded"
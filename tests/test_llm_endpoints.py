@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from lib import llm_endpoints
+from lib.llm_endpoints import CircuitBreaker, LLMEndpoint, LLMCallError, hedged_call
+
+
+def _endpoints():
+    return [LLMEndpoint("primary", "http://primary.test", "t"), LLMEndpoint("secondary", "http://secondary.test", "t")]
+
+
+def test_circuit_breaker_opens_and_half_opens(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(llm_endpoints.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow()  # the single half-open trial
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+@pytest.mark.anyio
+async def test_slow_primary_is_hedged(monkeypatch):
+    monkeypatch.setattr(llm_endpoints, "LLM_HEDGE_DEFAULT_DELAY", 0.05)
+    endpoints = _endpoints()
+    calls = []
+
+    async def call(endpoint):
+        calls.append(endpoint.name)
+        await asyncio.sleep(5 if endpoint.name == "primary" else 0.01)
+        return endpoint.name
+
+    assert await hedged_call(endpoints, "infer", call) == "secondary"
+    assert calls == ["primary", "secondary"]
+    # The cancelled primary call is neither a success nor a failure
+    assert endpoints[0].breaker.failures == 0
+    # but its elapsed time is kept as a lower bound of its latency
+    assert endpoints[0]._latencies["infer"][0] >= 0.05
+
+
+@pytest.mark.anyio
+async def test_failing_primary_falls_back_and_open_circuit_is_skipped():
+    endpoints = _endpoints()
+    endpoints[0].breaker.failure_threshold = 1
+    calls = []
+
+    async def call(endpoint):
+        calls.append(endpoint.name)
+        if endpoint.name == "primary":
+            raise RuntimeError("503")
+        return "SELECT 1"
+
+    assert await hedged_call(endpoints, "generate_sql", call) == "SELECT 1"
+    assert endpoints[0].breaker.state == "open"
+    assert await hedged_call(endpoints, "generate_sql", call) == "SELECT 1"
+    assert calls == ["primary", "secondary", "secondary"]
+
+    endpoints[1].breaker.state = "open"
+    endpoints[1].breaker.opened_at = float("inf")
+    with pytest.raises(LLMCallError):
+        await hedged_call(endpoints, "generate_sql", call)
+
+
+def test_hedge_delay_follows_p95(monkeypatch):
+    endpoint = LLMEndpoint("primary", "http://primary.test", "t")
+    for latency in [2.0] * 19 + [8.0]:
+        endpoint.record_success("infer", latency)
+    assert 2.0 < endpoint.hedge_delay("infer") <= 8.0
+    assert endpoint.hedge_delay("generate_sql") == llm_endpoints.LLM_HEDGE_DEFAULT_DELAY
@@ -0,0 +1,53 @@
+import pytest
+import httpx
+import llm_engine
+
+
+def _completion_handler(request):
+    return httpx.Response(200, json={"choices": [{"message": {"content": "SELECT 1"}}]})
+
+
+@pytest.mark.anyio
+async def test_llm_client_is_shared_between_calls(monkeypatch):
+    clients = []
+    real_create = llm_engine._create_llm_client
+
+    def create_mock_client():
+        client = real_create()
+        client._transport = httpx.MockTransport(_completion_handler)
+        clients.append(client)
+        return client
+
+    monkeypatch.setattr(llm_engine, "_create_llm_client", create_mock_client)
+    await llm_engine.close_llm_client()
+
+    await llm_engine.start_llm_client()
+    first = await llm_engine.make_async_api_call("http://llm.test/v1", "token", {})
+    second = await llm_engine.make_async_api_call("http://llm.test/v1", "token", {})
+
+    assert first == second == "SELECT 1"
+    assert len(clients) == 1
+
+    await llm_engine.close_llm_client()
+    assert clients[0].is_closed
+
+
+@pytest.mark.anyio
+async def test_stream_call_yields_content_deltas(monkeypatch):
+    body = (
+        'data: {"choices": [{"delta": {"role": "assistant"}}]}\n\n'
+        'data: {"choices": [{"delta": {"content": "Berdasarkan "}}]}\n\n'
+        'data: {"choices": [{"delta": {"content": "data"}}]}\n\n'
+        'data: [DONE]\n\n'
+    )
+
+    def stream_handler(request):
+        assert request.headers["accept"] == "text/event-stream"
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(stream_handler))
+    monkeypatch.setattr(llm_engine, "_llm_client", client)
+
+    chunks = [chunk async for chunk in llm_engine.make_async_stream_call("http://llm.test/v1", "token", {})]
+    assert chunks == ["Berdasarkan ", "data"]
+    await llm_engine.close_llm_client()
@@ -1,29 +1,59 @@
+import asyncio
 import pytest
-import pandas as pd
-import sqlite3
 from httpx import ASGITransport, AsyncClient
-from main import app, insert_api_data_to_db, download_minio_data
-from unittest.mock import MagicMock, AsyncMock, patch
-from fastapi import status
+from main import app, insight_cache, data_readiness
+from lib.schema import SchemaSnapshot
+from lib.jobs import data_update_jobs
+from lib.single_flight import insight_flights
+from unittest.mock import AsyncMock, patch
 from os import getenv
 from dotenv import load_dotenv
 load_dotenv('.env', override=True)
 
 valid_payload = {"query": "Buatkan laporan demografi terbaru"}
+llm_payload = {"query": "Berapa rata-rata masa kerja karyawan?"}  # no router template
 valid_headers = {
     "x-api-key": getenv('X_API_KEY', 'test-api-key'),
     "Content-Type": "application/json",
     "Accept": "application/json"
 }
 endpoint = "/HCM_Insight/get_insight_api"
-test_db = "/test.db"
-test_table = "test_table"
-test_json = "/test.json"
+
+
+@pytest.fixture(autouse=True)
+def shared_stores(tmp_path, monkeypatch):
+    # The cross-worker stores default to the production files in /app/data
+    for name, manager in (("single_flight.db", insight_flights), ("jobs.db", data_update_jobs)):
+        monkeypatch.setattr(manager, "store_path", str(tmp_path / name))
+        monkeypatch.setattr(manager, "_store", None)
+        monkeypatch.setattr(manager, "_store_failed", False)
+
+
+@pytest.fixture(autouse=True)
+def clear_insight_cache():
+    insight_cache.clear()
+    yield
+    insight_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def data_ready():
+    # ASGITransport does not run the lifespan, whose background task would load the data
+    data_readiness.mark_ready(rows=1, load_seconds=0.0)
+    yield
+    data_readiness.reset()
 
 
 @pytest.fixture
-def anyio_backend():
-    return "asyncio"
+def mock_schema():
+    schema = SchemaSnapshot(
+        table_name="employee_demography",
+        columns=("id",),
+        schema_hash="test",
+        data_version=None
+    )
+    with patch('main.get_schema', return_value=schema) as mock:
+        yield mock
 
 
 @pytest.fixture
@@ -43,19 +73,34 @@ async def test_health_check(test_client):
 
 
 @pytest.mark.anyio
-async def test_valid_payload_success(test_client):
+async def test_requests_before_data_is_ready_get_503(test_client):
+    data_readiness.reset()
+    with patch('main.prepare_insight_data', new_callable=AsyncMock) as mock_prepare:
+        response = await test_client.post(url=endpoint, headers=valid_headers, json=valid_payload)
+        assert response.status_code == 503
+        assert response.headers["retry-after"]
+        mock_prepare.assert_not_called()
+
+    readiness = await test_client.get("/ready")
+    assert readiness.status_code == 503
+    assert readiness.json()["status"] == "starting"
+    # Liveness does not depend on the data
+    assert (await test_client.get("/ht")).status_code == 200
+
+    data_readiness.mark_ready(rows=42, load_seconds=1.5)
+    readiness = await test_client.get("/ready")
+    assert readiness.status_code == 200
+    assert readiness.json()["rows"] == 42
+    assert readiness.json()["load_seconds"] == 1.5
+
+
+@pytest.mark.anyio
+async def test_valid_payload_success(test_client, mock_schema):
     with patch('main.telkomllm_generate_sql') as mock_gen, \
          patch('main.telkomllm_infer_sql') as mock_infer, \
-         patch('main.sqlite3.connect') as mock_db:
-        # Setup mock database connection
-        mock_conn = MagicMock()
-        mock_cursor = MagicMock()
-        mock_conn.cursor.return_value = mock_cursor
-        mock_cursor.fetchall.side_effect = [
-            [(0, 'id', 'INTEGER', 0, None, 1)],  # PRAGMA table_info response
-            [(1, 'Sample Data')]  # Query result
-        ]
-        mock_db.return_value = mock_conn
+         patch('main.execute_query', new_callable=AsyncMock) as mock_db:
+        # Setup mock query result
+        mock_db.return_value = (['id', 'name'], [(1, 'Sample Data')])  # Query result
         mock_gen.return_value = "SELECT * FROM employee_demography"
         mock_infer.return_value = "Mocked insight"
         response = await test_client.post(
@@ -68,19 +113,12 @@ async def test_valid_payload_success(test_client):
 
 
 @pytest.mark.anyio
-async def test_empty_database_response(test_client):
+async def test_empty_database_response(test_client, mock_schema):
     with patch('main.telkomllm_generate_sql') as mock_gen, \
-         patch('main.sqlite3.connect') as mock_db, \
+         patch('main.execute_query', new_callable=AsyncMock) as mock_db, \
          patch('main.telkomllm_infer_sql') as mock_infer:
-        # Setup mock database connection
-        mock_conn = MagicMock()
-        mock_cursor = MagicMock()
-        mock_conn.cursor.return_value = mock_cursor
-        mock_cursor.fetchall.side_effect = [
-            [(0, 'id', 'INTEGER', 0, None, 1)],  # PRAGMA table_info response
-            []  # Empty query result
-        ]
-        mock_db.return_value = mock_conn
+        # Setup mock query result
+        mock_db.return_value = (['id', 'name'], [])  # Empty query result
         mock_gen.return_value = "SELECT * FROM employee_demography"
         mock_infer.return_value = "No data insight"
         response = await test_client.post(
@@ -89,4 +127,151 @@ async def test_empty_database_response(test_client):
             json=valid_payload
         )
         assert response.status_code == 200
-        assert response.json()['output'] == "No data insight"
\ No newline at end of file
+        assert response.json()['output'] == "No data insight"
+
+@pytest.mark.anyio
+async def test_repeated_query_served_from_cache(test_client, mock_schema):
+    with patch('main.telkomllm_generate_sql') as mock_gen, \
+         patch('main.telkomllm_infer_sql') as mock_infer, \
+         patch('main.data_version', return_value="v1"), \
+         patch('main.execute_query', new_callable=AsyncMock) as mock_db:
+        mock_db.return_value = (['id', 'name'], [(1, 'Sample Data')])  # Query result
+        mock_gen.return_value = "SELECT * FROM employee_demography"
+        mock_infer.return_value = "Mocked insight"
+        for _ in range(2):
+            response = await test_client.post(
+                url=endpoint,
+                headers=valid_headers,
+                json=llm_payload
+            )
+            assert response.status_code == 200
+            assert response.json()['output'] == "Mocked insight"
+        assert mock_gen.call_count == 1
+        assert mock_db.await_count == 1
+        assert mock_infer.call_count == 1
+
+
+@pytest.mark.anyio
+async def test_concurrent_identical_queries_share_one_computation(test_client, mock_schema):
+    async def slow_insight(**kwargs):
+        await asyncio.sleep(0.05)
+        return "Mocked insight"
+
+    with patch('main.telkomllm_generate_sql', new_callable=AsyncMock) as mock_gen, \
+         patch('main.telkomllm_infer_sql', side_effect=slow_insight) as mock_infer, \
+         patch('main.execute_query', new_callable=AsyncMock) as mock_db:
+        mock_db.return_value = (['id', 'name'], [(1, 'Sample Data')])
+        mock_gen.return_value = "SELECT * FROM employee_demography"
+        responses = await asyncio.gather(*[
+            test_client.post(url=endpoint, headers=valid_headers, json=llm_payload) for _ in range(5)
+        ])
+
+        assert [response.json()['output'] for response in responses] == ["Mocked insight"] * 5
+        assert mock_gen.await_count == 1
+        assert mock_infer.call_count == 1
+
+
+@pytest.mark.anyio
+async def test_known_question_skips_sql_generation(test_client, mock_schema):
+    with patch('main.telkomllm_generate_sql') as mock_gen, \
+         patch('main.telkomllm_infer_sql') as mock_infer, \
+         patch('main.execute_query', new_callable=AsyncMock) as mock_db:
+        mock_db.return_value = (['company', 'total_employees', 'percentage'], [('PT. TELKOMSEL', 10, 100.0)])
+        mock_infer.return_value = "Mocked insight"
+        response = await test_client.post(url=endpoint, headers=valid_headers, json=valid_payload)
+
+        assert response.status_code == 200
+        mock_gen.assert_not_called()
+        assert "WITH top10 AS" in mock_db.await_args.args[1]
+
+
+@pytest.mark.anyio
+async def test_responses_carry_stage_timings_and_security_headers(test_client, mock_schema):
+    with patch('main.telkomllm_generate_sql') as mock_gen, \
+         patch('main.telkomllm_infer_sql') as mock_infer, \
+         patch('main.execute_query', new_callable=AsyncMock) as mock_db:
+        mock_db.return_value = (['id', 'name'], [(1, 'Sample Data')])
+        mock_gen.return_value = "SELECT * FROM employee_demography"
+        mock_infer.return_value = "Mocked insight"
+        response = await test_client.post(url=endpoint, headers=valid_headers, json=llm_payload)
+
+    stages = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert stages == ["schema", "generate_sql", "execute_sql", "infer", "total"]
+    assert response.headers["x-dag-ai-server"] == "OK"
+
+    metrics = await test_client.get("/metrics")
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'hcm_stage_duration_seconds_count{stage="generate_sql"}' in metrics.text
+    assert 'hcm_sql_queries_total{source="llm"}' in metrics.text
+
+
+@pytest.mark.anyio
+async def test_cors_preflight_is_answered(test_client):
+    response = await test_client.options(
+        endpoint,
+        headers={"Origin": "http://example.com", "Access-Control-Request-Method": "POST"}
+    )
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] in ("*", "http://example.com")
+
+
+@pytest.mark.anyio
+async def test_stream_endpoint_sends_sse_chunks(test_client, mock_schema):
+    async def fake_stream(**kwargs):
+        for chunk in ["Berdasarkan ", "data"]:
+            yield chunk
+
+    with patch('main.telkomllm_generate_sql') as mock_gen, \
+         patch('main.telkomllm_infer_sql_stream', side_effect=fake_stream), \
+         patch('main.execute_query', new_callable=AsyncMock) as mock_db:
+        mock_db.return_value = (['id', 'name'], [(1, 'Sample Data')])  # Query result
+        mock_gen.return_value = "SELECT * FROM employee_demography"
+        response = await test_client.post(
+            url=f"{endpoint}/stream",
+            headers=valid_headers,
+            json=valid_payload
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert 'data: {"delta": "Berdasarkan "}' in response.text
+        assert 'event: done\ndata: {"output": "Berdasarkan data"}' in response.text
+
+
+@pytest.mark.anyio
+async def test_data_update_runs_as_single_background_job(test_client):
+    from lib.ingest import IngestResult
+    release = asyncio.Event()
+
+    async def fake_fetch(year_month_list, consol_list, result=None):
+        result.update({"files": ["/app/data/HCM_Insight_2025_01_CONSOLIDATED.json"], "skipped": 0, "failed": [], "bytes": 10})
+        await release.wait()
+        return result
+
+    with patch('main.download_minio_data'), \
+         patch('main.fetch_all_api_data', side_effect=fake_fetch), \
+         patch('main.glob.glob', return_value=["/app/data/HCM_Insight_2025_01_CONSOLIDATED.json"]), \
+         patch('main.insert_api_data_to_db', return_value=IngestResult(ingested=["a.json"])) as mock_ingest:
+        first = await test_client.get("/HCM_Insight/get_data_update")
+        second = await test_client.get("/HCM_Insight/get_data_update")
+        assert first.status_code == 202
+        assert first.json()["message"] == "Data update started"
+        assert second.json()["message"] == "Data update already running"
+        assert second.json()["job_id"] == first.json()["job_id"]
+
+        release.set()
+        status_url = f"/HCM_Insight/get_data_update/{first.json()['job_id']}"
+        for _ in range(50):
+            job_status = (await test_client.get(status_url)).json()
+            if job_status["status"] != "running":
+                break
+            await asyncio.sleep(0.05)
+
+        assert job_status["status"] == "succeeded"
+        assert job_status["files_fetched"] == ["/app/data/HCM_Insight_2025_01_CONSOLIDATED.json"]
+        assert job_status["ingested_files"] == 1
+        assert set(job_status["durations"]) == {"minio", "fetch", "ingest"}
+        mock_ingest.assert_called_once()
+
+    missing = await test_client.get("/HCM_Insight/get_data_update/unknown")
+    assert missing.status_code == 404
@@ -0,0 +1,46 @@
+import pytest
+from lib.metrics import MetricsRegistry, begin_request, stage, server_timing, STAGE_SECONDS
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls", ("kind",))
+    sizes = registry.histogram("sizes", "Sizes", buckets=(10, 100))
+    calls.inc(kind="sql")
+    calls.inc(2, kind="sql")
+    for value in (5, 50, 500):
+        sizes.observe(value)
+
+    text = registry.render()
+    assert "# TYPE calls_total counter" in text
+    assert 'calls_total{kind="sql"} 3' in text
+    assert 'sizes_bucket{le="10"} 1' in text
+    assert 'sizes_bucket{le="100"} 2' in text
+    assert 'sizes_bucket{le="+Inf"} 3' in text
+    assert "sizes_sum 555" in text
+    assert "sizes_count 3" in text
+    # Same name returns the same metric
+    assert registry.counter("calls_total", "Calls", ("kind",)) is calls
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("errors_total", "Errors", ("reason",)).inc(reason='bad "quote"\n')
+    assert 'errors_total{reason="bad \\"quote\\"\\n"} 1' in registry.render()
+
+
+def test_stages_add_up_per_request():
+    before = STAGE_SECONDS.count(stage="execute_sql")
+    timings = begin_request()
+    with stage("execute_sql"):
+        pass
+    with stage("execute_sql"):
+        pass
+    with pytest.raises(ValueError):
+        with stage("fix_sql"):
+            raise ValueError("failed stages are timed too")
+
+    assert list(timings) == ["execute_sql", "fix_sql"]
+    assert STAGE_SECONDS.count(stage="execute_sql") == before + 2
+    header = server_timing({"schema": 0.0012, "infer": 1.5}, total=1.6)
+    assert header == "schema;dur=1.2, infer;dur=1500.0, total;dur=1600.0"
@@ -0,0 +1,40 @@
+from lib.prompt_compiler import compile_sql_prompt, render_sql_prompt_prefix, relevant_abbreviations
+from lib.schema import SchemaSnapshot
+
+COLUMNS = ("n_tahun", "n_bulan", "v_company_code", "n_usia")
+
+
+def _snapshot():
+    return SchemaSnapshot(
+        table_name="employee_demography",
+        columns=COLUMNS,
+        schema_hash="test",
+        data_version=None,
+        sql_prompt_prefix=render_sql_prompt_prefix("employee_demography", COLUMNS)
+    )
+
+
+def test_prefix_is_stable_and_period_comes_last():
+    snapshot = _snapshot()
+    july = compile_sql_prompt(snapshot, "Jumlah milenial di Tsel", "July", "2026")
+    august = compile_sql_prompt(snapshot, "Berapa karyawan perempuan?", "August", "2026")
+
+    assert july.text.startswith(snapshot.sql_prompt_prefix)
+    assert august.text.startswith(snapshot.sql_prompt_prefix)
+    assert "2026" not in snapshot.sql_prompt_prefix
+    assert july.text.rstrip().endswith("Latest period: July 2026 (n_tahun = 2026, n_bulan = 7).")
+
+
+def test_only_relevant_templates_and_abbreviations_included():
+    compiled = compile_sql_prompt(_snapshot(), "Jumlah milenial di Tsel", "July", "2026")
+
+    assert compiled.templates == ("millennials", "other")
+    assert compiled.companies == ("PT. TELKOMSEL",)
+    assert "Telkomsel / Tsel\tPT. TELKOMSEL" in compiled.text
+    assert "YAYASAN PENDIDIKAN TELKOM" not in compiled.text
+    assert "WITH top10 AS" not in compiled.text
+    assert compiled.prefix_tokens < compiled.tokens
+
+
+def test_misspelled_company_still_resolved():
+    assert [code for _, code in relevant_abbreviations("jumlah karyawan telkomsell")] == ["PT. TELKOMSEL"]
@@ -0,0 +1,39 @@
+import asyncio
+import sqlite3
+import pytest
+from lib.readiness import DataReadiness, count_rows, wait_for_files, READY, WAITING_FOR_FILES
+
+
+def test_readiness_reports_the_last_load():
+    readiness = DataReadiness()
+    assert not readiness.ready
+    readiness.set_state(WAITING_FOR_FILES)
+    readiness.mark_ready(rows=10, load_seconds=2.3456)
+    assert readiness.ready
+    assert readiness.to_dict("v1") == {
+        "status": READY, "data_version": "v1", "rows": 10, "load_seconds": 2.346,
+        "loaded_at": readiness.loaded_at, "error": None,
+    }
+
+
+def test_count_rows(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    assert count_rows(db_path, "employee_demography") is None
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE other (x)")
+    assert count_rows(db_path, "employee_demography") is None
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE employee_demography (x)")
+        conn.executemany("INSERT INTO employee_demography VALUES (?)", [(1,), (2,)])
+    assert count_rows(db_path, "employee_demography") == 2
+
+
+@pytest.mark.anyio
+async def test_wait_for_files_does_not_block_the_loop(tmp_path):
+    waiter = asyncio.create_task(wait_for_files(str(tmp_path), poll_seconds=0.01))
+    await asyncio.sleep(0.05)
+    # The loop keeps running other work while no files are there
+    assert not waiter.done()
+    (tmp_path / "HCM_Insight_2025_01_CONSOLIDATED.json").write_text("[]")
+    files = await asyncio.wait_for(waiter, timeout=1)
+    assert [path.endswith(".json") for path in files] == [True]
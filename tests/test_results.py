@@ -0,0 +1,40 @@
+from lib.results import shape_result, INSIGHT_BASE_TOKENS
+
+
+def test_small_result_serialized_with_headers_and_formatted_numbers():
+    shaped = shape_result(["n_tahun", "company", "total_employees", "percentage"], [(2025, "PT. TELKOMSEL", 12345, 55.5)])
+
+    assert shaped.table_data.splitlines() == [
+        "| n_tahun | company | total_employees | percentage |",
+        "|---|---|---|---|",
+        "| 2025 | PT. TELKOMSEL | 12,345 | 55.50 |",
+    ]
+    assert not shaped.truncated
+    assert shaped.max_tokens == INSIGHT_BASE_TOKENS + 2 * shaped.tokens
+
+
+def test_long_tail_folded_into_others_and_total_kept():
+    rows = [(f"company {i}", 10, 1.0) for i in range(100)] + [("Total", 1000, 100.0)]
+    shaped = shape_result(["company", "total_employees", "percentage"], rows, max_rows=5)
+
+    lines = shaped.table_data.splitlines()
+    assert len(lines) == 2 + 5 + 2
+    assert lines[-2] == "| others | 950 | 95.00 |"
+    assert lines[-1] == "| Total | 1,000 | 100.00 |"
+    assert shaped.truncated
+
+
+def test_token_budget_enforced():
+    rows = [(f"a fairly long company name number {i}", i) for i in range(50)]
+    shaped = shape_result(["company", "total_employees"], rows, max_rows=50, token_budget=150)
+
+    assert shaped.tokens <= 150
+    assert "others" in shaped.table_data
+
+
+def test_folded_row_only_sums_counts_and_shares():
+    rows = [(2025, f"company {i}", 10 + i, 25.0 + i, 2.5) for i in range(40)]
+    shaped = shape_result(["n_tahun", "company", "employee_count", "avg_age", "percentage"], rows, max_rows=5)
+
+    others = shaped.table_data.splitlines()[-1]
+    assert others == f"| None | others | {sum(10 + i for i in range(5, 40)):,} | None | 87.50 |"
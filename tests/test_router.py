@@ -0,0 +1,76 @@
+import pytest
+from types import MappingProxyType
+from lib.router import route_query, match_company, match_period
+from lib.schema import SchemaSnapshot
+from lib.summary import rebuild_summaries
+from tests.conftest import DEMOGRAPHY_COLUMNS
+
+
+
+def _snapshot(conn, with_summaries):
+    summary_tables = {}
+    if with_summaries:
+        for name in rebuild_summaries(conn, "employee_demography"):
+            summary_tables[name] = tuple(col[1] for col in conn.execute(f"PRAGMA table_info({name})"))
+    return SchemaSnapshot(
+        table_name="employee_demography",
+        columns=DEMOGRAPHY_COLUMNS,
+        schema_hash="test",
+        data_version=None,
+        summary_tables=MappingProxyType(summary_tables)
+    )
+
+
+@pytest.mark.parametrize("with_summaries", [False, True])
+def test_routed_sql_runs_on_both_sources(demography_conn, with_summaries):
+    snapshot = _snapshot(demography_conn, with_summaries)
+
+    def run(question):
+        routed = route_query(question, snapshot, "December", "2025")
+        return routed.intent, demography_conn.execute(routed.sql).fetchall()
+
+    assert run("Berapa jumlah karyawan milenial di Telkomsel?") == ("millennials", [(1, 2, 50.0)])
+    assert run("Berapa karyawan yang pensiun tahun 2026?") == ("retirement", [(2,)])
+    assert run("Berapa karyawan yang pensiun tahun 2040?") == ("retirement", [(0,)])
+    assert run("Perbandingan perempuan dan laki-laki November 2025") == (
+        "gender", [("Laki-laki", 1, 100.0), ("Total", 1, 100.0)]
+    )
+    intent, rows = run("Komposisi BP di Telkom Group")
+    assert intent == "band_position"
+    assert rows == [("II", 1, 33.33), ("IV", 1, 33.33), (None, 1, 33.33), ("Total", 3, 100.0)]
+    intent, rows = run("Buatkan laporan demografi terbaru")
+    assert intent == "demography_report"
+    assert rows[0] == ("Total", 3, 100.0)
+    assert run("Berapa jumlah ibu di TA?") == ("mothers", [(0, 1, 0.0)])
+
+
+def test_unknown_or_ambiguous_questions_fall_back_to_llm(demography_conn):
+    snapshot = _snapshot(demography_conn, False)
+    assert route_query("Berapa rata-rata masa kerja karyawan?", snapshot, "December", "2025") is None
+    # Two question families at once
+    assert route_query("Jumlah milenial perempuan", snapshot, "December", "2025") is None
+    # Two companies
+    assert route_query("Jumlah milenial Telkomsel dan Sigma", snapshot, "December", "2025") is None
+
+
+@pytest.mark.parametrize("question", [
+    # An aggregate the templates do not compute
+    "rata-rata usia karyawan laki-laki",
+    "Siapa karyawan dengan band posisi tertinggi?",
+    "Band posisi terendah di Telkomsel",
+    # A filter the templates do not apply
+    "karyawan perempuan yang sudah menikah",
+    "Jumlah karyawan Telkom yang unconsolidated berdasarkan gender",
+    "Komposisi gender non konsolidasi Telkomsel",
+])
+def test_questions_with_unrouted_constraints_fall_back_to_llm(demography_conn, question):
+    assert route_query(question, _snapshot(demography_conn, False), "December", "2025") is None
+
+
+def test_company_and_period_matching():
+    assert match_company("karyawan telkomsel") == ["PT. TELKOMSEL"]
+    assert match_company("karyawan telin singapore") == ["PT. TELIN SINGAPORE SINGAPORE"]
+    assert match_company("karyawan telkom akses") == ["PT. TELKOM AKSES"]
+    assert match_period("data maret 2024", "December", "2025") == (2024, 3)
+    assert match_period("may i know the total", "December", "2025") == (2025, 12)
+    assert match_period("data tahun 2024", "December", "2025") is None
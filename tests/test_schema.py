@@ -0,0 +1,35 @@
+import sqlite3
+import pytest
+from unittest.mock import patch
+from lib import schema as schema_registry
+
+
+@pytest.fixture
+def demography_db(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE employee_demography (n_tahun INTEGER, n_bulan INTEGER, v_company_code TEXT)")
+    yield db_path
+    schema_registry._current = None
+
+
+def test_schema_loaded_once_per_data_version(demography_db):
+    snapshot = schema_registry.load_schema(demography_db, "employee_demography")
+    assert snapshot.columns == ("n_tahun", "n_bulan", "v_company_code")
+    assert "['n_tahun', 'n_bulan', 'v_company_code']" in snapshot.sql_prompt_prefix
+
+    with patch("lib.schema.sqlite3.connect") as mock_connect:
+        assert schema_registry.get_schema(demography_db, "employee_demography") is snapshot
+        mock_connect.assert_not_called()
+
+
+def test_schema_reloaded_after_table_change(demography_db):
+    first = schema_registry.load_schema(demography_db, "employee_demography")
+    with sqlite3.connect(demography_db) as conn:
+        conn.execute("ALTER TABLE employee_demography ADD COLUMN n_usia INTEGER")
+
+    with patch("lib.schema.data_version", return_value="changed"):
+        second = schema_registry.get_schema(demography_db, "employee_demography")
+    assert second is not first
+    assert second.columns[-1] == "n_usia"
+    assert second.schema_hash != first.schema_hash
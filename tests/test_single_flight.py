@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from lib.single_flight import SingleFlight, flight_key
+
+
+@pytest.mark.anyio
+async def test_workers_share_one_computation_through_the_store(tmp_path):
+    store_path = str(tmp_path / "flights.db")
+    # Two SingleFlight instances on one file behave like two uvicorn workers
+    worker_a, worker_b = SingleFlight(store_path), SingleFlight(store_path)
+    computed = []
+
+    async def compute():
+        computed.append(1)
+        await asyncio.sleep(0.3)
+        return "insight"
+
+    key = flight_key("jumlah milenial", "v1", "July", "2026")
+    results = await asyncio.gather(
+        worker_a.do(key, compute), worker_a.do(key, compute), worker_b.do(key, compute)
+    )
+
+    assert results == ["insight"] * 3
+    assert len(computed) == 1
+    # One in-process join plus one result taken from the other worker
+    assert worker_a.stats()["coalesced"] + worker_b.stats()["coalesced"] == 2
+
+
+@pytest.mark.anyio
+async def test_failed_leader_lets_waiters_compute(tmp_path):
+    store_path = str(tmp_path / "flights.db")
+    worker_a, worker_b = SingleFlight(store_path), SingleFlight(store_path)
+
+    async def failing():
+        await asyncio.sleep(0.1)
+        raise RuntimeError("LLM down")
+
+    async def working():
+        return "insight"
+
+    key = flight_key("q")
+    leader = asyncio.create_task(worker_a.do(key, failing))
+    await asyncio.sleep(0.05)  # let worker a take the lease
+
+    assert await worker_b.do(key, working) == "insight"
+    with pytest.raises(RuntimeError):
+        await leader
+
+
+@pytest.mark.anyio
+async def test_store_errors_after_compute_still_return_the_result(tmp_path):
+    import sqlite3
+    worker = SingleFlight(str(tmp_path / "flights.db"))
+    store = worker._get_store()
+
+    def locked(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    store.publish = locked
+    store.release = locked
+
+    async def compute():
+        return "insight"
+
+    assert await worker.do(flight_key("q"), compute) == "insight"
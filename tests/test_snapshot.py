@@ -0,0 +1,56 @@
+import os
+import json
+import sqlite3
+import pytest
+from lib.ingest import ingest_files
+from lib.snapshot import write_snapshot, snapshot_is_fresh, restore_snapshot
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def ingested_db(tmp_path):
+    source = tmp_path / "HCM_Insight_2025_01_CONSOLIDATED.json"
+    source.write_text(json.dumps([
+        {"n_tahun": 2025, "n_bulan": 1, "v_consolidated": "CONSOLIDATED",
+         "v_company_code": "PT. TELKOMSEL", "n_usia": age}
+        for age in (25, 38, None)
+    ]))
+    os.utime(source, ns=(1_000_000_000, 1_000_000_000))
+    db_path = str(tmp_path / "source.db")
+    ingest_files(db_path, "employee_demography", [str(source)])
+    return db_path, str(source)
+
+
+def test_snapshot_round_trip(tmp_path, ingested_db):
+    db_path, source = ingested_db
+    snapshot_path = str(tmp_path / "source.arrow")
+    assert write_snapshot(db_path, "employee_demography", snapshot_path)
+    assert snapshot_is_fresh(snapshot_path, [source])
+    import pyarrow as pa
+    with pa.memory_map(snapshot_path, "r") as snapshot:
+        schema = pa.ipc.open_file(snapshot).schema
+    assert pa.types.is_dictionary(schema.field("v_company_code").type)
+
+    restored_db = str(tmp_path / "restored.db")
+    assert restore_snapshot(snapshot_path, restored_db, "employee_demography") == 3
+
+    query = "SELECT n_tahun, n_bulan, v_company_code, n_usia FROM employee_demography ORDER BY n_usia"
+    with sqlite3.connect(db_path) as original, sqlite3.connect(restored_db) as restored:
+        assert restored.execute(query).fetchall() == original.execute(query).fetchall()
+        manifest = "SELECT file_name, sha256 FROM ingest_manifest"
+        assert restored.execute(manifest).fetchall() == original.execute(manifest).fetchall()
+
+
+def test_snapshot_is_stale_when_sources_change(tmp_path, ingested_db):
+    db_path, source = ingested_db
+    snapshot_path = str(tmp_path / "source.arrow")
+    write_snapshot(db_path, "employee_demography", snapshot_path)
+
+    new_source = tmp_path / "HCM_Insight_2025_02_CONSOLIDATED.json"
+    new_source.write_text("[]")
+    os.utime(new_source, ns=(1_000_000_000, 1_000_000_000))
+    assert not snapshot_is_fresh(snapshot_path, [source, str(new_source)])
+
+    os.utime(source, None)
+    assert not snapshot_is_fresh(snapshot_path, [source])
@@ -0,0 +1,93 @@
+import sqlite3
+import pytest
+from lib.sql_guard import (
+    SQLValidationError, QueryPlanRejected, QueryTimeoutError, RowLimitExceeded,
+    QueryBudget, validate_sql, explain_plan_rows, check_query_plan, stored_table_scan
+)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT 1;",
+    "  with t AS (SELECT 1 AS x) SELECT x FROM t",
+    "SELECT replace(v_company_code, 'PT. ', '') FROM employee_demography",
+    "SELECT 'delete; drop' AS note -- update",
+])
+def test_read_only_queries_pass_validation(sql):
+    assert validate_sql(sql) == sql.strip().rstrip(";")
+
+
+@pytest.mark.parametrize("sql", [
+    "",
+    "DELETE FROM employee_demography",
+    "SELECT 1; DROP TABLE employee_demography",
+    "WITH t AS (SELECT 1) INSERT INTO employee_demography SELECT * FROM t",
+    "PRAGMA table_info(employee_demography)",
+])
+def test_other_statements_are_rejected(sql):
+    with pytest.raises(SQLValidationError):
+        validate_sql(sql)
+
+
+def test_cartesian_product_is_rejected():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE e (a, b)")
+    with pytest.raises(QueryPlanRejected, match="cartesian"):
+        check_query_plan(explain_plan_rows(conn, "SELECT * FROM e x, e y"))
+
+
+def test_full_scan_in_correlated_subquery_is_rejected():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE e (a, b)")
+    sql = "SELECT * FROM e x WHERE a > (SELECT AVG(a) FROM e y WHERE y.b = x.b)"
+    with pytest.raises(QueryPlanRejected, match="every row"):
+        check_query_plan(explain_plan_rows(conn, sql))
+
+
+def test_indexed_join_and_single_scan_are_accepted():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE e (a, b)")
+    conn.execute("CREATE INDEX ea ON e (a)")
+    check_query_plan(explain_plan_rows(conn, "SELECT * FROM e x JOIN e y ON x.a = y.a"))
+    check_query_plan(explain_plan_rows(conn, "WITH t AS MATERIALIZED (SELECT b FROM e) SELECT * FROM t, t AS u"))
+
+
+def test_select_without_from_is_not_a_table_scan():
+    conn = sqlite3.connect(":memory:")
+    plan = explain_plan_rows(conn, "SELECT 'Total' AS company, 100.0 AS percentage")
+    assert [detail for _, _, detail in plan] == ["SCAN CONSTANT ROW"]
+    assert stored_table_scan("SCAN CONSTANT ROW", set()) is None
+    assert stored_table_scan("SCAN CONSTANT", set()) == "CONSTANT"
+
+
+def test_budget_interrupts_runaway_query():
+    conn = sqlite3.connect(":memory:")
+    runaway = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n"
+    with pytest.raises(QueryTimeoutError, match="seconds"):
+        with QueryBudget(conn, timeout=0.05):
+            conn.execute(runaway).fetchall()
+    with pytest.raises(QueryTimeoutError, match="steps"):
+        with QueryBudget(conn, max_steps=50000, interval=1000):
+            conn.execute(runaway).fetchall()
+    # The handler is removed again: the connection is usable afterwards
+    assert conn.execute("SELECT 1").fetchall() == [(1,)]
+
+
+@pytest.mark.anyio
+async def test_pool_enforces_guard(read_pool, monkeypatch):
+    import lib.sql_guard
+    with pytest.raises(QueryPlanRejected):
+        await read_pool.execute("SELECT * FROM employee_demography a, employee_demography b")
+
+    monkeypatch.setattr(lib.sql_guard.fetch_limited, "__defaults__", (50,))
+    with pytest.raises(RowLimitExceeded):
+        await read_pool.execute("SELECT * FROM employee_demography")
+
+    # Guard errors are still SQLite errors for callers handling those
+    with pytest.raises(sqlite3.OperationalError):
+        await read_pool.execute("UPDATE employee_demography SET n_usia = 0")
+
+    columns, rows = await read_pool.execute(
+        "SELECT v_company_code, COUNT(*) AS total FROM employee_demography GROUP BY v_company_code"
+    )
+    assert columns == ["v_company_code", "total"]
+    assert len(rows) == 7
@@ -0,0 +1,67 @@
+import sqlite3
+from lib.ingest import ingest_files
+from lib.summary import describe_summary_tables
+from lib import schema as schema_registry
+
+
+def _employees(*employees):
+    return [
+        {"v_company_code": company, "c_jenis_kelamin": gender, "n_usia": age}
+        for company, gender, age in employees
+    ]
+
+
+def _summary_counts(db_path, month):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(
+            "SELECT v_company_code, millennial, SUM(employee_count) FROM demography_summary "
+            "WHERE n_tahun = 2025 AND n_bulan = ? GROUP BY 1, 2 ORDER BY 1, 2", (month,)
+        ).fetchall()
+
+
+def test_summaries_follow_incremental_ingest(tmp_path, write_source):
+    db_path = str(tmp_path / "test.db")
+    january = write_source(2025, 1, "CONSOLIDATED", _employees(("TSEL", 1, 30), ("TSEL", 2, 45), ("YPT", 1, 50)))
+    february = write_source(2025, 2, "CONSOLIDATED", _employees(("TSEL", 1, 31)))
+    ingest_files(db_path, "employee_demography", [january, february])
+
+    assert _summary_counts(db_path, 1) == [("TSEL", 0, 1), ("TSEL", 1, 1), ("YPT", 0, 1)]
+    with sqlite3.connect(db_path) as conn:
+        retiring = conn.execute(
+            "SELECT SUM(employee_count) FROM retirement_summary WHERE retirement_year = '2030' AND n_bulan = 1"
+        ).fetchone()[0]
+    assert retiring == 3
+
+    # A corrected February file only recomputes February
+    write_source(2025, 2, "CONSOLIDATED", _employees(("TSEL", 1, 31), ("YPT", 2, 29)))
+    ingest_files(db_path, "employee_demography", [january, february])
+    assert _summary_counts(db_path, 2) == [("TSEL", 1, 1), ("YPT", 1, 1)]
+    assert _summary_counts(db_path, 1) == [("TSEL", 0, 1), ("TSEL", 1, 1), ("YPT", 0, 1)]
+
+
+def test_summaries_built_for_existing_database(tmp_path, write_source):
+    db_path = str(tmp_path / "test.db")
+    january = write_source(2025, 1, "CONSOLIDATED", _employees(("TSEL", 1, 30)))
+    ingest_files(db_path, "employee_demography", [january])
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DROP TABLE demography_summary")
+
+    result = ingest_files(db_path, "employee_demography", [january])
+
+    assert result.changed and not result.ingested
+    assert _summary_counts(db_path, 1) == [("TSEL", 1, 1)]
+
+
+def test_summary_tables_in_sql_prompt(tmp_path, write_source):
+    db_path = str(tmp_path / "test.db")
+    ingest_files(db_path, "employee_demography", [write_source(2025, 1, "CONSOLIDATED", _employees(("TSEL", 1, 30)))])
+    try:
+        snapshot = schema_registry.load_schema(db_path, "employee_demography")
+        prompt = snapshot.sql_prompt_prefix
+    finally:
+        schema_registry._current = None
+
+    assert set(snapshot.summary_tables) == {"demography_summary", "retirement_summary"}
+    assert "demography_summary: ['n_tahun', 'n_bulan'" in prompt
+    assert "SUM(employee_count)" in prompt
+    assert describe_summary_tables("employee_demography", {}) == ""